@@ -27,6 +27,9 @@ datas_list = [
     ('config.py', '.'),
     ('database.py', '.'),
     ('downloader.py', '.'),
+    ('epub_writer.py', '.'),
+    ('txt_index.py', '.'),
+    ('pinyin_initials.py', '.'),
     ('spider.py', '.'),
     ('font_decrypt.py', '.'),
     ('selenium_login.py', '.'),
@@ -78,6 +78,11 @@ def test_scrapling():
     return ScraplingSelector(large_html, adaptive=False).css(".item::text").getall()
 
 
+@benchmark
+def test_scrapling_lexbor():
+    return ScraplingSelector(large_html, adaptive=False, backend="lexbor").css(".item::text").getall()
+
+
 @benchmark
 def test_parsel():
     return Selector(text=large_html).css(".item::text").extract()
@@ -126,6 +131,7 @@ if __name__ == "__main__":
         "Raw Lxml": test_lxml(),
         "Parsel/Scrapy": test_parsel(),
         "Scrapling": test_scrapling(),
+        "Scrapling (lexbor)": test_scrapling_lexbor(),
         "Selectolax": test_selectolax(),
         "PyQuery": test_pyquery(),
         "BS4 with Lxml": test_bs4_lxml(),
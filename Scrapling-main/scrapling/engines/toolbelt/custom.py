@@ -156,6 +156,7 @@ class BaseFetcher:
     storage_args: Optional[Dict] = None
     keep_comments: Optional[bool] = False
     adaptive_domain: str = ""
+    parser_backend: str = "lxml"
     parser_keywords: Tuple = (
         "huge_tree",
         "adaptive",
@@ -164,6 +165,7 @@ class BaseFetcher:
         "storage_args",
         "keep_comments",
         "adaptive_domain",
+        "parser_backend",
     )  # Left open for the user
 
     def __init__(self, *args, **kwargs):
@@ -188,13 +190,14 @@ class BaseFetcher:
             storage=cls.storage,
             storage_args=cls.storage_args,
             adaptive_domain=cls.adaptive_domain,
+            parser_backend=cls.parser_backend,
         )
 
     @classmethod
     def configure(cls, **kwargs):
         """Set multiple arguments for the parser at once globally
 
-        :param kwargs: The keywords can be any arguments of the following: huge_tree, keep_comments, keep_cdata, adaptive, storage, storage_args, adaptive_domain
+        :param kwargs: The keywords can be any arguments of the following: huge_tree, keep_comments, keep_cdata, adaptive, storage, storage_args, adaptive_domain, parser_backend
         """
         for key, value in kwargs.items():
             key = key.strip().lower()
@@ -222,6 +225,7 @@ class BaseFetcher:
             storage=cls.storage,
             storage_args=cls.storage_args,
             adaptive_domain=cls.adaptive_domain,
+            backend=cls.parser_backend,
         )
 
         return parser_arguments
@@ -1,8 +1,9 @@
 from pathlib import Path
+from itertools import islice
 from inspect import signature
 from urllib.parse import urljoin
 from difflib import SequenceMatcher
-from re import Pattern as re_Pattern
+from re import Pattern as re_Pattern, compile as re_compile
 
 from lxml.html import HtmlElement, HTMLParser
 from cssselect import SelectorError, SelectorSyntaxError, parse as split_selectors
@@ -59,6 +60,130 @@ _find_all_elements_with_spaces = XPath(
     ".//*[normalize-space(text())]"
 )  # This selector gets all elements with text content
 _find_all_text_nodes = XPath(".//text()")
+# Scrapy-style pseudo-elements at the end of a single CSS selector, handled manually by the lexbor backend
+_css_pseudo_element = re_compile(r"::(?:text|attr\(\s*([^\s)]+)\s*\))\s*$")
+_PARSER_BACKENDS = ("lxml", "lexbor")
+
+
+def _has_encoding_error(parser: HTMLParser) -> bool:
+    """Check if libxml2 hit bytes that aren't valid in the given encoding while parsing"""
+    return any(error.type_name == "ERR_INVALID_ENCODING" for error in parser.error_log)
+
+
+def _lexbor_parser_class() -> Any:
+    try:
+        from selectolax.lexbor import LexborHTMLParser
+    except (ImportError, ModuleNotFoundError) as e:
+        raise ModuleNotFoundError(
+            "The `lexbor` parser backend requires selectolax installed, please install it first with `pip install selectolax`"
+        ) from e
+    return LexborHTMLParser
+
+
+def _split_css_groups(selector: str) -> List[str]:
+    """Split a CSS selector on its top-level commas (ignoring commas inside quotes, brackets, or parentheses)"""
+    groups, current, depth, quote = [], [], 0, ""
+    for char in selector:
+        if quote:
+            if char == quote:
+                quote = ""
+        elif char in "\"'":
+            quote = char
+        elif char in "([":
+            depth += 1
+        elif char in ")]":
+            depth -= 1
+        elif char == "," and depth == 0:
+            groups.append("".join(current).strip())
+            current = []
+            continue
+        current.append(char)
+    groups.append("".join(current).strip())
+    return groups
+
+
+def _lexbor_text_segments(
+    node: Any, deep: bool = True, ignore_tags: Tuple = (), keep_comments: bool = False
+) -> List[str]:
+    """Return the text under a lexbor node split the same way lxml splits it (element `.text` and children `.tail`)
+
+    :param deep: If disabled, only the direct text of the node is returned like the `text()` XPath step.
+    :param ignore_tags: Elements with these tags are skipped along with everything inside them.
+    :param keep_comments: lxml keeps comment nodes in that case, so they split the surrounding text.
+    """
+    if node.tag in ignore_tags:
+        return []
+
+    segments: List[str] = []
+    buffer: List[str] = []
+
+    def flush() -> None:
+        if buffer:
+            text = "".join(buffer)
+            buffer.clear()
+            if text:
+                segments.append(text)
+
+    # Iterative walk, pages like the benchmark's 5000 nested elements would exceed the recursion limit
+    stack = [node.iter(include_text=True)]
+    while stack:
+        child = next(stack[-1], None)
+        if child is None:
+            stack.pop()
+            flush()
+        elif child.is_text_node:
+            buffer.append(child.text_content or "")
+        elif child.is_element_node:
+            flush()
+            if deep and child.tag not in ignore_tags:
+                stack.append(child.iter(include_text=True))
+        elif child.is_comment_node and keep_comments:
+            flush()
+
+    return segments
+
+
+class _LexborDocument:
+    """Holds the lexbor tree of a page, and builds the matching lxml tree only when an lxml-only feature needs it"""
+
+    __slots__ = ("tree", "_body", "_url", "_parser_kwargs", "_lxml_root")
+
+    def __init__(self, body: str, url: str, parser_kwargs: Dict[str, Any]):
+        self.tree = _lexbor_parser_class()(body)
+        self._body = body
+        self._url = url
+        self._parser_kwargs = parser_kwargs
+        self._lxml_root: Optional[HtmlElement] = None
+
+    @property
+    def root(self) -> Any:
+        return self.tree.root
+
+    def lxml_root(self) -> HtmlElement:
+        if self._lxml_root is None:
+            parser = HTMLParser(**self._parser_kwargs)
+            self._lxml_root = cast(HtmlElement, fromstring(self._body or "<html/>", parser=parser, base_url=self._url))
+        return self._lxml_root
+
+    def to_lxml(self, node: Any) -> HtmlElement:
+        """Find the lxml element that corresponds to the given lexbor node"""
+        # Both parsers don't always build the same tree structure (lexbor follows the HTML5 spec, e.g. it adds `tbody`
+        # to tables), but they almost always agree on the order of elements with the same tag name, so we use that.
+        element = None
+        try:
+            position = next(i for i, other in enumerate(self.tree.css(node.tag)) if other.mem_id == node.mem_id)
+            element = next(islice(self.lxml_root().iter(node.tag), position, None), None)
+        except Exception:  # pragma: no cover
+            pass
+
+        if element is not None:
+            return cast(HtmlElement, element)
+
+        # Elements that only exist in the lexbor tree, fall back to a detached copy of the element
+        log.debug(f"Couldn't map the lexbor element <{node.tag}> to the lxml tree, using a detached copy instead")
+        parser = HTMLParser(**self._parser_kwargs)
+        fragment = cast(HtmlElement, fromstring(node.html or "<html/>", parser=parser, base_url=self._url))
+        return cast(HtmlElement, next(fragment.iter(node.tag), fragment))
 
 
 class Selector(SelectorsGeneration):
@@ -75,6 +200,8 @@ class Selector(SelectorsGeneration):
         "__tag",
         "__keep_cdata",
         "_raw_body",
+        "_lexbor",
+        "_lexbor_doc",
     )
 
     def __init__(
@@ -90,6 +217,7 @@ class Selector(SelectorsGeneration):
         _storage: Optional[StorageSystemMixin] = None,
         storage: Any = SQLiteStorageSystem,
         storage_args: Optional[Dict] = None,
+        backend: str = "lxml",
         **_,
     ):
         """The main class that works as a wrapper for the HTML input data. Using this class, you can search for elements
@@ -114,9 +242,15 @@ class Selector(SelectorsGeneration):
         :param storage: The storage class to be passed for adaptive functionalities, see ``Docs`` for more info.
         :param storage_args: A dictionary of ``argument->value`` pairs to be passed for the storage class.
             If empty, default values will be used.
+        :param backend: The parser used to build the tree, either `lxml` (default) or `lexbor` (needs `selectolax`).
+            The `lexbor` backend is faster to build and query with CSS selectors and to extract text. Everything else
+            (XPath, navigation, adaptive features, etc...) transparently falls back to lxml for that element.
+            It's ignored when `adaptive` is enabled.
         """
         if root is None and content is None:
             raise ValueError("Selector class needs HTML content, or root arguments to work")
+        if backend not in _PARSER_BACKENDS:
+            raise ValueError(f"Unknown parser backend '{backend}', available backends are {_PARSER_BACKENDS}")
 
         self.url = url
         self._raw_body: str | bytes = ""
@@ -129,12 +263,17 @@ class Selector(SelectorsGeneration):
         self.__attributes: Optional[AttributesHandler] = None
         self.__tag: Optional[str] = None
         self._storage: Optional[StorageSystemMixin] = None
+        self._lexbor: Any = None
+        self._lexbor_doc: Optional[_LexborDocument] = None
         if root is None:
             body: str | bytes
+            # Only copy the page when there's something to clean, lxml ignores the surrounding whitespace anyway
             if isinstance(content, str):
-                body = content.strip().replace("\x00", "") or "<html/>"
+                body = content.replace("\x00", "") if "\x00" in content else content
+                if not body or body.isspace():
+                    body = "<html/>"
             elif isinstance(content, bytes):
-                body = content.replace(b"\x00", b"")
+                body = content.replace(b"\x00", b"") if b"\x00" in content else content
             else:
                 raise TypeError(f"content argument must be str or bytes, got {type(content)}")
 
@@ -149,8 +288,26 @@ class Selector(SelectorsGeneration):
                 default_doctype=True,  # Supported by lxml but missing from stubs
                 strip_cdata=(not keep_cdata),
             )
-            parser = HTMLParser(**_parser_kwargs)
-            self._root = cast(HtmlElement, fromstring(body or "<html/>", parser=parser, base_url=url or ""))
+            if backend == "lexbor" and not adaptive:
+                # The lxml tree (`self._root`) is only built later if a feature needs it, check `__getattr__`
+                if isinstance(body, bytes):
+                    body = body.decode(encoding, errors="replace")
+                self._lexbor_doc = _LexborDocument(body, url or "", _parser_kwargs)
+                self._lexbor = self._lexbor_doc.root
+            else:
+                parser = HTMLParser(**_parser_kwargs)
+                self._root = cast(HtmlElement, fromstring(body or "<html/>", parser=parser, base_url=url or ""))
+                if isinstance(body, bytes) and _has_encoding_error(parser):
+                    # libxml2 stops decoding at the first invalid byte sequence and drops the rest of the page,
+                    # so decode it ourselves with replacement characters instead
+                    self._root = cast(
+                        HtmlElement,
+                        fromstring(
+                            body.decode(encoding, errors="replace"),
+                            parser=HTMLParser(**_parser_kwargs),
+                            base_url=url or "",
+                        ),
+                    )
             self._raw_body = content
 
         else:
@@ -180,13 +337,22 @@ class Selector(SelectorsGeneration):
 
                 self._storage = storage(**storage_args)
 
+    def __getattr__(self, name: str) -> Any:
+        # Only called for slots that were never assigned. With the lexbor backend, that's `_root` until an lxml-only
+        # feature needs it, then the lxml element is built once and cached in the slot.
+        if name == "_root" and self._lexbor is not None:
+            root = self._lexbor_doc.to_lxml(self._lexbor)
+            self._root = root
+            return root
+        raise AttributeError(f"'{self.__class__.__name__}' object has no attribute '{name}'")
+
     def __getitem__(self, key: str) -> TextHandler:
-        if self._is_text_node(self._root):
+        if self._lexbor is None and self._is_text_node(self._root):
             raise TypeError("Text nodes do not have attributes")
         return self.attrib[key]
 
     def __contains__(self, key: str) -> bool:
-        if self._is_text_node(self._root):
+        if self._lexbor is None and self._is_text_node(self._root):
             return False
         return key in self.attrib
 
@@ -240,6 +406,85 @@ class Selector(SelectorsGeneration):
             for el in elements
         )
 
+    def __lexbor_convertor(self, node: Any) -> "Selector":
+        """Used internally to wrap a lexbor node in a Selector directly without parsing anything"""
+        element = Selector.__new__(Selector)
+        element.url = self.url
+        element.encoding = self.encoding
+        element._raw_body = ""
+        element._storage = None
+        element._lexbor = node
+        element._lexbor_doc = self._lexbor_doc
+        element.__adaptive_enabled = False
+        element.__keep_comments = self.__keep_comments
+        element.__keep_cdata = self.__keep_cdata
+        element.__huge_tree_enabled = self.__huge_tree_enabled
+        element.__text = None
+        element.__attributes = None
+        element.__tag = None
+        return element
+
+    def __lexbor_css(self, selector: str) -> Optional["Selectors"]:
+        """Search the lexbor tree with CSS3 selectors, returns `None` when the selector needs the lxml engine instead"""
+        groups = _split_css_groups(selector)
+        pseudo_elements = set()
+        plain_groups = []
+        for group in groups:
+            pseudo_element: Optional[Tuple[str, str]] = None
+            if match := _css_pseudo_element.search(group):
+                pseudo_element = ("attr", match.group(1)) if match.group(1) else ("text", "")
+                group = group[: match.start()].strip()
+            if "::" in group or (not group and pseudo_element != ("text", "")):
+                # Other pseudo-elements or a lone `::attr()`
+                return None
+            pseudo_elements.add(pseudo_element)
+            plain_groups.append(group)
+
+        if len(pseudo_elements) != 1:
+            # Mixing elements and text/attributes in one selector, leave it to lxml to keep the document order
+            return None
+        pseudo_element = pseudo_elements.pop()
+        if pseudo_element and pseudo_element[0] == "text" and len(groups) > 1:
+            # Text nodes of nested matches would be out of document order
+            return None
+
+        if pseudo_element == ("text", "") and not plain_groups[0]:
+            # `::text` alone selects all text nodes below the element
+            return self.__lexbor_text_results(
+                _lexbor_text_segments(self._lexbor, keep_comments=bool(self.__keep_comments))
+            )
+
+        try:
+            nodes = self._lexbor.css(", ".join(plain_groups))
+        except Exception:
+            # Unsupported syntax for lexbor (or invalid), lxml will handle it or raise the proper error
+            return None
+
+        if len(plain_groups) > 1:
+            # lexbor returns an element once for each group it matches, unlike XPath unions
+            seen = set()
+            nodes = [node for node in nodes if not (node.mem_id in seen or seen.add(node.mem_id))]
+
+        if pseudo_element is None:
+            return Selectors(self.__lexbor_convertor(node) for node in nodes)
+
+        if pseudo_element[0] == "text":
+            keep_comments = bool(self.__keep_comments)
+            return self.__lexbor_text_results(
+                [text for node in nodes for text in _lexbor_text_segments(node, False, keep_comments=keep_comments)]
+            )
+
+        name = pseudo_element[1]
+        values = []
+        for node in nodes:
+            attributes = node.attributes
+            if name in attributes:
+                values.append(attributes[name] or "")
+        return self.__lexbor_text_results(values)
+
+    def __lexbor_text_results(self, texts: List[str]) -> "Selectors":
+        return self.__handle_elements([_ElementUnicodeResult(text) for text in texts])
+
     def __handle_elements(self, result: List[HtmlElement | _ElementUnicodeResult]) -> "Selectors":
         """Used internally in all functions to convert results to Selectors in bulk"""
         if not result:
@@ -259,6 +504,8 @@ class Selector(SelectorsGeneration):
     @property
     def tag(self) -> str:
         """Get the tag name of the element"""
+        if self._lexbor is not None:
+            return self._lexbor.tag
         if self._is_text_node(self._root):
             return "#text"
         if not self.__tag:
@@ -268,6 +515,17 @@ class Selector(SelectorsGeneration):
     @property
     def text(self) -> TextHandler:
         """Get text content of the element"""
+        if self._lexbor is not None:
+            if self.__text is None:
+                # Like lxml's `.text`, that's the text before the first child element
+                parts = []
+                for child in self._lexbor.iter(include_text=True):
+                    if child.is_text_node:
+                        parts.append(child.text_content or "")
+                    elif child.is_element_node or (child.is_comment_node and self.__keep_comments):
+                        break
+                self.__text = TextHandler("".join(parts))
+            return self.__text
         if self._is_text_node(self._root):
             return TextHandler(str(self._root))
         if self.__text is None:
@@ -295,6 +553,14 @@ class Selector(SelectorsGeneration):
 
         :return: A TextHandler
         """
+        if self._lexbor is not None:
+            _all_strings = []
+            for text in _lexbor_text_segments(self._lexbor, True, ignore_tags or (), bool(self.__keep_comments)):
+                processed_text = text.strip() if strip else text
+                if not valid_values or processed_text.strip():
+                    _all_strings.append(processed_text)
+            return cast(TextHandler, TextHandler(separator).join(_all_strings))
+
         if self._is_text_node(self._root):
             return TextHandler(str(self._root))
 
@@ -335,6 +601,10 @@ class Selector(SelectorsGeneration):
     @property
     def attrib(self) -> AttributesHandler:
         """Get attributes of the element"""
+        if self._lexbor is not None:
+            if not self.__attributes:
+                self.__attributes = AttributesHandler({k: v or "" for k, v in self._lexbor.attributes.items()})
+            return self.__attributes
         if self._is_text_node(self._root):
             return AttributesHandler({})
         if not self.__attributes:
@@ -344,6 +614,8 @@ class Selector(SelectorsGeneration):
     @property
     def html_content(self) -> TextHandler:
         """Return the inner HTML code of the element"""
+        if self._lexbor is not None:
+            return TextHandler((self._lexbor.html or "").strip())
         if self._is_text_node(self._root):
             return TextHandler(str(self._root))
         content = tostring(self._root, encoding=self.encoding, method="html", with_tail=False)
@@ -354,6 +626,8 @@ class Selector(SelectorsGeneration):
     @property
     def body(self) -> str | bytes:
         """Return the raw body of the current `Selector` without any processing. Useful for binary and non-HTML requests."""
+        if self._lexbor is not None:
+            return self._raw_body
         if self._is_text_node(self._root):
             return ""
         return self._raw_body
@@ -378,6 +652,8 @@ class Selector(SelectorsGeneration):
         :param class_name: The class name to check for
         :return: True if element has class with that name otherwise False
         """
+        if self._lexbor is not None:
+            return class_name in (self._lexbor.attributes.get("class") or "").split()
         if self._is_text_node(self._root):
             return False
         return class_name in self._root.classes
@@ -466,7 +742,7 @@ class Selector(SelectorsGeneration):
         Serialize this element to a string.
         For text nodes, returns the text value. For HTML elements, returns the outer HTML.
         """
-        if self._is_text_node(self._root):
+        if self._lexbor is None and self._is_text_node(self._root):
             return TextHandler(str(self._root))
         return self.html_content
 
@@ -478,7 +754,7 @@ class Selector(SelectorsGeneration):
     extract_first = get
 
     def __str__(self) -> str:
-        if self._is_text_node(self._root):
+        if self._lexbor is None and self._is_text_node(self._root):
             return str(self._root)
         return self.html_content
 
@@ -590,6 +866,10 @@ class Selector(SelectorsGeneration):
 
         :return: `Selectors` class.
         """
+        if self._lexbor is not None and not adaptive and not auto_save:
+            if (results := self.__lexbor_css(selector)) is not None:
+                return results
+
         if self._is_text_node(self._root):
             return Selectors()
 
@@ -916,7 +1196,7 @@ class Selector(SelectorsGeneration):
     # Operations on text functions
     def json(self) -> Dict:
         """Return JSON response if the response is jsonable otherwise throws error"""
-        if self._is_text_node(self._root):
+        if self._lexbor is None and self._is_text_node(self._root):
             return TextHandler(str(self._root)).json()
         if self._raw_body and isinstance(self._raw_body, (str, bytes)):
             if isinstance(self._raw_body, str):
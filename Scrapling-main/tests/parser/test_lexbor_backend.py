@@ -0,0 +1,219 @@
+import pytest
+
+from scrapling import Selector, Selectors
+from scrapling.fetchers import Fetcher
+
+pytest.importorskip("selectolax")
+
+
+# Trimmed copies of chapter pages from the novel sites we scrape, keeping the parts that matter for parsing:
+# navigation, ads, scripts, comments, `<br>` separated paragraphs, and the chapter list blocks.
+CHAPTER_PAGES = {
+    "biquge": (
+        "utf-8",
+        """<!DOCTYPE html><html><head><meta charset="utf-8"><title>第一章 风起_某书_蚂蚁文学</title>
+<script>var bookid = "1_1"; document.write("<div>");</script><style>#content{font-size:18px}</style></head>
+<body><div class="header"><a href="/">首页</a> <!-- nav --> <ul><li><a href="/sort/1/">玄幻</a></li></ul></div>
+<div class="box_con"><div class="bookname"><h1>第一章 风起</h1>
+<div class="bottem1"><a href="/1_1/">目录</a> <a href="/1_1/2.html">下一章</a></div></div>
+<div id="content">&nbsp;&nbsp;&nbsp;&nbsp;第一段，内容&amp;符号<br/><br/>&nbsp;&nbsp;&nbsp;&nbsp;第二段<!--ad-->接续<br>
+<p>最新网址：www.mayiwsk.com</p><script>ads()</script>最后一段</div></div>
+<div class="footer"><p>Copyright</p></div></body></html>""",
+    ),
+    "sto66": (
+        "utf-8",
+        """<html><head><title>第12章 夜雨-某书-思兔阅读</title></head><body>
+<div class="nav"><a href="/">思兔</a></div>
+<div class="content-box"><h1>第12章 夜雨</h1>
+<div id="content"><p>　　夜雨来得急。</p><p>　　他推开门，<em>风</em>灌了进来。</p>
+<p>思兔阅读 sto66.com 最新章节</p></div>
+<div class="pager"><a href="/chapter/abc/11.html">上一章</a><a href="/chapter/abc/13.html">下一章</a></div></div>
+</body></html>""",
+    ),
+    "dingdian": (
+        "utf-8",
+        """<html><head><meta property="og:novel:book_name" content="某书"><title>第3章_某书_顶点小说</title></head>
+<body><div id="wrapper"><div class="box_con"><div class="bookname"><h1>第3章 山门</h1></div>
+<div id="content">　　山门前的石阶很长。<br />　　少年一级一级往上走。<br /><br />
+<div align="center"><script>read3();</script></div>　　终于到了。</div></div>
+<div class="box_con"><div id="list"><dl><dt>最新章节</dt><dd><a href="/xs/1/3.html">第3章 山门</a></dd>
+<dd><a href="/xs/1/2.html">第2章</a></dd><dt>正文</dt><dd><a href="/xs/1/1.html">第1章</a></dd>
+<dd> <a href="/xs/1/2.html">第2章</a> </dd><dd><a href="/xs/1/3.html">第3章 山门</a></dd></dl></div></div></div>
+</body></html>""",
+    ),
+    "bxwx": (
+        "gbk",
+        """<html><head><meta http-equiv="Content-Type" content="text/html; charset=gbk"><title>第八章 归途_某书_笔下文学</title>
+</head><body><div class="book reader"><div class="content"><h1>第八章 归途</h1>
+<div id="content">&nbsp;&nbsp;&nbsp;&nbsp;归途漫漫。<br><br>&nbsp;&nbsp;&nbsp;&nbsp;“走吧。”他说。<br>
+最新网址：www.bxwxber.cc</div></div>
+<div class="listmain"><dl><dd><a href="/book/1/2/1.html">第一章</a></dd><dd><a href="/book/1/2/2.html">第二章</a></dd></dl></div>
+<table class="grid"><tr><td class="odd">表格</td><td>内容</td></tr></table></div></body></html>""",
+    ),
+    "qianbi": (
+        "utf-8",
+        """<html><head><meta property="og:title" content="某书"><title>第五十章 - 某书 - 铅笔小说</title></head><body>
+<div class="module"><div class="module-row-info"><a class="module-row-text" href="/book/9/50.html">第五十章</a></div></div>
+<article><h1 class="article-title">第五十章</h1><div class="article-content">
+<p>第一段</p><p>第二段 <a href="/tag/x">标签</a> 文字</p><p></p><p>本章未完，点击下一页继续</p></div></article>
+</body></html>""",
+    ),
+    "haitang": (
+        "utf-8",
+        """<html><head><title>第1章_某书_海棠文学</title></head><body><div class="main">
+<div class="title"><h1>第1章</h1></div><div id="acontent" class="acontent">
+一段<br/>二段<br/>
+<span style="display:none">隐藏</span>三段</div>
+<ul class="chapters"><li><a href="/book/5/1.html">第1章</a></li><li><a href="/book/5/2.html">第2章</a></li></ul>
+</div></body></html>""",
+    ),
+}
+
+# The selectors the sources use, plus a few more of the same shape
+SELECTORS = (
+    "h1::text",
+    "title::text",
+    "#content",
+    "#acontent",
+    ".article-content",
+    "div#content, .content, .chapter-content, .article-content, #acontent",
+    "dd a",
+    "dd a::text",
+    "dd a::attr(href)",
+    ".listmain dd a, dd a",
+    ".module-row-text, .module-row-info a",
+    ".main a, dd a, li a",
+    "a[href]",
+    'meta[property="og:novel:book_name"]::attr(content)',
+    'meta[property="og:title"]::attr(content)',
+    "td.odd",
+    ".nonexistent",
+    ".nonexistent::text",
+)
+
+
+def _describe(results):
+    """Reduce selection results to plain data so both backends can be compared"""
+    described = []
+    for element in results:
+        if element._lexbor is None and element._is_text_node(element._root):
+            described.append(str(element))
+        else:
+            described.append(
+                (element.tag, str(element.text), str(element.get_all_text()), dict(element.attrib))
+            )
+    return described
+
+
+def _pages(source):
+    encoding, html = CHAPTER_PAGES[source]
+    body = html.encode(encoding)
+    return (
+        Selector(body, encoding=encoding),
+        Selector(body, encoding=encoding, backend="lexbor"),
+    )
+
+
+@pytest.mark.parametrize("source", CHAPTER_PAGES)
+class TestLexborParity:
+    """Results of the lexbor backend should match the lxml ones on the pages we scrape"""
+
+    @pytest.mark.parametrize("selector", SELECTORS)
+    def test_css_parity(self, source, selector):
+        lxml_page, lexbor_page = _pages(source)
+        assert _describe(lexbor_page.css(selector)) == _describe(lxml_page.css(selector))
+
+    def test_get_all_text_parity(self, source):
+        lxml_page, lexbor_page = _pages(source)
+        assert lexbor_page.get_all_text() == lxml_page.get_all_text()
+        assert lexbor_page.get_all_text(strip=True) == lxml_page.get_all_text(strip=True)
+        assert lexbor_page.get_all_text(ignore_tags=()) == lxml_page.get_all_text(ignore_tags=())
+
+    def test_all_text_nodes_parity(self, source):
+        # lxml drops some whitespace-only text nodes while parsing, lexbor keeps them
+        lxml_page, lexbor_page = _pages(source)
+        lxml_texts = [t for t in lxml_page.css("::text").getall() if t.strip()]
+        lexbor_texts = [t for t in lexbor_page.css("::text").getall() if t.strip()]
+        assert lexbor_texts == lxml_texts
+
+    def test_chapter_extraction_parity(self, source):
+        lxml_page, lexbor_page = _pages(source)
+        content_selector = "div#content, .content, .chapter-content, .article-content, #acontent"
+        for page in (lxml_page, lexbor_page):
+            assert page.css(content_selector)
+        assert (
+            lexbor_page.css(content_selector)[0].get_all_text(strip=True)
+            == lxml_page.css(content_selector)[0].get_all_text(strip=True)
+        )
+        assert lexbor_page.css("h1::text").get("") == lxml_page.css("h1::text").get("")
+
+
+class TestLexborBackend:
+    """Test the lexbor backend behavior"""
+
+    HTML = """<html><body><div id="main" class="box big"><p>One <b>two</b> three</p><p>Four</p>
+    <table><tr><td class="cell">Five</td></tr></table></div></body></html>"""
+
+    def test_invalid_backend(self):
+        with pytest.raises(ValueError):
+            Selector(self.HTML, backend="html5lib")
+
+    def test_lxml_tree_is_built_lazily(self):
+        page = Selector(self.HTML, backend="lexbor")
+        element = page.css("#main")[0]
+        assert element.has_class("big")
+        assert element["id"] == "main"
+        assert "class" in element
+        assert element.tag == "div"
+        # Nothing above needed lxml
+        with pytest.raises(AttributeError):
+            object.__getattribute__(element, "_root")
+
+        # XPath falls back to lxml for this element
+        assert element.xpath("./p/text()").getall() == ["One ", " three", "Four"]
+        assert object.__getattribute__(element, "_root").tag == "div"
+
+    def test_navigation_falls_back_to_lxml(self):
+        page = Selector(self.HTML, backend="lexbor")
+        cell = page.css("td.cell")[0]
+        # lexbor adds `tbody` while lxml doesn't, the element is still found in the lxml tree
+        assert [ancestor.tag for ancestor in cell.iterancestors()] == ["tr", "table", "div", "body", "html"]
+        assert cell.parent.tag == "tr"
+        assert page.css("p")[0].next.text == "Four"
+
+    def test_text_properties(self):
+        page = Selector(self.HTML, backend="lexbor")
+        first = page.css("p")[0]
+        assert first.text == "One "
+        assert first.get_all_text() == "One \ntwo\n three"
+        assert first.css("::text").getall() == ["One ", "two", " three"]
+        assert page.css("p::text").getall() == ["One ", " three", "Four"]
+        assert page.css("#main::attr(class)").get() == "box big"
+
+    def test_nested_selections(self):
+        page = Selector(self.HTML, backend="lexbor")
+        results = page.css("#main").css("p")
+        assert isinstance(results, Selectors)
+        assert [p.text for p in results] == ["One ", "Four"]
+        # The element itself is included like the lxml backend (`descendant-or-self`)
+        assert page.css("#main")[0].css("div")[0]["id"] == "main"
+
+    def test_mixed_selectors_fall_back_to_lxml(self):
+        html = "<div>a<p>b</p>c</div>"
+        expected = Selector(html).css("div::text, p::text").getall()
+        assert Selector(html, backend="lexbor").css("div::text, p::text").getall() == expected == ["a", "b", "c"]
+
+    def test_adaptive_uses_lxml(self):
+        page = Selector(
+            self.HTML, backend="lexbor", adaptive=True, storage_args={"storage_file": ":memory:", "url": "x"}
+        )
+        assert page._lexbor is None
+        assert page.css("#main")[0].tag == "div"
+
+    def test_fetcher_configuration(self):
+        Fetcher.configure(parser_backend="lexbor")
+        try:
+            assert Fetcher.display_config()["parser_backend"] == "lexbor"
+            assert Fetcher._generate_parser_arguments()["backend"] == "lexbor"
+        finally:
+            Fetcher.configure(parser_backend="lxml")
@@ -55,6 +55,33 @@ class TestSelectorAdvancedFeatures:
         assert selector._storage is mock_storage
 
 
+class TestSelectorContentDecoding:
+    """Test how the raw content is cleaned and decoded before parsing"""
+
+    HTML = "<html><body><h1>第一章</h1><div id='content'>正文一段</div><p>之后</p></body></html>"
+
+    def test_bytes_with_declared_encoding(self):
+        """Test bytes are decoded by lxml with the given encoding"""
+        for encoding in ("gbk", "utf-8"):
+            page = Selector(self.HTML.encode(encoding), encoding=encoding)
+            assert page.css("h1::text").get() == "第一章"
+            assert page.css("#content::text").get() == "正文一段"
+
+    def test_invalid_bytes_dont_truncate_the_page(self):
+        """Test the page isn't cut at byte sequences that are invalid in the declared encoding"""
+        body = self.HTML.encode("gbk").replace("一段".encode("gbk"), b"\x81\x20\xff\xfe")
+        page = Selector(body, encoding="gbk")
+        assert page.css("#content::text").get().startswith("正文")
+        assert page.css("p::text").get() == "之后"
+
+    def test_null_bytes_and_whitespace(self):
+        """Test null bytes are removed and whitespace-only content still gives an empty document"""
+        assert Selector("<p>a\x00b</p>").css("p::text").get() == "ab"
+        assert Selector(b"<p>a\x00b</p>").css("p::text").get() == "ab"
+        assert Selector("\n  <p>x</p>\n").css("p::text").get() == "x"
+        assert Selector(" \n ").html_content == "<html></html>"
+
+
 class TestAdvancedSelectors:
     """Test advanced selector functionality"""
 
@@ -0,0 +1,716 @@
+# -*- coding: utf-8 -*-
+"""性能基准
+
+用法：
+    python benchmarks.py            # 运行全部基准
+    python benchmarks.py decode     # 只运行名称包含 decode 的基准
+
+每项基准输出单次平均耗时，以及 tracemalloc 统计的 Python 侧峰值内存分配
+（lxml/libxml2 在 C 层的分配不计入）。
+"""
+import os
+import sys
+import time
+import timeit
+import tracemalloc
+
+# ============== 工具函数 ==============
+
+BENCHMARKS = {}
+
+
+def benchmark(func):
+    """注册基准函数：函数返回 {'说明': 被测函数}，逐个计时并统计峰值内存"""
+    BENCHMARKS[func.__name__] = func
+    return func
+
+
+def _measure(func, number):
+    func()  # 预热
+    elapsed = timeit.timeit(func, number=number) / number
+    tracemalloc.start()
+    try:
+        func()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return elapsed, peak
+
+
+def _report(name, cases, number):
+    print(f'== {name} ==')
+    for label, func in cases.items():
+        elapsed, peak = _measure(func, number)
+        print(f'  {label:<36} {elapsed * 1000:8.3f} ms   峰值 {peak / 1024:8.1f} KiB')
+
+
+def _chapter_page(paragraphs=300, list_size=1500):
+    """构造典型章节页：页头 + 标题 + 正文 + 长章节列表 + 页脚"""
+    para = '&nbsp;&nbsp;&nbsp;&nbsp;他推开门，夜雨“哗”地一声灌了进来，灯火摇晃。<br><br>\n' * paragraphs
+    chapters = ''.join(f'<dd><a href="/book/1/2/{i}.html">第{i}章 标题</a></dd>' for i in range(list_size))
+    return (
+        '<!DOCTYPE html>\n<html><head><meta http-equiv="Content-Type" content="text/html; charset=gbk">'
+        '<title>第八章 归途_某书_笔下文学</title></head>\n<body>'
+        '<div class="header"><a href="/">首页</a></div>'
+        f'<div class="content"><h1>第八章 归途</h1><div id="content">{para}</div></div>'
+        f'<div class="listmain"><dl>{chapters}</dl></div>'
+        '<div class="footer">Copyright</div></body></html>\n'
+    )
+
+
+# ============== 基准 ==============
+
+@benchmark
+def decode(number=50):
+    """GBK 章节页：先解码成 str 再解析 vs 按声明编码直接解析字节"""
+    from scrapling import Selector
+
+    body = _chapter_page().encode('gbk')
+
+    def decode_then_parse():
+        # 旧路径：Python 解码一次，Selector 再 strip/replace 复制一次，lxml 还要把 str 重新编码
+        text = body.decode('gbk', errors='replace')
+        return Selector(text.strip().replace('\x00', ''))
+
+    def parse_bytes():
+        return Selector(body, encoding='gbk')
+
+    assert decode_then_parse().get_all_text() == parse_bytes().get_all_text()
+    _report(f'decode（GBK 章节页 {len(body) // 1024} KiB）', {
+        '解码为 str 后解析': decode_then_parse,
+        '按声明编码直接解析字节': parse_bytes,
+    }, number)
+
+
+@benchmark
+def chapter_list(number=20):
+    """5000 章书籍：章节列表去重排序 + 跨源按标题匹配"""
+    from sources.base import ChapterInfo
+    from sources.generic_source import ConfigurableSource
+
+    total = 5000
+    # 开头 12 章"最新章节"倒序段 + 完整正序列表
+    raw = [(str(i), f'第{i}章 标题', k) for k, i in enumerate(range(total, total - 12, -1))]
+    raw += [(str(i), f'第{i}章 标题', 12 + i) for i in range(1, total + 1)]
+    wanted = [f'第{i}章标题' for i in range(1, total + 1, 50)]  # 需要按标题匹配的失败章节
+
+    def chapter_info_list():
+        # 旧做法：ChapterInfo 列表 + 每个源建 {标题: ID} 字典，模糊匹配逐个遍历
+        chapters = [ChapterInfo(cid, title, i + 1) for i, (cid, title, _) in enumerate(raw[12:])]
+        title_to_cid = {ch.chapter_title: ch.chapter_id for ch in chapters}
+        for title in wanted:
+            if title_to_cid.get(title) is None:
+                next((c for t, c in title_to_cid.items() if t.replace(' ', '') == title), None)
+        return chapters
+
+    def columnar_chapter_list():
+        chapters = ConfigurableSource._dedup_and_sort_chapters(raw)
+        for title in wanted:
+            chapters.find_by_title(title)
+        return chapters
+
+    assert [(c.chapter_id, c.chapter_title) for c in chapter_info_list()] == \
+        [(c.chapter_id, c.chapter_title) for c in columnar_chapter_list()]
+    _report(f'chapter_list（{total} 章，按标题匹配 {len(wanted)} 章）', {
+        'ChapterInfo 列表 + 标题字典': chapter_info_list,
+        'ChapterList': columnar_chapter_list,
+    }, number)
+
+
+@benchmark
+def font_decrypt(number=50):
+    """番茄字体解密：10000 字章节，逐字符拼接 vs str.translate"""
+    import random
+    import tempfile
+    from font_decrypt import FontDecryptor, DEFAULT_FONT_MAPPING
+
+    rng = random.Random(0)
+    codes = list(DEFAULT_FONT_MAPPING)
+    plain = '他推开门，夜雨灌了进来。“走吧。”\n'
+    # 番茄正文中约四成字符是加密码位
+    chapter = ''.join(
+        chr(rng.choice(codes)) if rng.random() < 0.4 else rng.choice(plain)
+        for _ in range(10000)
+    )
+    decryptor = FontDecryptor(cache_dir=tempfile.mkdtemp())
+
+    def char_loop():
+        # 旧实现：逐字符查表并拼接
+        result = ''
+        for ch in chapter:
+            code = ord(ch)
+            if code in DEFAULT_FONT_MAPPING:
+                result += DEFAULT_FONT_MAPPING[code]
+            else:
+                result += ch
+        return result
+
+    def translate():
+        return decryptor.change(chapter, DEFAULT_FONT_MAPPING)
+
+    assert char_loop() == translate()
+    _report('font_decrypt（10000 字章节）', {
+        '逐字符拼接': char_loop,
+        'str.translate 转换表': translate,
+    }, number)
+
+
+def _temp_database(per_call_connection=False):
+    """在临时目录创建 NovelDatabase；per_call_connection=True 时模拟旧实现（每次调用新建连接）"""
+    import sqlite3
+    import tempfile
+    from database import NovelDatabase
+
+    class PerCallConnectionDatabase(NovelDatabase):
+        def __init__(self, db_path):
+            super().__init__(db_path)
+            with self.get_connection() as conn:
+                conn.execute('PRAGMA journal_mode=WAL')
+
+        def get_connection(self):
+            conn = sqlite3.connect(self.db_path, check_same_thread=False, timeout=30)
+            conn.row_factory = sqlite3.Row
+            # 旧版本（v3 ~ v8）的全文索引触发器通过它读取正文，执行迁移时需要
+            conn.create_function('decode_chapter', 2, self._codec.decode, deterministic=True)
+            return conn
+
+    cls = PerCallConnectionDatabase if per_call_connection else NovelDatabase
+    db_path = os.path.join(tempfile.mkdtemp(), 'bench.db')
+    return cls(db_path=db_path)
+
+
+@benchmark
+def save_chapters(number=1, chapters=2000, threads=8):
+    """多线程保存章节：锁 + 每次调用新建连接 / 锁 + 线程本地长连接 / ChapterWriter 批量写入"""
+    import threading
+    from concurrent.futures import ThreadPoolExecutor
+    from database import ChapterWriter
+
+    content = '他推开门，夜雨灌了进来。\n' * 250  # 约 3000 字
+
+    def run(mode):
+        db = _temp_database(per_call_connection=(mode == 'per_call'))
+        db.save_novel('bench', '测试', '作者', '', '')
+        lock = threading.Lock()
+        writer = ChapterWriter(db)
+
+        def save(i):
+            args = ('bench', f'c{i}', f'第{i}章', i + 1, content, len(content))
+            if mode == 'writer':
+                writer.put(*args)
+            else:
+                with lock:  # 旧做法：下载线程排队写库
+                    db.save_chapter(*args)
+
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=threads) as executor:
+            list(executor.map(save, range(chapters)))
+        assert writer.close()
+        elapsed = time.perf_counter() - start
+        assert len(db.get_chapters('bench')) == chapters
+        db.close()
+        return elapsed
+
+    print(f'== save_chapters（{threads} 线程，{chapters} 章，每章约 {len(content)} 字） ==')
+    for label, mode in (('加锁 + 每次调用新建连接', 'per_call'),
+                        ('加锁 + 线程本地长连接', 'local'),
+                        ('ChapterWriter 批量写入', 'writer')):
+        elapsed = min(run(mode) for _ in range(number))
+        print(f'  {label:<36} {chapters / elapsed:8.0f} 章/秒')
+
+
+def _novel_text(rng, chars):
+    """用常用词随机拼出近似真实小说的正文（重复度接近真实文本，不会被压缩成几个字节）"""
+    words = ('他', '她', '推开', '门', '夜雨', '灌了进来', '灯火', '摇晃', '远处', '传来', '几声',
+             '犬吠', '师父', '说道', '少年', '沉默', '片刻', '终于', '山门', '石阶', '一级一级',
+             '往上走', '风', '剑', '江湖', '客栈', '掌柜', '笑了笑', '却', '没有', '回答', '只是',
+             '看着', '窗外', '月色', '心中', '暗道', '不好', '转身', '便', '走', '“', '”', '，', '。', '！')
+    parts, length = [], 0
+    while length < chars:
+        sentence = ''.join(rng.choice(words) for _ in range(rng.randint(6, 16))) + '。'
+        if rng.random() < 0.2:
+            sentence += '\n　　'
+        parts.append(sentence)
+        length += len(sentence)
+    return ''.join(parts)
+
+
+@benchmark
+def chapter_compression(number=3, chapters=1000):
+    """1000 章小说：数据库大小与读取全部章节（导出）耗时，不压缩 vs zlib（vs zstd）"""
+    import random
+    import database
+
+    rng = random.Random(0)
+    texts = [_novel_text(rng, 3000) for _ in range(chapters)]
+    codecs = [database.CODEC_NONE, database.CODEC_ZLIB]
+    if database.zstandard is not None:
+        codecs.append(database.CODEC_ZSTD)
+
+    print(f'== chapter_compression（{chapters} 章，每章约 3000 字） ==')
+    for codec in codecs:
+        db = _temp_database()
+        db.save_novel('bench', '测试', '作者', '', '')
+        db.save_chapters([('bench', f'c{i}', f'第{i}章', None, i + 1, text, len(text))
+                          for i, text in enumerate(texts)])
+        db.compress_existing_chapters(codec)
+        assert [c['content'] for c in db.get_chapters('bench')] == texts
+        elapsed = timeit.timeit(lambda: db.get_chapters('bench'), number=number) / number
+        db.close()
+        size = os.path.getsize(db.db_path)
+        print(f'  {codec:<36} {size / 1048576:8.1f} MB   读取全部章节 {elapsed * 1000:8.1f} ms')
+
+
+
+@benchmark
+def library_search(number=20, novels=20, chapters=250):
+    """本地书库搜索：LIKE 全表扫描 vs FTS5 trigram 索引"""
+    import random
+
+    rng = random.Random(0)
+    db = _temp_database()
+    for n in range(novels):
+        db.save_novel(f'n{n}', f'测试{n}', '作者', '', '')
+        db.save_chapters([(f'n{n}', f'n{n}c{i}', f'第{i}章', None, i + 1, _novel_text(rng, 3000), 3000)
+                          for i in range(chapters)])
+    db.save_chapter('n3', 'needle', '第999章', 999, _novel_text(rng, 1000) + '青铜门后的长明灯' + _novel_text(rng, 1000), 2000)
+    keyword = '青铜门后的长明灯'
+
+    def like_scan():
+        with db.get_connection() as conn:
+            return conn.execute('SELECT chapter_id FROM chapters WHERE decode_chapter(content, content_codec) LIKE ?',
+                                (f'%{keyword}%',)).fetchall()
+
+    def fts():
+        return db.search_chapters(keyword)
+
+    assert [r[0] for r in like_scan()] == [r['chapter_id'] for r in fts()] == ['needle']
+    size = os.path.getsize(db.db_path) + os.path.getsize(db.db_path + '-wal')
+    _report(f'library_search（{novels * chapters + 1} 章，数据库 {size / 1048576:.0f} MB）', {
+        'LIKE 全表扫描': like_scan,
+        'FTS5 trigram + 摘要': fts,
+    }, number)
+    db.close()
+
+
+
+
+@benchmark
+def export_txt(number=3, chapters=3000):
+    """导出 TXT：fetchall 全部章节后逐段写入 vs 游标分批读取 + 大缓冲写入"""
+    import random
+    import tempfile
+    from downloader import NovelDownloader
+
+    rng = random.Random(0)
+    db = _temp_database()
+    db.save_novel('bench', '测试', '作者', '', '')
+    db.save_chapters([('bench', f'c{i}', f'第{i}章', None, i + 1, _novel_text(rng, 3000), 3000)
+                      for i in range(chapters)])
+    downloader = NovelDownloader.__new__(NovelDownloader)
+    downloader.db, downloader.download_ranges = db, {}
+    out_dir = tempfile.mkdtemp()
+    sink = open(os.devnull, 'w')
+
+    def fetchall_export():
+        # 旧实现：一次取出全部章节，每章 5 次小写入
+        with open(os.path.join(out_dir, 'old.txt'), 'w', encoding='utf-8') as f:
+            for chapter in db.get_chapters('bench'):
+                chapter_dict = dict(chapter)
+                f.write(f"\n{'=' * 30}\n")
+                f.write(f"{chapter_dict['chapter_title'].strip()}\n")
+                f.write(f"{'=' * 30}\n")
+                f.write(chapter_dict['content'])
+                f.write("\n")
+
+    def streaming_export():
+        stdout, sys.stdout = sys.stdout, sink
+        try:
+            assert downloader.export_to_txt('bench', out_dir)
+        finally:
+            sys.stdout = stdout
+
+    _report(f'export_txt（{chapters} 章，约 {chapters * 9 // 1024} MB）', {
+        'fetchall + 逐段写入': fetchall_export,
+        '游标分批读取 + 1MB 写缓冲': streaming_export,
+    }, number)
+
+    # 去除空行：旧写法（两次列表推导）vs filter/map 单次遍历
+    contents = [c['content'] for c in db.get_chapters_range('bench', 1, 300)]
+
+    def list_comprehension():
+        for text in contents:
+            cleaned = [line.strip() for line in text.split('\n')]
+            '\n'.join([line for line in cleaned if line])
+
+    def filter_map():
+        for text in contents:
+            NovelDownloader._clean_empty_lines(text)
+
+    _report('export_txt 去除空行（300 章）', {
+        '列表推导': list_comprehension,
+        'filter + map': filter_map,
+    }, number * 10)
+    db.close()
+
+
+
+@benchmark
+def epub(number=1, chapters=5000, appended=50):
+    """EPUB：5000 章流式写入的耗时和峰值内存；追加新章节（只重写目录）vs 重新生成整本书"""
+    import random
+    import shutil
+    import tempfile
+    from epub_writer import EpubWriter
+
+    rng = random.Random(0)
+    texts = [_novel_text(rng, 3000) for _ in range(20)]  # 循环使用，避免生成 5000 章正文占用内存
+    out_dir = tempfile.mkdtemp()
+    path = os.path.join(out_dir, 'book.epub')
+
+    def write_book(count):
+        with EpubWriter(path, '测试', '作者') as writer:
+            for i in range(count):
+                writer.add_chapter(f'第{i + 1}章', texts[i % len(texts)], order=i)
+
+    def full_rebuild():
+        write_book(chapters + appended)
+
+    def append_new():
+        shutil.copyfile(base, path)
+        with EpubWriter(path, '测试', append=True) as writer:
+            for i in range(chapters, chapters + appended):
+                writer.add_chapter(f'第{i + 1}章', texts[i % len(texts)], order=i)
+
+    _report(f'epub（流式写入 {chapters} 章）', {'EpubWriter': lambda: write_book(chapters)}, number)
+    base = os.path.join(out_dir, 'base.epub')
+    shutil.copyfile(path, base)
+    print(f'  文件大小 {os.path.getsize(base) / 1048576:.1f} MB')
+    _report(f'epub（更新 {appended} 章）', {
+        '重新生成整本书': full_rebuild,
+        '追加新章节': append_new,
+    }, number)
+
+
+
+@benchmark
+def txt_merge(number=3, chapters=3000, delta=20):
+    """更新 TXT：按索引追加新章节 / 一次顺序重写插入缺失章节 / 重新写出整本书"""
+    import random
+    import shutil
+    import tempfile
+    from txt_index import chapter_block, merge_txt, write_txt
+
+    rng = random.Random(0)
+    texts = [_novel_text(rng, 3000) for _ in range(20)]
+
+    def block(i):
+        return i, f'c{i}', chapter_block(f'第{i + 1}章', texts[i % len(texts)])
+
+    out_dir = tempfile.mkdtemp()
+    base, path = os.path.join(out_dir, 'base.txt'), os.path.join(out_dir, 'book.txt')
+    gaps = set(range(0, chapters, chapters // delta))
+    write_txt(base, '书名: 测试\n', [block(i) for i in range(chapters) if i not in gaps])
+
+    def restore():
+        shutil.copyfile(base, path)
+        shutil.copyfile(base + '.idx.json', path + '.idx.json')
+
+    def append_new():
+        restore()
+        assert merge_txt(path, '', [block(i) for i in range(chapters, chapters + delta)]) == 'append'
+
+    def insert_gaps():
+        restore()
+        assert merge_txt(path, '', [block(i) for i in sorted(gaps)]) == 'rewrite'
+
+    def rewrite_all():
+        restore()
+        write_txt(path, '书名: 测试\n', [block(i) for i in range(chapters + delta)])
+
+    _report(f'txt_merge（{chapters} 章，约 {os.path.getsize(base) // 1048576} MB，更新 {delta} 章）', {
+        '基线：只复制原文件（各项都包含）': restore,
+        '追加新章节': append_new,
+        '插入缺失章节（一次顺序重写）': insert_gaps,
+        '重新写出整本书': rewrite_all,
+    }, number)
+
+
+# 热点查询及其应使用的索引（EXPLAIN QUERY PLAN 中必须出现，且不能再用临时 B 树排序）
+QUERY_PLANS = (
+    ('SELECT * FROM chapters WHERE novel_id = ? AND chapter_index >= ? AND chapter_index <= ? '
+     'ORDER BY chapter_index ASC', ('n', 1, 50), 'idx_chapters_novel_index'),
+    ("SELECT chapter_ids_json, completed_ids_json FROM download_tasks WHERE novel_id = ? "
+     "AND status IN ('completed', 'partial') ORDER BY updated_at DESC LIMIT 1", ('n',),
+     'idx_tasks_novel_updated'),
+    ('SELECT * FROM favorites ORDER BY created_at DESC', (), 'idx_favorites_created'),
+    ('SELECT * FROM download_history ORDER BY created_at DESC LIMIT ?', (100,), 'idx_history_created'),
+)
+
+
+@benchmark
+def batch_export(number=1, novels=8, chapters=600):
+    """批量导出书库：逐本调用 export_to_txt vs export_batch 多进程导出；内容没有变化时再次导出（全部跳过）"""
+    import random
+    import tempfile
+    from downloader import NovelDownloader
+
+    rng = random.Random(0)
+    db = _temp_database()
+    texts = [_novel_text(rng, 3000) for _ in range(20)]
+    novel_ids = [f'n{n}' for n in range(novels)]
+    for novel_id in novel_ids:
+        db.save_novel(novel_id, f'测试{novel_id}', '作者', '', '')
+        db.save_chapters([(novel_id, f'{novel_id}c{i}', f'第{i}章', None, i + 1, texts[i % len(texts)], 3000)
+                          for i in range(chapters)])
+    downloader = NovelDownloader.__new__(NovelDownloader)
+    downloader.db, downloader.download_ranges = db, {}
+    sink = open(os.devnull, 'w')
+
+    def quiet(func):
+        def run():
+            stdout, sys.stdout = sys.stdout, sink
+            try:
+                func()
+            finally:
+                sys.stdout = stdout
+        return run
+
+    def sequential():
+        out_dir = tempfile.mkdtemp()
+        for novel_id in novel_ids:
+            assert downloader.export_to_txt(novel_id, os.path.join(out_dir, f'{novel_id}.txt'))
+
+    workers = max(2, min(os.cpu_count() or 1, 4))  # 单核机器上也测一次多进程路径
+
+    def batch(max_workers):
+        def run():
+            summary = downloader.export_batch(novel_ids, tempfile.mkdtemp(), 'txt', max_workers=max_workers)
+            assert len(summary['exported']) == novels
+        return run
+
+    reused_dir = tempfile.mkdtemp()
+    quiet(lambda: downloader.export_batch(novel_ids, reused_dir, 'txt'))()
+
+    def unchanged():
+        summary = downloader.export_batch(novel_ids, reused_dir, 'txt')
+        assert len(summary['skipped']) == novels
+
+    _report(f'batch_export（{novels} 本 × {chapters} 章）', {
+        '逐本导出': quiet(sequential),
+        'export_batch 单进程': quiet(batch(1)),
+        f'export_batch {workers} 进程': quiet(batch(workers)),
+        'export_batch 内容未变（跳过）': quiet(unchanged),
+    }, number)
+    db.close()
+
+
+
+@benchmark
+def schema(number=200):
+    """启动时的结构检查：已是最新版本（只读 user_version）vs 重新执行全部迁移；并校验热点查询的索引"""
+    db = _temp_database()
+    print('== schema（热点查询使用的索引） ==')
+    with db.get_connection() as conn:
+        for sql, args, index in QUERY_PLANS:
+            plan = ' | '.join(row['detail'] for row in conn.execute('EXPLAIN QUERY PLAN ' + sql, args))
+            assert index in plan and 'TEMP B-TREE' not in plan, f'{sql}\n  -> {plan}'
+            print(f'  {index:<36} {plan}')
+
+    def up_to_date():
+        db.init_database()
+
+    def rerun_migrations():
+        # 旧实现每次启动都要执行的工作：全部 CREATE IF NOT EXISTS + PRAGMA table_info 检查
+        db.get_connection().execute('PRAGMA user_version = 0')
+        db.init_database()
+
+    _report('schema（NovelDatabase 初始化）', {
+        '执行全部迁移（旧数据库/旧实现）': rerun_migrations,
+        '已是最新版本': up_to_date,
+    }, number)
+    db.close()
+
+
+
+@benchmark
+def metadata_cache(number=200, covers=200):
+    """封面批量查询：逐条查 kv_cache / 一次查询 / LRU 命中；以及过期条目的读取延迟（后台刷新，不等待网络）"""
+    from database import MetadataCache, cover_cache_key
+
+    db = _temp_database()
+    keys = [cover_cache_key('biquge', i) for i in range(covers)]
+    db.cache_set_many('cover', {key: f'https://img.example.com/{key}.jpg' for key in keys}, 3600)
+
+    def per_row():
+        # 旧实现：prefetch_covers 对每本书单独查询一次封面表
+        return {key: db.cache_get('cover', key) for key in keys}
+
+    def batch_cold():
+        return MetadataCache(db).peek_many('cover', keys)
+
+    warm = MetadataCache(db)
+    warm.peek_many('cover', keys)
+
+    def batch_warm():
+        return warm.peek_many('cover', keys)
+
+    assert len(per_row()) == len(batch_cold()) == len(batch_warm()) == covers
+    _report(f'metadata_cache（{covers} 个封面）', {
+        '逐条查询 kv_cache': per_row,
+        '一次查询（LRU 未命中）': batch_cold,
+        'LRU 命中': batch_warm,
+    }, number)
+
+    def slow_loader():
+        time.sleep(0.2)  # 模拟抓取排行榜
+        return ['fresh']
+
+    cache = MetadataCache(db)
+    cache.set('rankings', 'all', ['stale'], ttl=-1)
+    start = time.perf_counter()
+    value = cache.get('rankings', 'all', slow_loader, ttl=3600)
+    stale_ms = (time.perf_counter() - start) * 1000
+    start = time.perf_counter()
+    cache.get('rankings', 'missing', slow_loader, ttl=3600)
+    miss_ms = (time.perf_counter() - start) * 1000
+    assert value == ['stale']
+    print(f'  过期条目（立即返回旧值）             {stale_ms:8.3f} ms')
+    print(f'  未缓存（同步抓取）                   {miss_ms:8.3f} ms')
+    db.close()
+
+
+
+@benchmark
+def search_cache(number=20, latency=0.05):
+    """多源搜索：每次请求各源 vs 各源结果缓存命中（关键词写法不同也命中）"""
+    import database
+    from database import MetadataCache
+    from sources import NovelInfo
+    import sources.multi_source as multi_source
+
+    class FakeSource:
+        supports_search = True
+
+        def __init__(self, key):
+            self.key = key
+
+        def search_novel(self, keyword):
+            time.sleep(latency)  # 模拟站点响应时间
+            return [NovelInfo(novel_id=f'{self.key}{i}', title=f'{keyword}{i}', author='作者')
+                    for i in range(5)]
+
+    db = _temp_database()
+    cache = MetadataCache(db)
+    patched = {
+        (multi_source, 'get_shared_source'): FakeSource,
+        (database, 'get_metadata_cache'): lambda db=None: cache,
+    }
+    originals = {target: getattr(*target) for target in patched}
+    for (module, name), value in patched.items():
+        setattr(module, name, value)
+    try:
+        def uncached():
+            cache.invalidate(multi_source.SEARCH_CACHE_NAMESPACE)
+            return multi_source.search_all_sources('斗破苍穹')
+
+        def cached():
+            return multi_source.search_all_sources(' 《斗破苍穹》')
+
+        assert len(uncached()) == len(cached()) == 5 * (len(multi_source.SEARCHABLE_SOURCES) + 1)
+        _report(f'search_cache（{len(multi_source.SEARCHABLE_SOURCES) + 1} 个源，每次请求 {latency * 1000:.0f} ms）', {
+            '每次请求各源': uncached,
+            '缓存命中': cached,
+        }, number)
+    finally:
+        for (module, name), value in originals.items():
+            setattr(module, name, value)
+        db.close()
+
+
+
+@benchmark
+def bing_parse(number=50, items=10):
+    """Bing 结果页解析：BeautifulSoup 遍历整页 vs lxml XPath 只定位结果链接"""
+    from bs4 import BeautifulSoup
+    from sources.bing_search import _parse_results
+
+    # 结果页的主体是脚本、样式和侧栏，10 条结果只占一小部分
+    filler = ''.join(f'<div class="b_side"><span>推荐 {i}</span><a href="/x{i}">链接</a></div>' for i in range(800))
+    results = ''.join(
+        f'<li class="b_algo"><div class="b_title"><h2><a href="https://www.mayiwsk.com/{i}_{i}/">'
+        f'斗破<strong>苍穹</strong> 第{i}条</a></h2></div><p>简介……</p></li>'
+        for i in range(items)
+    )
+    page = (f'<html><head><meta charset="utf-8"><script>{"var a=1;" * 5000}</script></head>'
+            f'<body><ol id="b_results">{results}</ol>{filler}</body></html>').encode('utf-8')
+
+    def soup():
+        found = []
+        for item in BeautifulSoup(page, 'lxml').find_all('li', class_='b_algo'):
+            a = item.find('h2').find('a')
+            found.append((a.get_text(strip=True), a.get('href', '')))
+        return found
+
+    def xpath():
+        return _parse_results(page, 'utf-8')
+
+    assert soup() == xpath()
+    _report(f'bing_parse（{len(page) // 1024} KB，{items} 条结果）', {
+        'BeautifulSoup': soup,
+        'lxml XPath': xpath,
+    }, number)
+
+
+
+@benchmark
+def catalog_suggest(number=200, books=20000):
+    """输入联想：书目索引（n-gram / 拼音首字母）在 2 万本书中查找单字、两字、片段和首字母"""
+    import random
+
+    rng = random.Random(0)
+    chars = '天地玄黄宇宙洪荒日月盈昃辰宿列张寒来暑往秋收冬藏云腾致雨露结为霜金生丽水玉出昆冈剑号巨阙珠称夜光'
+    db = _temp_database()
+    entries = [('biquge', str(i), ''.join(rng.choice(chars) for _ in range(rng.randint(3, 8))),
+                ''.join(rng.choice(chars) for _ in range(3)), '') for i in range(books)]
+    for i in range(0, books, 500):
+        db.catalog_add_many(entries[i:i + 500])
+    title = entries[0][2]
+
+    _report(f'catalog_suggest（{books} 本书）', {
+        '单字': lambda: db.catalog_suggest(title[0]),
+        '两字前缀': lambda: db.catalog_suggest(title[:2]),
+        '书名片段': lambda: db.catalog_suggest(title[1:]),
+        '拼音首字母': lambda: db.catalog_suggest('tdx'),
+    }, number)
+    db.close()
+
+
+
+@benchmark
+def book_identity(number=2000, books=20000):
+    """跨源书籍对应表：在 2 万本书（每本 6 个源）中按书名+作者查找各源 novel_id"""
+    import random
+
+    rng = random.Random(0)
+    chars = '天地玄黄宇宙洪荒日月盈昃辰宿列张寒来暑往秋收冬藏云腾致雨露结为霜金生丽水玉出昆冈剑号巨阙珠称夜光'
+    db = _temp_database()
+    sources = ('biquge', 'sto66', 'dingdian', 'bxwx', 'qianbi', 'haitang')
+    titles = [(''.join(rng.choice(chars) for _ in range(rng.randint(3, 8))),
+               ''.join(rng.choice(chars) for _ in range(3))) for _ in range(books)]
+    db.save_book_identities([(title, author, sk, f'{sk}{i}', 0.8)
+                             for i, (title, author) in enumerate(titles) for sk in sources])
+    title, author = titles[books // 2]
+
+    _report(f'book_identity（{books} 本书）', {
+        '书名+作者': lambda: db.get_book_identity(title, author),
+        '只有书名': lambda: db.get_book_identity(title),
+        '未收录': lambda: db.get_book_identity('不存在的书', author),
+    }, number)
+    db.close()
+
+if __name__ == '__main__':
+    filters = sys.argv[1:]
+    for bench_name, bench in BENCHMARKS.items():
+        if not filters or any(f in bench_name for f in filters):
+            bench()
@@ -65,7 +65,8 @@ MAX_DELAY = 20.0  # 最大延迟时间（秒）
 MAX_CONCURRENT_REQUESTS = 2  # 最大并发请求数，避免在同一IP下进行大量并发请求
 
 # 输出格式配置
-OUTPUT_FORMAT = 'txt'  # txt 或 epub
+OUTPUT_FORMAT = 'txt'  # txt 或 epub（默认值，可在设置中修改）
+OUTPUT_FORMAT_CHOICES = ('txt', 'epub')
 
 # 源选择配置
 SOURCE_ASK = "ask"  # 每次询问
@@ -106,6 +107,9 @@ CONFIG_FILE = os.path.join(BASE_DIR, 'config.json')
 DEFAULT_CONCURRENT_DOWNLOADS = 3
 MAX_CONCURRENT_DOWNLOADS = 10
 
+# 章节正文压缩方式：none（不压缩）、zlib、zstd（需安装 zstandard）
+CHAPTER_COMPRESSION_CHOICES = ('none', 'zlib', 'zstd')
+
 def load_config():
     """从配置文件加载配置"""
     config = {
@@ -114,6 +118,10 @@ def load_config():
         'remember_source_choice': False,  # 是否记住源选择
         'download_speed': DEFAULT_DOWNLOAD_SPEED,  # 下载速度倍数
         'remove_empty_lines': False,  # 导出时是否去除空行（默认不去除）
+        'parse_in_processes': False,  # 批量下载时是否用子进程解析章节（默认关闭）
+        'font_ocr': False,  # 番茄字体解密是否对未知字形做 OCR（需安装 ddddocr，默认关闭）
+        'chapter_compression': 'none',  # 章节正文在数据库中的压缩方式（默认不压缩）
+        'output_format': OUTPUT_FORMAT,  # 下载/导出的文件格式：txt 或 epub
     }
     if os.path.exists(CONFIG_FILE):
         try:
@@ -158,6 +166,56 @@ def set_remove_empty_lines(value):
     config['remove_empty_lines'] = bool(value)
     return save_config(config)
 
+def get_parse_in_processes():
+    """批量下载时是否把章节解析放到子进程中执行"""
+    config = load_config()
+    return bool(config.get('parse_in_processes', False))
+
+def set_parse_in_processes(value):
+    """设置批量下载时是否用子进程解析章节"""
+    config = load_config()
+    config['parse_in_processes'] = bool(value)
+    return save_config(config)
+
+def get_font_ocr():
+    """番茄字体解密时是否对映射表中缺少的字形做 OCR 识别"""
+    config = load_config()
+    return bool(config.get('font_ocr', False))
+
+def set_font_ocr(value):
+    """设置番茄字体解密是否启用 OCR"""
+    config = load_config()
+    config['font_ocr'] = bool(value)
+    return save_config(config)
+
+def get_chapter_compression():
+    """章节正文在数据库中的压缩方式：'none'、'zlib' 或 'zstd'"""
+    config = load_config()
+    value = config.get('chapter_compression', 'none')
+    return value if value in CHAPTER_COMPRESSION_CHOICES else 'none'
+
+def set_chapter_compression(value):
+    """设置章节正文的压缩方式"""
+    if value not in CHAPTER_COMPRESSION_CHOICES:
+        return False
+    config = load_config()
+    config['chapter_compression'] = value
+    return save_config(config)
+
+def get_output_format():
+    """获取下载/导出的文件格式（txt 或 epub）"""
+    config = load_config()
+    value = config.get('output_format', OUTPUT_FORMAT)
+    return value if value in OUTPUT_FORMAT_CHOICES else OUTPUT_FORMAT
+
+def set_output_format(value):
+    """设置下载/导出的文件格式"""
+    if value not in OUTPUT_FORMAT_CHOICES:
+        return False
+    config = load_config()
+    config['output_format'] = value
+    return save_config(config)
+
 def load_cookies():
     """从 cookies.txt 文件加载 Cookie"""
     cookies = {}
@@ -2,198 +2,695 @@
 import sqlite3
 import os
 import json
+import hashlib
+import queue
 import threading
-from config import DATABASE_PATH
+import time
+import zlib
+from collections import OrderedDict
+from config import DATABASE_PATH, get_chapter_compression
+from pinyin_initials import initials as pinyin_initials
+
+try:
+    import zstandard
+except ImportError:  # 可选依赖，未安装时 zstd 回退到 zlib
+    zstandard = None
+
+
+# 每个连接创建时执行一次的 PRAGMA
+CONNECTION_PRAGMAS = (
+    'PRAGMA journal_mode=WAL',  # WAL 模式，读写互不阻塞（多线程下载时避免 database is locked）
+    'PRAGMA synchronous=NORMAL',  # WAL 下只在检查点时 fsync，断电最多丢失最近的事务，不会损坏数据库
+    'PRAGMA mmap_size=268435456',  # 256MB 内存映射读取
+    'PRAGMA cache_size=-16000',  # 每个连接约 16MB 页缓存
+    'PRAGMA temp_store=MEMORY',  # 排序/临时表放在内存中
+)
+# 每个连接缓存的预编译语句数（sqlite3 模块按 SQL 文本复用语句）
+CACHED_STATEMENTS = 256
+
+# ChapterWriter：每个事务最多写入的章节数
+CHAPTER_BATCH_SIZE = 64
+# ChapterWriter：收到第一章后最多再等待多久凑批（秒）
+CHAPTER_BATCH_DELAY = 0.05
+# ChapterWriter：队列中最多积压的章节数，写入跟不上时阻塞下载线程，避免正文堆积在内存里
+CHAPTER_QUEUE_SIZE = 512
+# iter_chapters：每次从游标取出的章节数
+CHAPTER_FETCH_SIZE = 64
+
+# kv_cache 表的总大小上限（按 value 字节数计），超出后淘汰最早获取的条目
+KV_CACHE_MAX_BYTES = 32 * 1024 * 1024
+# 每写入多少次检查一次 kv_cache 大小
+KV_CACHE_EVICT_EVERY = 64
+# MetadataCache：进程内 LRU 最多保留的条目数
+METADATA_LRU_SIZE = 1024
+# MetadataCache：后台刷新失败后，多久之内不再重试（秒，期间继续返回过期值）
+METADATA_RETRY_DELAY = 60
+# 封面缓存的命名空间和有效期（封面极少变化）
+COVER_CACHE_NAMESPACE = 'cover'
+COVER_CACHE_TTL = 30 * 24 * 3600
+
+# 书目索引：见过的书（搜索结果、排行榜、收藏、下载历史）最多保留的条数，超出时删除最久未见的
+CATALOG_MAX_ENTRIES = 50000
+# 每写入多少批检查一次条数上限
+CATALOG_PRUNE_EVERY = 64
+# 输入联想时每种键（n-gram / 拼音首字母）最多取出的候选条数
+CATALOG_CANDIDATES = 200
+
+# 跨源书籍对应表中记录"已在所有源查找过"的条目所用的 source
+BOOK_IDENTITY_ALL_SOURCES = '*'
+
+
+# ============== 章节压缩 ==============
+
+# chapters.content_codec 取值：NULL 表示未压缩的文本，'zlib'，'zstd'，或 'zstd:<字典ID>'
+CODEC_NONE = 'none'
+CODEC_ZLIB = 'zlib'
+CODEC_ZSTD = 'zstd'
+ZLIB_LEVEL = 6
+ZSTD_LEVEL = 9
+# 短于该字节数的正文不压缩（压缩头开销大于收益）
+MIN_COMPRESS_BYTES = 256
+# zstd 字典：大小、训练用的样本章节数，以及样本不足时不训练
+ZSTD_DICT_SIZE = 112 * 1024
+ZSTD_DICT_SAMPLES = 2000
+ZSTD_DICT_MIN_SAMPLES = 200
+
+# ============== 章节全文搜索 ==============
+
+# search_chapters 返回的摘要中标记命中文字的起止字符
+SNIPPET_OPEN = '\x02'
+SNIPPET_CLOSE = '\x03'
+# 摘要长度（trigram 分词下约等于字数）
+SNIPPET_TOKENS = 24
+# trigram 索引只能匹配至少 3 个字符的词，更短的词走 LIKE 扫描
+FTS_MIN_TERM_LENGTH = 3
+
+
+class ChapterCodec:
+    """章节正文编解码
+
+    压缩后的正文以 BLOB 存在原 content 列中，content_codec 列记录压缩方式。
+    zstd 可以使用在已下载章节上训练的字典（中文小说的常用字、标点、段落格式高度重复，
+    单章也能压得更小）；字典保存在 chapter_dicts 表中，按 ID 引用。
+    """
+
+    def __init__(self, load_dict):
+        self._load_dict = load_dict  # dict_id -> 字典字节
+        self._dicts = {}
+        self._local = threading.local()  # zstd 压缩/解压对象不是线程安全的，每个线程各建一份
+
+    @staticmethod
+    def resolve(codec):
+        """把配置的压缩方式规范化；未安装 zstandard 时 zstd 回退到 zlib"""
+        if codec == CODEC_ZSTD and zstandard is None:
+            return CODEC_ZLIB
+        return codec if codec in (CODEC_ZLIB, CODEC_ZSTD) else CODEC_NONE
+
+    def _dict_data(self, dict_id):
+        data = self._dicts.get(dict_id)
+        if data is None:
+            data = zstandard.ZstdCompressionDict(self._load_dict(dict_id))
+            self._dicts[dict_id] = data
+        return data
+
+    def _zstd(self, kind, dict_id):
+        cache = getattr(self._local, kind, None)
+        if cache is None:
+            cache = {}
+            setattr(self._local, kind, cache)
+        obj = cache.get(dict_id)
+        if obj is None:
+            kwargs = {'dict_data': self._dict_data(dict_id)} if dict_id is not None else {}
+            if kind == 'compressor':
+                obj = zstandard.ZstdCompressor(level=ZSTD_LEVEL, **kwargs)
+            else:
+                obj = zstandard.ZstdDecompressor(**kwargs)
+            cache[dict_id] = obj
+        return obj
+
+    def encode(self, text, codec, dict_id=None):
+        """压缩正文
+
+        Returns:
+            (存入 content 列的值, content_codec 列的值)
+        """
+        if codec == CODEC_NONE or not text:
+            return text, None
+        data = text.encode('utf-8')
+        if len(data) < MIN_COMPRESS_BYTES:
+            return text, None
+        if codec == CODEC_ZSTD:
+            blob = self._zstd('compressor', dict_id).compress(data)
+            marker = CODEC_ZSTD if dict_id is None else f'{CODEC_ZSTD}:{dict_id}'
+        else:
+            blob = zlib.compress(data, ZLIB_LEVEL)
+            marker = CODEC_ZLIB
+        return sqlite3.Binary(blob), marker
+
+    def decode(self, value, marker):
+        """按 content_codec 解压正文"""
+        if not marker or value is None:
+            return value
+        if marker == CODEC_ZLIB:
+            return zlib.decompress(value).decode('utf-8')
+        name, _, dict_id = marker.partition(':')
+        if name == CODEC_ZSTD:
+            if zstandard is None:
+                raise RuntimeError('章节使用 zstd 压缩，请先安装 zstandard（pip install zstandard）')
+            return self._zstd('decompressor', int(dict_id) if dict_id else None).decompress(value).decode('utf-8')
+        raise ValueError(f'未知的章节压缩方式: {marker}')
 
 
 class NovelDatabase:
-    def __init__(self):
-        self.db_path = DATABASE_PATH
+    def __init__(self, db_path=None):
+        self.db_path = db_path or DATABASE_PATH
         self._lock = threading.Lock()
+        # 线程本地长连接：每个线程首次访问时创建，之后复用
+        self._local = threading.local()
+        self._connections = {}  # {线程 ident: 连接}，用于关闭连接和回收已结束线程的连接
+        self._connections_lock = threading.Lock()
+        self._generation = 0  # close() 后递增，使各线程缓存的旧连接失效
+        self._codec = ChapterCodec(self._load_chapter_dict)
+        self._fts_enabled = None  # 是否已建立章节全文索引，首次搜索时检查
+        self._kv_writes = 0  # 距上次检查 kv_cache 大小以来的写入次数
+        self._catalog_writes = 0  # 书目索引写入批数（用于定期检查条数上限）
         self.init_database()
-        # 启用 WAL 模式，提升并发读写性能（多线程下载时避免 database is locked）
-        with self.get_connection() as conn:
-            conn.execute('PRAGMA journal_mode=WAL')
+        self._chapter_dict_id = self._latest_chapter_dict_id()
+        self.chapter_compression = ChapterCodec.resolve(get_chapter_compression())
 
     def get_connection(self):
-        """获取数据库连接（支持多线程）"""
-        # check_same_thread=False 允许在不同线程中使用连接
-        conn = sqlite3.connect(self.db_path, check_same_thread=False, timeout=30)
+        """获取当前线程的数据库连接
+
+        每个线程一个长连接，PRAGMA 只在创建时设置一次，预编译语句随连接复用。
+        调用方仍使用 `with self.get_connection() as conn:`，
+        退出时只提交/回滚事务，不会关闭连接。
+        """
+        local = self._local
+        conn = getattr(local, 'conn', None)
+        if conn is not None and local.generation == self._generation:
+            return conn
+
+        # check_same_thread=False 允许 close() 在其他线程中关闭连接
+        conn = sqlite3.connect(self.db_path, check_same_thread=False, timeout=30,
+                               cached_statements=CACHED_STATEMENTS)
         conn.row_factory = sqlite3.Row
+        # 本地搜索的 LIKE 扫描通过该函数读取（可能已压缩的）章节正文；只在查询中使用，
+        # 视图、触发器等结构中不能引用（其他连接没有这个函数）
+        conn.create_function('decode_chapter', 2, self._codec.decode, deterministic=True)
+        for pragma in CONNECTION_PRAGMAS:
+            conn.execute(pragma)
+        self._register_connection(conn)
+        local.conn = conn
+        local.generation = self._generation
         return conn
 
+    def _register_connection(self, conn):
+        """登记新连接，并关闭已结束线程遗留的连接（下载线程池会不断创建新线程）"""
+        current = threading.get_ident()
+        alive = {t.ident for t in threading.enumerate()}
+        with self._connections_lock:
+            for ident, old in list(self._connections.items()):
+                if ident == current or ident not in alive:
+                    del self._connections[ident]
+                    try:
+                        old.close()
+                    except sqlite3.Error:
+                        pass
+            self._connections[current] = conn
+
+    def close(self):
+        """关闭所有线程的数据库连接（之后再访问会自动重新连接）"""
+        with self._connections_lock:
+            self._generation += 1
+            connections = list(self._connections.values())
+            self._connections.clear()
+        for conn in connections:
+            try:
+                conn.close()
+            except sqlite3.Error:
+                pass
+
     def init_database(self):
-        """初始化数据库表"""
-        with self.get_connection() as conn:
-            cursor = conn.cursor()
+        """按 PRAGMA user_version 执行尚未执行过的结构迁移
 
-            # 小说表
-            cursor.execute('''
-                CREATE TABLE IF NOT EXISTS novels (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    novel_id TEXT UNIQUE NOT NULL,
-                    title TEXT NOT NULL,
-                    author TEXT,
-                    description TEXT,
-                    cover_url TEXT,
-                    word_count INTEGER DEFAULT 0,
-                    chapter_count INTEGER DEFAULT 0,
-                    status TEXT DEFAULT '未下载',
-                    source TEXT DEFAULT 'official',
-                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-                )
-            ''')
+        已是最新版本时只需读取一次 user_version。迁移在一个 IMMEDIATE 事务中执行，
+        多个实例同时启动时只有一个会真正执行，其余等待后读到新版本直接跳过。
+        """
+        migrations = self._schema_migrations()
+        conn = self.get_connection()
+        if conn.execute('PRAGMA user_version').fetchone()[0] >= len(migrations):
+            return
+        with self._lock, conn:
+            conn.execute('BEGIN IMMEDIATE')
+            version = conn.execute('PRAGMA user_version').fetchone()[0]
+            cursor = conn.cursor()
+            for number, migrate in enumerate(migrations[version:], version + 1):
+                migrate(cursor)
+                cursor.execute(f'PRAGMA user_version = {number}')
 
-            # 为旧数据库添加 source 字段（如果不存在）
-            cursor.execute('PRAGMA table_info(novels)')
-            columns = [col[1] for col in cursor.fetchall()]
-            if 'source' not in columns:
-                cursor.execute('ALTER TABLE novels ADD COLUMN source TEXT DEFAULT "official"')
-                conn.commit()
-            
-            # 章节表
-            cursor.execute('''
-                CREATE TABLE IF NOT EXISTS chapters (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    novel_id TEXT NOT NULL,
-                    chapter_id TEXT UNIQUE NOT NULL,
-                    chapter_title TEXT NOT NULL,
-                    original_title TEXT,
-                    chapter_index INTEGER NOT NULL,
-                    content TEXT,
-                    word_count INTEGER DEFAULT 0,
-                    status TEXT DEFAULT '未下载',
-                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                    FOREIGN KEY (novel_id) REFERENCES novels(novel_id)
-                )
-            ''')
+    def _schema_migrations(self):
+        """结构迁移列表，第 N 项把数据库从版本 N-1 升级到 N
 
-            # 为旧数据库添加 original_title 字段（如果不存在）
-            cursor.execute('PRAGMA table_info(chapters)')
-            columns = [col[1] for col in cursor.fetchall()]
-            if 'original_title' not in columns:
-                cursor.execute('ALTER TABLE chapters ADD COLUMN original_title TEXT')
-                conn.commit()
-            
-            # 创建索引
-            cursor.execute('CREATE INDEX IF NOT EXISTS idx_novel_id ON chapters(novel_id)')
-            cursor.execute('CREATE INDEX IF NOT EXISTS idx_chapter_id ON chapters(chapter_id)')
+        只能在末尾追加新迁移，不要修改已发布的迁移。
+        v1 要兼容没有 user_version 的旧数据库（表和字段可能已部分存在），因此写成幂等的。
+        """
+        return (
+            self._migrate_base_schema,
+            self._migrate_chapter_codec,
+            self._migrate_chapter_fts,
+            self._migrate_query_indexes,
+            self._migrate_kv_cache,
+            self._migrate_export_records,
+            self._migrate_catalog,
+            self._migrate_book_identity,
+            self._migrate_contentless_fts,
+            self._migrate_task_updated_index,
+            self._migrate_catalog_initials,
+        )
+
+    @staticmethod
+    def _migrate_base_schema(cursor):
+        """v1：基础表"""
+        # 小说表
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS novels (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                novel_id TEXT UNIQUE NOT NULL,
+                title TEXT NOT NULL,
+                author TEXT,
+                description TEXT,
+                cover_url TEXT,
+                word_count INTEGER DEFAULT 0,
+                chapter_count INTEGER DEFAULT 0,
+                status TEXT DEFAULT '未下载',
+                source TEXT DEFAULT 'official',
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+        ''')
+
+        # 为旧数据库添加 source 字段（如果不存在）
+        cursor.execute('PRAGMA table_info(novels)')
+        columns = [col[1] for col in cursor.fetchall()]
+        if 'source' not in columns:
+            cursor.execute('ALTER TABLE novels ADD COLUMN source TEXT DEFAULT "official"')
+        
+        # 章节表
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS chapters (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                novel_id TEXT NOT NULL,
+                chapter_id TEXT UNIQUE NOT NULL,
+                chapter_title TEXT NOT NULL,
+                original_title TEXT,
+                chapter_index INTEGER NOT NULL,
+                content TEXT,
+                word_count INTEGER DEFAULT 0,
+                status TEXT DEFAULT '未下载',
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                FOREIGN KEY (novel_id) REFERENCES novels(novel_id)
+            )
+        ''')
+
+        # 为旧数据库添加 original_title 字段（如果不存在）
+        cursor.execute('PRAGMA table_info(chapters)')
+        columns = [col[1] for col in cursor.fetchall()]
+        if 'original_title' not in columns:
+            cursor.execute('ALTER TABLE chapters ADD COLUMN original_title TEXT')
+        
+        # 创建索引
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_novel_id ON chapters(novel_id)')
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_chapter_id ON chapters(chapter_id)')
+
+        # 下载历史表
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS download_history (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                novel_id TEXT NOT NULL,
+                title TEXT NOT NULL,
+                author TEXT,
+                source TEXT,
+                source_key TEXT,
+                chapter_total INTEGER DEFAULT 0,
+                chapter_success INTEGER DEFAULT 0,
+                save_path TEXT,
+                status TEXT DEFAULT 'completed',
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+        ''')
+
+        # 收藏表
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS favorites (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                novel_id TEXT NOT NULL,
+                title TEXT NOT NULL,
+                author TEXT,
+                cover_url TEXT,
+                description TEXT,
+                source TEXT,
+                source_key TEXT,
+                extra_json TEXT,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                UNIQUE(novel_id, source)
+            )
+        ''')
+
+        # 阅读进度表
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS reading_progress (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                novel_id TEXT UNIQUE NOT NULL,
+                title TEXT,
+                last_chapter_id TEXT,
+                last_chapter_title TEXT,
+                chapter_index INTEGER DEFAULT 0,
+                scroll_position INTEGER DEFAULT 0,
+                updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+        ''')
+
+        # 下载任务表（暂停/续传）
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS download_tasks (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                task_id TEXT UNIQUE NOT NULL,
+                novel_id TEXT NOT NULL,
+                title TEXT,
+                source_key TEXT,
+                save_dir TEXT,
+                output_file TEXT,
+                chapter_ids_json TEXT,
+                completed_ids_json TEXT DEFAULT '[]',
+                failed_ids_json TEXT DEFAULT '[]',
+                status TEXT DEFAULT 'running',
+                total INTEGER DEFAULT 0,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+        ''')
+
+        # 小说封面缓存表（novel_id + source 联合主键）
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS novel_covers (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                novel_id TEXT NOT NULL,
+                source TEXT NOT NULL,
+                cover_url TEXT,
+                title TEXT,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                UNIQUE(novel_id, source)
+            )
+        ''')
+
+        # 排行榜缓存表（按天缓存，sudugu.org 数据）
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS rankings_cache (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                rank INTEGER NOT NULL,
+                title TEXT NOT NULL,
+                author TEXT,
+                cover_url TEXT,
+                category TEXT,
+                status TEXT,
+                source_url TEXT,
+                cached_date DATE NOT NULL,
+                UNIQUE(rank, title, cached_date)
+            )
+        ''')
+
+        # 分类小说缓存表（按天缓存，sudugu.org 各分类页数据）
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS category_novels_cache (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                category_key TEXT NOT NULL,
+                title TEXT NOT NULL,
+                author TEXT,
+                cover_url TEXT,
+                category TEXT,
+                status TEXT,
+                source_url TEXT,
+                cached_date DATE NOT NULL,
+                UNIQUE(category_key, title, cached_date)
+            )
+        ''')
+
+    @staticmethod
+    def _migrate_chapter_codec(cursor):
+        """v2：章节压缩（content_codec 字段 + zstd 字典表）"""
+        cursor.execute('PRAGMA table_info(chapters)')
+        columns = [col[1] for col in cursor.fetchall()]
+        # NULL 表示正文未压缩
+        if 'content_codec' not in columns:
+            cursor.execute('ALTER TABLE chapters ADD COLUMN content_codec TEXT')
+
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS chapter_dicts (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                data BLOB NOT NULL,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+        ''')
 
-            # 下载历史表
-            cursor.execute('''
-                CREATE TABLE IF NOT EXISTS download_history (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    novel_id TEXT NOT NULL,
-                    title TEXT NOT NULL,
-                    author TEXT,
-                    source TEXT,
-                    source_key TEXT,
-                    chapter_total INTEGER DEFAULT 0,
-                    chapter_success INTEGER DEFAULT 0,
-                    save_path TEXT,
-                    status TEXT DEFAULT 'completed',
-                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-                )
-            ''')
+    @staticmethod
+    def _migrate_chapter_fts(cursor):
+        """v3：章节全文索引（FTS5 + trigram 分词，中文无需分词词典）
 
-            # 收藏表
+        索引使用外部内容表：内容来自 chapters_text 视图，视图通过 decode_chapter()
+        解压正文，因此索引不额外保存一份正文，snippet() 也只解压命中的章节。
+        chapters 的增删改由触发器同步到索引。v9 把它换成由应用同步的无内容索引。
+        SQLite 不支持（需要 3.34+ 且编译了 FTS5）时跳过，搜索使用 LIKE 扫描。
+        """
+        cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'chapters_fts'")
+        exists = cursor.fetchone() is not None
+        try:
             cursor.execute('''
-                CREATE TABLE IF NOT EXISTS favorites (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    novel_id TEXT NOT NULL,
-                    title TEXT NOT NULL,
-                    author TEXT,
-                    cover_url TEXT,
-                    description TEXT,
-                    source TEXT,
-                    source_key TEXT,
-                    extra_json TEXT,
-                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                    UNIQUE(novel_id, source)
-                )
+                CREATE VIEW IF NOT EXISTS chapters_text AS
+                SELECT id, decode_chapter(content, content_codec) AS content FROM chapters
             ''')
-
-            # 阅读进度表
             cursor.execute('''
-                CREATE TABLE IF NOT EXISTS reading_progress (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    novel_id TEXT UNIQUE NOT NULL,
-                    title TEXT,
-                    last_chapter_id TEXT,
-                    last_chapter_title TEXT,
-                    chapter_index INTEGER DEFAULT 0,
-                    scroll_position INTEGER DEFAULT 0,
-                    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                CREATE VIRTUAL TABLE IF NOT EXISTS chapters_fts USING fts5(
+                    content, content='chapters_text', content_rowid='id', tokenize='trigram'
                 )
             ''')
+        except sqlite3.OperationalError as e:
+            print(f"当前 SQLite 不支持 FTS5 trigram，本地搜索将使用 LIKE 扫描: {e}")
+            return
+
+        cursor.execute('''
+            CREATE TRIGGER IF NOT EXISTS chapters_fts_insert AFTER INSERT ON chapters BEGIN
+                INSERT INTO chapters_fts(rowid, content)
+                VALUES (new.id, decode_chapter(new.content, new.content_codec));
+            END
+        ''')
+        cursor.execute('''
+            CREATE TRIGGER IF NOT EXISTS chapters_fts_delete AFTER DELETE ON chapters BEGIN
+                INSERT INTO chapters_fts(chapters_fts, rowid, content)
+                VALUES ('delete', old.id, decode_chapter(old.content, old.content_codec));
+            END
+        ''')
+        # 压缩迁移只把未压缩的正文换成压缩后的同一段文字，无需重建索引
+        cursor.execute('''
+            CREATE TRIGGER IF NOT EXISTS chapters_fts_update AFTER UPDATE OF content ON chapters
+            WHEN NOT (old.content_codec IS NULL AND new.content_codec IS NOT NULL) BEGIN
+                INSERT INTO chapters_fts(chapters_fts, rowid, content)
+                VALUES ('delete', old.id, decode_chapter(old.content, old.content_codec));
+                INSERT INTO chapters_fts(rowid, content)
+                VALUES (new.id, decode_chapter(new.content, new.content_codec));
+            END
+        ''')
+        if not exists:
+            # 首次创建：为已有章节建立索引
+            cursor.execute("INSERT INTO chapters_fts(chapters_fts) VALUES ('rebuild')")
+
+    @staticmethod
+    def _migrate_query_indexes(cursor):
+        """v4：按实际查询建立索引"""
+        # 按范围导出：WHERE novel_id = ? AND chapter_index BETWEEN ... ORDER BY chapter_index
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_chapters_novel_index ON chapters(novel_id, chapter_index)')
+        # 上面的复合索引已覆盖 novel_id 前缀；chapter_id 的 UNIQUE 约束自带索引
+        cursor.execute('DROP INDEX IF EXISTS idx_novel_id')
+        cursor.execute('DROP INDEX IF EXISTS idx_chapter_id')
+        # 检查更新：WHERE novel_id = ? AND status IN (...) ORDER BY updated_at DESC LIMIT 1
+        cursor.execute('''
+            CREATE INDEX IF NOT EXISTS idx_tasks_novel_status_updated
+            ON download_tasks(novel_id, status, updated_at)
+        ''')
+        # 收藏列表、下载历史：ORDER BY created_at DESC
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_favorites_created ON favorites(created_at)')
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_history_created ON download_history(created_at)')
+
+    @staticmethod
+    def _migrate_kv_cache(cursor):
+        """v5：通用元数据缓存表 kv_cache，替代按天缓存的排行榜/分类表和封面表
+
+        value 为 JSON（UTF-8），fetched_at 为获取时间（Unix 秒），ttl 为有效期（秒）。
+        已缓存的封面迁移到 cover 命名空间；排行榜和分类的按天缓存直接丢弃（下次访问重新获取）。
+        """
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS kv_cache (
+                namespace TEXT NOT NULL,
+                key TEXT NOT NULL,
+                value BLOB NOT NULL,
+                fetched_at REAL NOT NULL,
+                ttl REAL NOT NULL,
+                PRIMARY KEY (namespace, key)
+            ) WITHOUT ROWID
+        ''')
+        # 超出大小上限时按获取时间淘汰
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_kv_cache_fetched ON kv_cache(fetched_at)')
+
+        cursor.execute('''
+            SELECT novel_id, source, cover_url, CAST(strftime('%s', created_at) AS REAL) AS fetched_at
+            FROM novel_covers WHERE cover_url IS NOT NULL AND cover_url != ''
+        ''')
+        now = time.time()
+        cursor.executemany('''
+            INSERT OR IGNORE INTO kv_cache (namespace, key, value, fetched_at, ttl)
+            VALUES (?, ?, ?, ?, ?)
+        ''', [
+            (COVER_CACHE_NAMESPACE, cover_cache_key(row[1], row[0]), _encode_cache_value(row[2]),
+             row[3] or now, COVER_CACHE_TTL)
+            for row in cursor.fetchall()
+        ])
+        cursor.execute('DROP TABLE IF EXISTS novel_covers')
+        cursor.execute('DROP TABLE IF EXISTS rankings_cache')
+        cursor.execute('DROP TABLE IF EXISTS category_novels_cache')
+
+    @staticmethod
+    def _migrate_export_records(cursor):
+        """v6：导出记录（批量导出时跳过内容没有变化的书）"""
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS export_records (
+                novel_id TEXT NOT NULL,
+                output_path TEXT NOT NULL,
+                checksum TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                exported_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                PRIMARY KEY (novel_id, output_path)
+            )
+        ''')
 
-            # 下载任务表（暂停/续传）
-            cursor.execute('''
-                CREATE TABLE IF NOT EXISTS download_tasks (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    task_id TEXT UNIQUE NOT NULL,
-                    novel_id TEXT NOT NULL,
-                    title TEXT,
-                    source_key TEXT,
-                    save_dir TEXT,
-                    output_file TEXT,
-                    chapter_ids_json TEXT,
-                    completed_ids_json TEXT DEFAULT '[]',
-                    failed_ids_json TEXT DEFAULT '[]',
-                    status TEXT DEFAULT 'running',
-                    total INTEGER DEFAULT 0,
-                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-                )
-            ''')
+    @staticmethod
+    def _migrate_catalog(cursor):
+        """v7：书目索引（输入联想、排行榜书名预先对应到各源的 novel_id）
 
-            # 小说封面缓存表（novel_id + source 联合主键）
+        catalog_grams 存书名和作者规范化后的单字和相邻两字；initials 存书名拼音首字母。
+        已有的收藏和下载历史直接导入。
+        """
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS catalog (
+                id INTEGER PRIMARY KEY,
+                source TEXT NOT NULL,
+                novel_id TEXT NOT NULL,
+                title TEXT NOT NULL,
+                author TEXT NOT NULL DEFAULT '',
+                cover_url TEXT NOT NULL DEFAULT '',
+                title_key TEXT NOT NULL,
+                initials TEXT NOT NULL DEFAULT '',
+                hits INTEGER NOT NULL DEFAULT 1,
+                seen_at REAL NOT NULL,
+                UNIQUE (source, novel_id)
+            )
+        ''')
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_catalog_title_key ON catalog(title_key)')
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_catalog_initials ON catalog(initials)')
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_catalog_seen ON catalog(seen_at)')
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS catalog_grams (
+                gram TEXT NOT NULL,
+                catalog_id INTEGER NOT NULL,
+                PRIMARY KEY (gram, catalog_id)
+            ) WITHOUT ROWID
+        ''')
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_catalog_grams_id ON catalog_grams(catalog_id)')
+
+        entries = cursor.execute('''
+            SELECT COALESCE(NULLIF(source_key, ''), source), novel_id, title, author, cover_url FROM favorites
+        ''').fetchall()
+        entries += cursor.execute('''
+            SELECT COALESCE(NULLIF(source_key, ''), source), novel_id, title, author, '' FROM download_history
+        ''').fetchall()
+        _catalog_upsert(cursor, entries, time.time())
+
+    @staticmethod
+    def _migrate_book_identity(cursor):
+        """v8：跨源书籍对应表（同一本书在各源的 novel_id，取代 kv_cache 中的 source_matches）"""
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS book_identity (
+                title_key TEXT NOT NULL,
+                author_key TEXT NOT NULL,
+                source TEXT NOT NULL,
+                novel_id TEXT NOT NULL,
+                confidence REAL NOT NULL,
+                verified_at REAL NOT NULL,
+                PRIMARY KEY (title_key, author_key, source)
+            ) WITHOUT ROWID
+        ''')
+        cursor.execute("DELETE FROM kv_cache WHERE namespace = 'source_matches'")
+
+    def _migrate_contentless_fts(self, cursor):
+        """v9：章节全文索引改为无内容（contentless）FTS5 表，由应用写入章节时同步
+
+        v3 的视图和触发器调用应用注册的 decode_chapter()，其他连接（sqlite3 命令行、旧版本程序）
+        增删章节时会报 no such function，触发器也拖慢批量写入。现在由 save_chapters / 删除章节的方法
+        在同一事务中把纯文本送入索引；索引仍不保存正文，搜索摘要在解压命中的章节后生成。
+        其他连接写入的章节不会进入索引（不影响写入本身）。
+        """
+        for trigger in ('chapters_fts_insert', 'chapters_fts_delete', 'chapters_fts_update'):
+            cursor.execute(f'DROP TRIGGER IF EXISTS {trigger}')
+        cursor.execute('DROP VIEW IF EXISTS chapters_text')
+        cursor.execute('DROP TABLE IF EXISTS chapters_fts')
+        try:
             cursor.execute('''
-                CREATE TABLE IF NOT EXISTS novel_covers (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    novel_id TEXT NOT NULL,
-                    source TEXT NOT NULL,
-                    cover_url TEXT,
-                    title TEXT,
-                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                    UNIQUE(novel_id, source)
-                )
+                CREATE VIRTUAL TABLE chapters_fts USING fts5(content, content='', tokenize='trigram')
             ''')
+        except sqlite3.OperationalError as e:
+            print(f"当前 SQLite 不支持 FTS5 trigram，本地搜索将使用 LIKE 扫描: {e}")
+            return
+        # 为已有章节建立索引
+        last_id = 0
+        while True:
+            rows = cursor.execute('''
+                SELECT id, content, content_codec FROM chapters WHERE id > ? ORDER BY id LIMIT ?
+            ''', (last_id, CHAPTER_FETCH_SIZE)).fetchall()
+            if not rows:
+                break
+            cursor.executemany('INSERT INTO chapters_fts(rowid, content) VALUES (?, ?)',
+                               [(row[0], self._codec.decode(row[1], row[2])) for row in rows])
+            last_id = rows[-1][0]
+
+    @staticmethod
+    def _migrate_task_updated_index(cursor):
+        """v10：检查更新查询改用 (novel_id, updated_at) 索引
+
+        WHERE novel_id = ? AND status IN ('completed', 'partial') ORDER BY updated_at DESC LIMIT 1 中，
+        IN 让 v4 的 (novel_id, status, updated_at) 索引分成两段，排序仍要用临时 B 树。
+        按 (novel_id, updated_at) 倒序扫描、逐行过滤 status，取到第一条即停止。
+        """
+        cursor.execute('DROP INDEX IF EXISTS idx_tasks_novel_status_updated')
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_tasks_novel_updated ON download_tasks(novel_id, updated_at)')
 
-            # 排行榜缓存表（按天缓存，sudugu.org 数据）
-            cursor.execute('''
-                CREATE TABLE IF NOT EXISTS rankings_cache (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    rank INTEGER NOT NULL,
-                    title TEXT NOT NULL,
-                    author TEXT,
-                    cover_url TEXT,
-                    category TEXT,
-                    status TEXT,
-                    source_url TEXT,
-                    cached_date DATE NOT NULL,
-                    UNIQUE(rank, title, cached_date)
-                )
-            ''')
+    @staticmethod
+    def _migrate_catalog_initials(cursor):
+        """v11：重新计算书目的拼音首字母（取不到首字母的字改为占位，不再直接跳过）"""
+        rows = cursor.execute('SELECT id, title FROM catalog').fetchall()
+        cursor.executemany('UPDATE catalog SET initials = ? WHERE id = ?',
+                           [(pinyin_initials(row[1]), row[0]) for row in rows])
 
-            # 分类小说缓存表（按天缓存，sudugu.org 各分类页数据）
-            cursor.execute('''
-                CREATE TABLE IF NOT EXISTS category_novels_cache (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    category_key TEXT NOT NULL,
-                    title TEXT NOT NULL,
-                    author TEXT,
-                    cover_url TEXT,
-                    category TEXT,
-                    status TEXT,
-                    source_url TEXT,
-                    cached_date DATE NOT NULL,
-                    UNIQUE(category_key, title, cached_date)
-                )
-            ''')
+    def _fts_remove(self, cursor, where, args):
+        """把符合条件的章节从全文索引中删除（在删除/替换章节的同一事务中、删除之前调用）
 
-            conn.commit()
+        无内容索引删除时必须提供与写入时相同的文本，因此先读出原正文解压。
+        """
+        if not self.fts_enabled():
+            return
+        rows = cursor.execute(f'SELECT id, content, content_codec FROM chapters WHERE {where}', args).fetchall()
+        if rows:
+            cursor.executemany(
+                "INSERT INTO chapters_fts(chapters_fts, rowid, content) VALUES ('delete', ?, ?)",
+                [(row['id'], self._codec.decode(row['content'], row['content_codec'])) for row in rows]
+            )
 
     def save_novel(self, novel_id, title, author, description, cover_url, word_count=0, chapter_count=0, source='official'):
         """保存小说信息"""
@@ -208,20 +705,55 @@ class NovelDatabase:
 
     def save_chapter(self, novel_id, chapter_id, chapter_title, chapter_index, content, word_count=0, original_title=None):
         """保存章节内容"""
+        self.save_chapters([(novel_id, chapter_id, chapter_title, original_title,
+                             chapter_index, content, word_count)])
+
+    def save_chapters(self, rows):
+        """在一个事务中批量保存章节
+
+        Args:
+            rows: (novel_id, chapter_id, chapter_title, original_title, chapter_index, content, word_count) 元组列表
+
+        每本小说的状态只更新一次为"下载中"。
+        """
+        if not rows:
+            return
+        novel_ids = list(dict.fromkeys(row[0] for row in rows))
+        codec, dict_id = self.chapter_compression, self._chapter_dict_id
+        encoded = []
+        for row in rows:
+            content, content_codec = self._codec.encode(row[5], codec, dict_id if codec == CODEC_ZSTD else None)
+            encoded.append(row[:5] + (content, row[6], content_codec))
+        fts = self.fts_enabled()
+        texts = {row[1]: row[5] for row in rows}  # chapter_id -> 正文（重复时以最后一次为准，与 REPLACE 一致）
+        chapter_ids = list(texts)
         with self.get_connection() as conn:
             cursor = conn.cursor()
-            cursor.execute('''
+            if fts:
+                # 被替换的旧章节先移出全文索引
+                for i in range(0, len(chapter_ids), 500):
+                    chunk = chapter_ids[i:i + 500]
+                    self._fts_remove(cursor, f"chapter_id IN ({','.join('?' * len(chunk))})", chunk)
+            cursor.executemany('''
                 INSERT OR REPLACE INTO chapters 
-                (novel_id, chapter_id, chapter_title, original_title, chapter_index, content, word_count, status)
-                VALUES (?, ?, ?, ?, ?, ?, ?, '已下载')
-            ''', (novel_id, chapter_id, chapter_title, original_title, chapter_index, content, word_count))
-            conn.commit()
-            
+                (novel_id, chapter_id, chapter_title, original_title, chapter_index, content, word_count,
+                 content_codec, status)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, '已下载')
+            ''', encoded)
+            if fts:
+                for i in range(0, len(chapter_ids), 500):
+                    chunk = chapter_ids[i:i + 500]
+                    inserted = cursor.execute(
+                        f"SELECT id, chapter_id FROM chapters WHERE chapter_id IN ({','.join('?' * len(chunk))})", chunk
+                    ).fetchall()
+                    cursor.executemany('INSERT INTO chapters_fts(rowid, content) VALUES (?, ?)',
+                                       [(row['id'], texts[row['chapter_id']]) for row in inserted])
+
             # 更新小说状态
-            cursor.execute('''
+            cursor.executemany('''
                 UPDATE novels SET status = '下载中', updated_at = CURRENT_TIMESTAMP
                 WHERE novel_id = ?
-            ''', (novel_id,))
+            ''', [(novel_id,) for novel_id in novel_ids])
             conn.commit()
 
     def update_novel_status(self, novel_id, status):
@@ -249,7 +781,7 @@ class NovelDatabase:
             return cursor.fetchall()
 
     def get_chapters(self, novel_id):
-        """获取小说所有章节"""
+        """获取小说所有章节（正文已解压）"""
         with self.get_connection() as conn:
             cursor = conn.cursor()
             cursor.execute('''
@@ -257,10 +789,10 @@ class NovelDatabase:
                 WHERE novel_id = ? 
                 ORDER BY chapter_index ASC
             ''', (novel_id,))
-            return cursor.fetchall()
+            return self._decode_chapters(cursor.fetchall())
 
     def get_chapters_range(self, novel_id, start_index, end_index):
-        """获取指定范围的章节"""
+        """获取指定范围的章节（正文已解压）"""
         with self.get_connection() as conn:
             cursor = conn.cursor()
             cursor.execute('''
@@ -268,20 +800,520 @@ class NovelDatabase:
                 WHERE novel_id = ? AND chapter_index >= ? AND chapter_index <= ?
                 ORDER BY chapter_index ASC
             ''', (novel_id, start_index, end_index))
+            return self._decode_chapters(cursor.fetchall())
+
+    @staticmethod
+    def _chapter_range_filter(novel_id, start_index=None, end_index=None):
+        """章节范围的 WHERE 条件和参数（start_index / end_index 为 None 时不限制）"""
+        where, args = 'novel_id = ?', [novel_id]
+        if start_index is not None:
+            where += ' AND chapter_index >= ?'
+            args.append(start_index)
+        if end_index is not None:
+            where += ' AND chapter_index <= ?'
+            args.append(end_index)
+        return where, args
+
+    def count_chapters(self, novel_id, start_index=None, end_index=None):
+        """统计小说（指定范围内）已保存的章节数"""
+        where, args = self._chapter_range_filter(novel_id, start_index, end_index)
+        with self.get_connection() as conn:
+            return conn.execute(f'SELECT COUNT(*) FROM chapters WHERE {where}', args).fetchone()[0]
+
+    def iter_chapters(self, novel_id, start_index=None, end_index=None, batch_size=CHAPTER_FETCH_SIZE):
+        """按章节顺序逐批读取章节（正文已解压）
+
+        与 get_chapters 不同，不会一次把整本书读入内存，适合导出大书。
+        SQLite 游标按需逐行读取，每次只取出 batch_size 章。
+        """
+        where, args = self._chapter_range_filter(novel_id, start_index, end_index)
+        cursor = self.get_connection().execute(
+            f'SELECT * FROM chapters WHERE {where} ORDER BY chapter_index ASC', args
+        )
+        try:
+            while True:
+                rows = cursor.fetchmany(batch_size)
+                if not rows:
+                    return
+                yield from self._decode_chapters(rows)
+        finally:
+            cursor.close()
+
+    def _decode_chapters(self, rows):
+        """把章节行转换为字典并解压正文（content_codec 字段随之去掉）"""
+        chapters = []
+        for row in rows:
+            chapter = dict(row)
+            codec = chapter.pop('content_codec', None)
+            if codec:
+                chapter['content'] = self._codec.decode(chapter['content'], codec)
+            chapters.append(chapter)
+        return chapters
+
+    def get_chapter(self, chapter_id):
+        """获取单个章节（正文已解压），不存在时返回 None"""
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute('SELECT * FROM chapters WHERE chapter_id = ?', (chapter_id,))
+            rows = self._decode_chapters(cursor.fetchall())
+        return rows[0] if rows else None
+
+    def get_chapter_titles(self, novel_id):
+        """获取小说的章节目录（不含正文）"""
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute('''
+                SELECT chapter_id, chapter_title, original_title, chapter_index FROM chapters
+                WHERE novel_id = ?
+                ORDER BY chapter_index ASC
+            ''', (novel_id,))
             return cursor.fetchall()
 
+    # ============== 章节全文搜索 ==============
+
+    def search_chapters(self, keyword, limit=50, novel_id=None):
+        """在已下载的章节正文中搜索
+
+        关键词按空白拆分，各词需同时出现。每个词至少 3 个字符时走 FTS5 索引并按相关度排序；
+        否则（或 SQLite 不支持 FTS5）用 LIKE 扫描，按小说和章节顺序返回。
+
+        Args:
+            keyword: 搜索词
+            limit: 最多返回的章节数
+            novel_id: 只在该小说中搜索
+
+        Returns:
+            list[dict]: novel_id, novel_title, chapter_id, chapter_title, chapter_index, snippet；
+            snippet 中命中文字用 SNIPPET_OPEN / SNIPPET_CLOSE 包围
+        """
+        terms = keyword.split()
+        if not terms:
+            return []
+        novel_filter = 'AND c.novel_id = ?' if novel_id else ''
+        novel_args = (novel_id,) if novel_id else ()
+
+        if self.fts_enabled() and all(len(term) >= FTS_MIN_TERM_LENGTH for term in terms):
+            # 无内容索引没有 snippet()，摘要在解压命中的章节后生成
+            match = ' '.join('"' + term.replace('"', '""') + '"' for term in terms)
+            with self.get_connection() as conn:
+                rows = conn.execute(f'''
+                    SELECT c.novel_id, n.title AS novel_title, c.chapter_id, c.chapter_title, c.chapter_index,
+                           c.content, c.content_codec
+                    FROM chapters_fts
+                    JOIN chapters c ON c.id = chapters_fts.rowid
+                    LEFT JOIN novels n ON n.novel_id = c.novel_id
+                    WHERE chapters_fts MATCH ? {novel_filter}
+                    ORDER BY rank
+                    LIMIT ?
+                ''', (match,) + novel_args + (limit,)).fetchall()
+        else:
+            # 短词：逐章解压后 LIKE 匹配
+            likes = ' AND '.join("decode_chapter(c.content, c.content_codec) LIKE ? ESCAPE '\\'" for _ in terms)
+            patterns = tuple(
+                '%' + term.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_') + '%'
+                for term in terms
+            )
+            with self.get_connection() as conn:
+                rows = conn.execute(f'''
+                    SELECT c.novel_id, n.title AS novel_title, c.chapter_id, c.chapter_title, c.chapter_index,
+                           c.content, c.content_codec
+                    FROM chapters c
+                    LEFT JOIN novels n ON n.novel_id = c.novel_id
+                    WHERE {likes} {novel_filter}
+                    ORDER BY c.novel_id, c.chapter_index
+                    LIMIT ?
+                ''', patterns + novel_args + (limit,)).fetchall()
+        results = []
+        for row in rows:
+            result = dict(row)
+            content = self._codec.decode(result.pop('content'), result.pop('content_codec'))
+            result['snippet'] = self._make_snippet(content or '', terms)
+            results.append(result)
+        return results
+
+    def fts_enabled(self):
+        """是否已建立章节全文索引（当前 SQLite 不支持 FTS5 trigram 时迁移会跳过）"""
+        if self._fts_enabled is None:
+            # 不用 with（退出时会提交）：可能在写入事务中途被调用（见 _fts_remove）
+            row = self.get_connection().execute(
+                "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'chapters_fts'"
+            ).fetchone()
+            self._fts_enabled = row is not None
+        return self._fts_enabled
+
+    @staticmethod
+    def _make_snippet(text, terms, width=SNIPPET_TOKENS):
+        """截取第一个命中词附近的文字作为摘要，与 FTS5 snippet() 的格式一致"""
+        lowered = text.lower()
+        hits = [(lowered.find(term.lower()), term) for term in terms]
+        hits = [(pos, term) for pos, term in hits if pos >= 0]
+        if not hits:
+            return text[:width]
+        pos, _ = min(hits)
+        start = max(0, pos - width // 3)
+        end = min(len(text), start + width)
+        piece = text[start:end]
+        for term in sorted({term for _, term in hits}, key=len, reverse=True):
+            piece = _mark_term(piece, term)
+        return ('…' if start > 0 else '') + piece + ('…' if end < len(text) else '')
+
+    # ============== 章节压缩 ==============
+
+    def _load_chapter_dict(self, dict_id):
+        # 不用 with（退出时会提交）：可能在迁移等写入事务中途被调用
+        row = self.get_connection().execute('SELECT data FROM chapter_dicts WHERE id = ?', (dict_id,)).fetchone()
+        if row is None:
+            raise ValueError(f'找不到章节压缩字典: {dict_id}')
+        return bytes(row['data'])
+
+    def _latest_chapter_dict_id(self):
+        with self.get_connection() as conn:
+            row = conn.execute('SELECT MAX(id) FROM chapter_dicts').fetchone()
+        return row[0]
+
+    def set_chapter_compression(self, codec):
+        """修改新写入章节的压缩方式（已有章节由 compress_existing_chapters 迁移）"""
+        self.chapter_compression = ChapterCodec.resolve(codec)
+
+    def train_chapter_dictionary(self, samples=ZSTD_DICT_SAMPLES, dict_size=ZSTD_DICT_SIZE):
+        """用已下载的章节训练 zstd 字典
+
+        Returns:
+            新字典 ID；未安装 zstandard 或样本不足时返回 None
+        """
+        if zstandard is None:
+            return None
+        with self.get_connection() as conn:
+            rows = conn.execute('''
+                SELECT content, content_codec FROM chapters
+                WHERE content IS NOT NULL ORDER BY RANDOM() LIMIT ?
+            ''', (samples,)).fetchall()
+        texts = [self._codec.decode(row['content'], row['content_codec']) for row in rows]
+        texts = [text.encode('utf-8') for text in texts if text]
+        if len(texts) < ZSTD_DICT_MIN_SAMPLES:
+            return None
+        data = zstandard.train_dictionary(dict_size, texts).as_bytes()
+        with self.get_connection() as conn:
+            cursor = conn.execute('INSERT INTO chapter_dicts (data) VALUES (?)', (sqlite3.Binary(data),))
+            conn.commit()
+            dict_id = cursor.lastrowid
+        self._chapter_dict_id = dict_id
+        return dict_id
+
+    def compress_existing_chapters(self, codec=None, batch_size=200, stop_event=None, vacuum=True):
+        """把尚未压缩的章节按批压缩
+
+        每批一个短事务，下载写入可以穿插进行；按 id 更新且要求 content_codec 仍为 NULL，
+        迁移期间被重新下载（INSERT OR REPLACE 会换新 id）的章节不会被旧内容覆盖。
+
+        Args:
+            codec: 压缩方式，默认使用当前配置；为 'none' 时不做任何事
+            batch_size: 每批章节数
+            stop_event: threading.Event，置位后在当前批结束时停止
+            vacuum: 全部完成后执行 VACUUM 回收空间（数据库繁忙时跳过）
+
+        Returns:
+            (压缩的章节数, 压缩前字节数, 压缩后字节数)
+        """
+        codec = ChapterCodec.resolve(codec or self.chapter_compression)
+        if codec == CODEC_NONE:
+            return 0, 0, 0
+        if codec == CODEC_ZSTD and self._chapter_dict_id is None:
+            self.train_chapter_dictionary()
+        dict_id = self._chapter_dict_id if codec == CODEC_ZSTD else None
+
+        count = before = after = 0
+        last_id = 0
+        while True:
+            if stop_event is not None and stop_event.is_set():
+                return count, before, after
+            with self.get_connection() as conn:
+                rows = conn.execute('''
+                    SELECT id, content FROM chapters
+                    WHERE id > ? AND content_codec IS NULL AND content IS NOT NULL
+                    ORDER BY id LIMIT ?
+                ''', (last_id, batch_size)).fetchall()
+            if not rows:
+                break
+            last_id = rows[-1]['id']
+            updates = []
+            for row in rows:
+                value, marker = self._codec.encode(row['content'], codec, dict_id)
+                if marker is None:
+                    continue
+                before += len(row['content'].encode('utf-8'))
+                after += len(value)
+                updates.append((value, marker, row['id']))
+            if updates:
+                with self.get_connection() as conn:
+                    conn.executemany('''
+                        UPDATE chapters SET content = ?, content_codec = ?
+                        WHERE id = ? AND content_codec IS NULL
+                    ''', updates)
+                    conn.commit()
+                count += len(updates)
+
+        if vacuum and count:
+            try:
+                with self.get_connection() as conn:
+                    conn.execute('VACUUM')
+            except sqlite3.OperationalError as e:
+                print(f"压缩后回收数据库空间失败（稍后会自动复用空闲页）: {e}")
+        return count, before, after
+
     def delete_novel(self, novel_id):
         """删除小说及其章节"""
         with self.get_connection() as conn:
             cursor = conn.cursor()
+            self._fts_remove(cursor, 'novel_id = ?', (novel_id,))
             cursor.execute('DELETE FROM chapters WHERE novel_id = ?', (novel_id,))
             cursor.execute('DELETE FROM novels WHERE novel_id = ?', (novel_id,))
+            cursor.execute('DELETE FROM export_records WHERE novel_id = ?', (novel_id,))
             conn.commit()
 
+    # ============== 导出记录 ==============
+
+    def content_checksum(self, novel_id, salt=''):
+        """小说内容的校验和（SHA-1 十六进制），小说不存在时返回 None
+
+        不读取正文：章节每次保存（INSERT OR REPLACE）都会得到新的行 id，
+        因此对小说信息和各章的 (id, 序号, 标题, 字数) 计算即可发现内容变化；
+        后台压缩只原地改写正文，不改变校验和。salt 用于混入导出格式等选项。
+        """
+        conn = self.get_connection()
+        novel = conn.execute('''
+            SELECT title, author, description, word_count, chapter_count, source
+            FROM novels WHERE novel_id = ?
+        ''', (novel_id,)).fetchone()
+        if novel is None:
+            return None
+        digest = hashlib.sha1(salt.encode('utf-8'))
+        digest.update(repr(tuple(novel)).encode('utf-8'))
+        cursor = conn.execute('''
+            SELECT id, chapter_index, chapter_title, original_title, word_count
+            FROM chapters WHERE novel_id = ? ORDER BY chapter_index
+        ''', (novel_id,))
+        while True:
+            rows = cursor.fetchmany(CHAPTER_FETCH_SIZE * 16)
+            if not rows:
+                break
+            digest.update(repr([tuple(row) for row in rows]).encode('utf-8'))
+        return digest.hexdigest()
+
+    def get_export_record(self, novel_id, output_path):
+        """上次导出到 output_path 时的记录：{checksum, size, exported_at}，没有返回 None"""
+        row = self.get_connection().execute('''
+            SELECT checksum, size, exported_at FROM export_records
+            WHERE novel_id = ? AND output_path = ?
+        ''', (novel_id, os.path.abspath(output_path))).fetchone()
+        return dict(row) if row else None
+
+    def save_export_record(self, novel_id, output_path, checksum, size):
+        """记录一次成功的导出"""
+        with self.get_connection() as conn:
+            conn.execute('''
+                INSERT OR REPLACE INTO export_records (novel_id, output_path, checksum, size, exported_at)
+                VALUES (?, ?, ?, ?, CURRENT_TIMESTAMP)
+            ''', (novel_id, os.path.abspath(output_path), checksum, size))
+
+    # ============== 书目索引 ==============
+
+    def catalog_add_many(self, entries):
+        """把见过的书写入书目索引（已有的更新书名/作者/封面，见到次数 +1）
+
+        Args:
+            entries: [(source, novel_id, title, author, cover_url)]，缺少 source/novel_id/title 的忽略
+        """
+        with self.get_connection() as conn:
+            _catalog_upsert(conn.cursor(), entries, time.time())
+        self._catalog_writes += 1
+        if self._catalog_writes % CATALOG_PRUNE_EVERY == 0:
+            self.prune_catalog()
+
+    def prune_catalog(self, max_entries=CATALOG_MAX_ENTRIES):
+        """条数超过 max_entries 时删除最久未见的条目，返回删除的条数"""
+        with self.get_connection() as conn:
+            count = conn.execute('SELECT COUNT(*) FROM catalog').fetchone()[0]
+            if count <= max_entries:
+                return 0
+            ids = [row[0] for row in conn.execute(
+                'SELECT id FROM catalog ORDER BY seen_at LIMIT ?', (count - max_entries,)
+            )]
+            conn.executemany('DELETE FROM catalog_grams WHERE catalog_id = ?', [(i,) for i in ids])
+            conn.executemany('DELETE FROM catalog WHERE id = ?', [(i,) for i in ids])
+            return len(ids)
+
+    def catalog_suggest(self, query, limit=10):
+        """输入联想：按书名/作者片段或书名拼音首字母查找见过的书
+
+        同一本书（书名相同，作者相同或未知）在各源的条目合并为一项。
+        排序：书名完全相同 > 书名前缀 > 拼音首字母前缀 > 书名包含 > 作者包含，同级按见到次数。
+
+        Returns:
+            [{title, author, cover_url, hits, sources: {source: novel_id}}]
+        """
+        q = catalog_key(query)
+        if not q:
+            return []
+        conn = self.get_connection()
+        grams = [q] if len(q) == 1 else sorted({q[i:i + 2] for i in range(len(q) - 1)})
+        placeholders = ','.join('?' * len(grams))
+        rows = conn.execute(f'''
+            SELECT c.* FROM catalog c
+            JOIN (
+                SELECT catalog_id FROM catalog_grams WHERE gram IN ({placeholders})
+                GROUP BY catalog_id HAVING COUNT(*) = ?
+            ) g ON g.catalog_id = c.id
+            ORDER BY c.hits DESC LIMIT ?
+        ''', (*grams, len(grams), CATALOG_CANDIDATES)).fetchall()
+        if q.isascii() and q.isalnum():
+            rows += conn.execute('''
+                SELECT * FROM catalog WHERE initials >= ? AND initials < ?
+                ORDER BY hits DESC LIMIT ?
+            ''', (q, q + '\x7f', CATALOG_CANDIDATES)).fetchall()
+
+        ranked, seen = [], set()
+        for row in rows:
+            if row['id'] in seen:
+                continue
+            seen.add(row['id'])
+            title_key = row['title_key']
+            if title_key == q:
+                rank = 0
+            elif title_key.startswith(q):
+                rank = 1
+            elif row['initials'].startswith(q):
+                rank = 2
+            elif q in title_key:
+                rank = 3
+            elif q in catalog_key(row['author']):
+                rank = 4
+            else:
+                continue  # 两字片段都出现但不相邻
+            ranked.append((rank, -row['hits'], len(title_key), row))
+        ranked.sort(key=lambda item: item[:3])
+
+        suggestions = []
+        for _, _, _, row in ranked:
+            book = _catalog_find_book(suggestions, row['title_key'], catalog_key(row['author']))
+            if book is None:
+                if len(suggestions) >= limit:
+                    continue
+                book = {'title': row['title'], 'author': row['author'], 'cover_url': row['cover_url'],
+                        'hits': 0, 'sources': {}, '_key': (row['title_key'], catalog_key(row['author']))}
+                suggestions.append(book)
+            book['hits'] += row['hits']
+            book['sources'].setdefault(row['source'], row['novel_id'])
+            if not book['author'] and row['author']:
+                book['author'] = row['author']
+                book['_key'] = (row['title_key'], catalog_key(row['author']))
+            if not book['cover_url']:
+                book['cover_url'] = row['cover_url']
+        for book in suggestions:
+            del book['_key']
+        return suggestions
+
+    def catalog_sources_many(self, books):
+        """查找多本书在各源的 novel_id（书名规范化后相同，作者相同或有一方未知）
+
+        Args:
+            books: [(title, author)]
+
+        Returns:
+            与 books 对应的列表，每项为 {source: novel_id}（没有见过时为空 dict）
+        """
+        keys = [(catalog_key(title), catalog_key(author)) for title, author in books]
+        title_keys = sorted({title_key for title_key, _ in keys if title_key})
+        by_title = {}
+        conn = self.get_connection()
+        for i in range(0, len(title_keys), 500):
+            chunk = title_keys[i:i + 500]
+            for row in conn.execute(f'''
+                SELECT source, novel_id, title_key, author FROM catalog
+                WHERE title_key IN ({','.join('?' * len(chunk))})
+                ORDER BY hits DESC
+            ''', chunk):
+                by_title.setdefault(row['title_key'], []).append(row)
+        result = []
+        for title_key, author_key in keys:
+            sources = {}
+            for row in by_title.get(title_key, ()):
+                row_author = catalog_key(row['author'])
+                if author_key and row_author and author_key != row_author:
+                    continue
+                sources.setdefault(row['source'], row['novel_id'])
+            result.append(sources)
+        return result
+
+    # ============== 跨源书籍对应 ==============
+
+    def get_book_identity(self, title, author=''):
+        """同一本书（书名、作者按 catalog_key 规范化）在各源的 novel_id
+
+        作者已知时也使用作者未知的记录；作者未知时，同名书有多个作者则只使用作者未知的记录。
+
+        Returns:
+            {source: {novel_id, confidence, verified_at}}；source 为 BOOK_IDENTITY_ALL_SOURCES 的一项
+            记录上次在所有源中查找的时间
+        """
+        title_key, author_key = catalog_key(title), catalog_key(author)
+        rows = self.get_connection().execute('''
+            SELECT author_key, source, novel_id, confidence, verified_at FROM book_identity
+            WHERE title_key = ?
+        ''', (title_key,)).fetchall()
+        if author_key:
+            rows = [row for row in rows if row['author_key'] in (author_key, '')]
+        elif len({row['author_key'] for row in rows if row['author_key']}) > 1:
+            rows = [row for row in rows if not row['author_key']]
+        # 作者一致、可信度高的记录排在后面，覆盖前面的
+        rows.sort(key=lambda row: (row['author_key'] == author_key, row['confidence']))
+        return {row['source']: {'novel_id': row['novel_id'], 'confidence': row['confidence'],
+                                'verified_at': row['verified_at']} for row in rows}
+
+    def save_book_identities(self, entries):
+        """记录书在各源的 novel_id
+
+        同一源已有记录时：novel_id 相同则取较高的可信度并刷新验证时间；
+        novel_id 不同则只有可信度不低于原记录时才替换。
+
+        Args:
+            entries: [(title, author, source, novel_id, confidence)]
+        """
+        now = time.time()
+        rows = [(catalog_key(title), catalog_key(author), source, str(novel_id), confidence, now)
+                for title, author, source, novel_id, confidence in entries
+                if catalog_key(title) and source and novel_id]
+        if not rows:
+            return
+        with self.get_connection() as conn:
+            conn.executemany('''
+                INSERT INTO book_identity (title_key, author_key, source, novel_id, confidence, verified_at)
+                VALUES (?, ?, ?, ?, ?, ?)
+                ON CONFLICT (title_key, author_key, source) DO UPDATE SET
+                    novel_id = CASE WHEN excluded.confidence >= confidence THEN excluded.novel_id ELSE novel_id END,
+                    confidence = CASE
+                        WHEN excluded.novel_id = novel_id THEN MAX(confidence, excluded.confidence)
+                        WHEN excluded.confidence >= confidence THEN excluded.confidence
+                        ELSE confidence END,
+                    verified_at = CASE
+                        WHEN excluded.novel_id = novel_id OR excluded.confidence >= confidence
+                        THEN excluded.verified_at ELSE verified_at END
+            ''', rows)
+
+    def forget_book_identity(self, title, author, sources):
+        """删除书在 sources 中各源的记录（重新查找时已找不到）"""
+        title_key, author_key = catalog_key(title), catalog_key(author)
+        with self.get_connection() as conn:
+            conn.executemany(
+                'DELETE FROM book_identity WHERE title_key = ? AND author_key = ? AND source = ?',
+                [(title_key, author_key, source) for source in sources]
+            )
+
     def delete_chapters(self, novel_id):
         """只删除小说的所有章节，保留小说信息"""
         with self.get_connection() as conn:
             cursor = conn.cursor()
+            self._fts_remove(cursor, 'novel_id = ?', (novel_id,))
             cursor.execute('DELETE FROM chapters WHERE novel_id = ?', (novel_id,))
             conn.commit()
 
@@ -299,8 +1331,10 @@ class NovelDatabase:
                 VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, CURRENT_TIMESTAMP)
             ''', (novel_id, title, author, source, source_key,
                   chapter_total, chapter_success, save_path, status))
+            history_id = cursor.lastrowid
+            _catalog_upsert(cursor, [(source_key or source, novel_id, title, author, '')], time.time())
             conn.commit()
-            return cursor.lastrowid
+            return history_id
 
     def get_history(self, limit=100):
         """获取下载历史记录"""
@@ -341,8 +1375,10 @@ class NovelDatabase:
                 VALUES (?, ?, ?, ?, ?, ?, ?, ?, CURRENT_TIMESTAMP)
             ''', (novel_id, title, author, cover_url, description,
                   source, source_key, extra_json))
+            favorite_id = cursor.lastrowid
+            _catalog_upsert(cursor, [(source_key or source, novel_id, title, author, cover_url)], time.time())
             conn.commit()
-            return cursor.lastrowid
+            return favorite_id
 
     def remove_favorite(self, novel_id, source):
         """取消收藏"""
@@ -489,198 +1525,502 @@ class NovelDatabase:
                            (task_id,))
             conn.commit()
 
-    # ============== 封面缓存 ==============
+    # ============== 通用缓存 ==============
 
-    def get_cover(self, novel_id, source):
-        """获取缓存的封面 URL，未缓存返回 None"""
-        with self.get_connection() as conn:
-            cursor = conn.cursor()
-            cursor.execute('''
-                SELECT cover_url FROM novel_covers
-                WHERE novel_id = ? AND source = ?
-            ''', (str(novel_id), source))
-            row = cursor.fetchone()
-            return row['cover_url'] if row else None
-
-    def set_cover(self, novel_id, source, cover_url, title=None):
-        """缓存封面 URL（已存在则更新）"""
-        with self.get_connection() as conn:
-            cursor = conn.cursor()
-            cursor.execute('''
-                INSERT OR REPLACE INTO novel_covers
-                (novel_id, source, cover_url, title, created_at)
-                VALUES (?, ?, ?, ?, CURRENT_TIMESTAMP)
-            ''', (str(novel_id), source, cover_url, title))
-            conn.commit()
-
-    def get_covers_batch(self, novel_ids, source):
-        """批量获取缓存的封面 URL
+    def cache_get(self, namespace, key):
+        """读取 kv_cache 中的条目（不论是否过期）
 
         Returns:
-            dict: {novel_id: cover_url}（仅包含已缓存的）
+            (value, fetched_at, ttl) 或 None（未缓存）
         """
-        if not novel_ids:
-            return {}
-        placeholders = ','.join('?' * len(novel_ids))
-        with self.get_connection() as conn:
-            cursor = conn.cursor()
-            cursor.execute(f'''
-                SELECT novel_id, cover_url FROM novel_covers
-                WHERE source = ? AND novel_id IN ({placeholders})
-            ''', [source] + [str(nid) for nid in novel_ids])
-            return {row['novel_id']: row['cover_url'] for row in cursor.fetchall() if row['cover_url']}
+        row = self.get_connection().execute(
+            'SELECT value, fetched_at, ttl FROM kv_cache WHERE namespace = ? AND key = ?',
+            (namespace, key)).fetchone()
+        if row is None:
+            return None
+        return _decode_cache_value(row['value']), row['fetched_at'], row['ttl']
 
-    def get_cover_cache_count(self):
-        """获取封面缓存条目数"""
-        with self.get_connection() as conn:
-            cursor = conn.cursor()
-            cursor.execute('SELECT COUNT(*) AS cnt FROM novel_covers')
-            row = cursor.fetchone()
-            return row['cnt'] if row else 0
+    def cache_get_many(self, namespace, keys):
+        """批量读取 kv_cache
 
-    def clear_cover_cache(self):
-        """清空封面缓存表，返回被删除的条目数"""
-        with self.get_connection() as conn:
-            cursor = conn.cursor()
-            cursor.execute('SELECT COUNT(*) AS cnt FROM novel_covers')
-            count = cursor.fetchone()['cnt']
-            cursor.execute('DELETE FROM novel_covers')
-            conn.commit()
-            return count
+        Returns:
+            dict: {key: (value, fetched_at, ttl)}（仅包含已缓存的）
+        """
+        keys = list(dict.fromkeys(keys))
+        result = {}
+        conn = self.get_connection()
+        # 分批查询，避免超出 SQLite 的参数个数限制
+        for i in range(0, len(keys), 500):
+            chunk = keys[i:i + 500]
+            placeholders = ','.join('?' * len(chunk))
+            rows = conn.execute(f'''
+                SELECT key, value, fetched_at, ttl FROM kv_cache
+                WHERE namespace = ? AND key IN ({placeholders})
+            ''', [namespace] + chunk)
+            for row in rows:
+                result[row['key']] = (_decode_cache_value(row['value']), row['fetched_at'], row['ttl'])
+        return result
 
-    # ============== 排行榜缓存 ==============
+    def cache_set(self, namespace, key, value, ttl, fetched_at=None):
+        """写入 kv_cache（已存在则覆盖），value 须可被 JSON 序列化"""
+        self.cache_set_many(namespace, {key: value}, ttl, fetched_at)
 
-    def get_rankings_cache(self, category='all'):
-        """获取今日缓存的排行榜数据
+    def cache_set_many(self, namespace, items, ttl, fetched_at=None):
+        """批量写入 kv_cache
 
-        Returns:
-            list[dict] 或 None（无缓存）：[{rank, title, author, cover_url, category, status, source_url}]
+        Args:
+            items: {key: value}
         """
-        import datetime
-        today = datetime.date.today().isoformat()
+        if not items:
+            return
+        fetched_at = fetched_at or time.time()
+        rows = [(namespace, key, _encode_cache_value(value), fetched_at, ttl)
+                for key, value in items.items()]
         with self.get_connection() as conn:
-            cursor = conn.cursor()
-            if category == 'all':
-                cursor.execute('''
-                    SELECT rank, title, author, cover_url, category, status, source_url
-                    FROM rankings_cache
-                    WHERE cached_date = ?
-                    ORDER BY rank ASC
-                ''', (today,))
+            conn.executemany('''
+                INSERT OR REPLACE INTO kv_cache (namespace, key, value, fetched_at, ttl)
+                VALUES (?, ?, ?, ?, ?)
+            ''', rows)
+        with self._lock:
+            self._kv_writes += len(rows)
+            evict = self._kv_writes >= KV_CACHE_EVICT_EVERY
+            if evict:
+                self._kv_writes = 0
+        if evict:
+            self.evict_cache()
+
+    def cache_delete(self, namespace, key=None):
+        """删除 kv_cache 中的一个条目（key 为 None 时删除整个命名空间），返回删除的条目数"""
+        with self.get_connection() as conn:
+            if key is None:
+                cursor = conn.execute('DELETE FROM kv_cache WHERE namespace = ?', (namespace,))
             else:
-                cursor.execute('''
-                    SELECT rank, title, author, cover_url, category, status, source_url
-                    FROM rankings_cache
-                    WHERE cached_date = ? AND category = ?
-                    ORDER BY rank ASC
-                ''', (today, category))
-            rows = cursor.fetchall()
-            if not rows:
-                return None
-            return [dict(row) for row in rows]
+                cursor = conn.execute('DELETE FROM kv_cache WHERE namespace = ? AND key = ?', (namespace, key))
+            return cursor.rowcount
 
-    def save_rankings_cache(self, novels):
-        """批量保存排行榜数据到缓存（先清除今日旧缓存再写入）
+    def cache_stats(self, namespace=None):
+        """kv_cache 的条目数和 value 总字节数
 
-        Args:
-            novels: [{rank, title, author, cover_url, category, status, source_url}]
+        Returns:
+            (count, size_bytes)
         """
-        import datetime
-        today = datetime.date.today().isoformat()
-        with self.get_connection() as conn:
-            cursor = conn.cursor()
-            # 清除今日缓存
-            cursor.execute('DELETE FROM rankings_cache WHERE cached_date = ?', (today,))
-            # 批量插入
-            for n in novels:
-                cursor.execute('''
-                    INSERT OR REPLACE INTO rankings_cache
-                    (rank, title, author, cover_url, category, status, source_url, cached_date)
-                    VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-                ''', (
-                    n.get('rank', 0),
-                    n.get('title', ''),
-                    n.get('author', ''),
-                    n.get('cover_url', ''),
-                    n.get('category', ''),
-                    n.get('status', ''),
-                    n.get('source_url', ''),
-                    today,
-                ))
-            conn.commit()
+        sql = 'SELECT COUNT(*), COALESCE(SUM(LENGTH(value)), 0) FROM kv_cache'
+        args = ()
+        if namespace is not None:
+            sql += ' WHERE namespace = ?'
+            args = (namespace,)
+        count, size = self.get_connection().execute(sql, args).fetchone()
+        return count, size
+
+    def evict_cache(self, max_bytes=KV_CACHE_MAX_BYTES):
+        """kv_cache 超出大小上限时，按获取时间从早到晚淘汰，直到降到上限的 3/4，返回淘汰的条目数"""
+        with self._lock, self.get_connection() as conn:
+            total = conn.execute('SELECT COALESCE(SUM(LENGTH(value)), 0) FROM kv_cache').fetchone()[0]
+            if total <= max_bytes:
+                return 0
+            excess = total - max_bytes * 3 // 4
+            victims = []
+            cursor = conn.execute('SELECT namespace, key, LENGTH(value) FROM kv_cache ORDER BY fetched_at ASC')
+            for namespace, key, size in cursor:
+                victims.append((namespace, key))
+                excess -= size
+                if excess <= 0:
+                    break
+            cursor.close()
+            conn.executemany('DELETE FROM kv_cache WHERE namespace = ? AND key = ?', victims)
+            return len(victims)
+
+def catalog_key(text):
+    """书目索引中比较书名/作者用的规范形式：只保留文字和数字并转小写（去掉书名号、空格和标点）"""
+    return ''.join(ch for ch in (text or '').lower() if ch.isalnum())
+
+
+def _catalog_grams(title, author):
+    """书名和作者规范化后的单字和相邻两字"""
+    grams = set()
+    for key in (catalog_key(title), catalog_key(author)):
+        grams.update(key)
+        grams.update(key[i:i + 2] for i in range(len(key) - 1))
+    return grams
+
+
+def _catalog_find_book(books, title_key, author_key):
+    """在已合并的联想结果中找同一本书（作者未知时只比较书名）"""
+    for book in books:
+        book_title, book_author = book['_key']
+        if book_title == title_key and (not author_key or not book_author or author_key == book_author):
+            return book
+    return None
+
+
+def _catalog_upsert(cursor, entries, now):
+    """写入书目索引条目，书名或作者变化时重建该条目的 n-gram"""
+    for source, novel_id, title, author, cover_url in entries:
+        title_key = catalog_key(title)
+        if not source or not novel_id or not title_key:
+            continue
+        novel_id, author, cover_url = str(novel_id), author or '', cover_url or ''
+        row = cursor.execute(
+            'SELECT id, title, author FROM catalog WHERE source = ? AND novel_id = ?', (source, novel_id)
+        ).fetchone()
+        if row is None:
+            cursor.execute('''
+                INSERT INTO catalog (source, novel_id, title, author, cover_url, title_key, initials, seen_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+            ''', (source, novel_id, title, author, cover_url, title_key, pinyin_initials(title), now))
+            catalog_id = cursor.lastrowid
+        else:
+            catalog_id = row[0]
+            # 新条目缺少作者或封面时保留原来的
+            author = author or row[2]
+            cursor.execute('''
+                UPDATE catalog SET title = ?, author = ?, cover_url = CASE WHEN ? = '' THEN cover_url ELSE ? END,
+                    title_key = ?, initials = ?, hits = hits + 1, seen_at = ?
+                WHERE id = ?
+            ''', (title, author, cover_url, cover_url, title_key, pinyin_initials(title), now, catalog_id))
+            if row[1] == title and row[2] == author:
+                continue
+            cursor.execute('DELETE FROM catalog_grams WHERE catalog_id = ?', (catalog_id,))
+        cursor.executemany(
+            'INSERT OR IGNORE INTO catalog_grams (gram, catalog_id) VALUES (?, ?)',
+            [(gram, catalog_id) for gram in _catalog_grams(title, author)]
+        )
+
+
+def cover_cache_key(source, novel_id):
+    """封面在 kv_cache 中的 key"""
+    return f'{source}:{novel_id}'
 
-    def has_rankings_cache_today(self):
-        """检查今日是否已有排行榜缓存"""
-        import datetime
-        today = datetime.date.today().isoformat()
-        with self.get_connection() as conn:
-            cursor = conn.cursor()
-            cursor.execute('SELECT COUNT(*) as cnt FROM rankings_cache WHERE cached_date = ?', (today,))
-            return cursor.fetchone()['cnt'] > 0
 
-    # ============== 分类小说缓存 ==============
+def _encode_cache_value(value):
+    return json.dumps(value, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
 
-    def get_category_novels_cache(self, category_key: str):
-        """获取今日缓存的分类小说数据
+
+def _decode_cache_value(data):
+    return json.loads(bytes(data).decode('utf-8'))
+
+
+def _mark_term(text, term):
+    """用 SNIPPET_OPEN / SNIPPET_CLOSE 包围 text 中所有的 term（不区分大小写）"""
+    lowered, needle = text.lower(), term.lower()
+    parts, start = [], 0
+    while True:
+        pos = lowered.find(needle, start)
+        if pos < 0:
+            break
+        parts.append(text[start:pos])
+        parts.append(SNIPPET_OPEN + text[pos:pos + len(term)] + SNIPPET_CLOSE)
+        start = pos + len(term)
+    parts.append(text[start:])
+    return ''.join(parts)
+
+
+# ============== 章节压缩迁移 ==============
+
+_migrating_paths = set()
+_migrating_lock = threading.Lock()
+
+
+def start_compression_migration(db, codec=None):
+    """在后台线程中压缩数据库里的已有章节（同一个数据库文件同时只运行一个迁移）
+
+    Returns:
+        后台线程；压缩未启用或迁移已在运行时返回 None
+    """
+    codec = ChapterCodec.resolve(codec or db.chapter_compression)
+    if codec == CODEC_NONE:
+        return None
+    path = os.path.abspath(db.db_path)
+    with _migrating_lock:
+        if path in _migrating_paths:
+            return None
+        _migrating_paths.add(path)
+
+    def run():
+        try:
+            count, before, after = db.compress_existing_chapters(codec)
+            if count:
+                print(f"章节压缩完成：{count} 章，{before / 1048576:.1f} MB → {after / 1048576:.1f} MB")
+        except Exception as e:
+            print(f"章节压缩迁移失败: {e}")
+        finally:
+            with _migrating_lock:
+                _migrating_paths.discard(path)
+
+    thread = threading.Thread(target=run, name='ChapterCompression', daemon=True)
+    thread.start()
+    return thread
+
+
+# ============== 元数据缓存 ==============
+
+class MetadataCache:
+    """kv_cache 表 + 进程内 LRU 的元数据缓存（排行榜、分类、封面、换源匹配等）
+
+    过期条目不会阻塞调用方：get() 立即返回过期值，同时在后台线程中调用 loader 刷新；
+    只有从未缓存过的条目才同步调用 loader。loader 返回 None 表示本次没有可缓存的结果。
+    返回的对象与缓存共享，调用方不要修改。
+    """
+
+    def __init__(self, db, max_entries=METADATA_LRU_SIZE):
+        self.db = db
+        self.max_entries = max_entries
+        self._lru = OrderedDict()  # {(namespace, key): (value, expires_at)}
+        self._lock = threading.Lock()
+        self._refreshing = set()  # 正在后台刷新的 (namespace, key)
+
+    def _remember(self, item, value, expires_at):
+        with self._lock:
+            self._lru[item] = (value, expires_at)
+            self._lru.move_to_end(item)
+            while len(self._lru) > self.max_entries:
+                self._lru.popitem(last=False)
+
+    def _lookup(self, namespace, key):
+        """依次查 LRU 和 kv_cache，返回 (value, expires_at) 或 None"""
+        item = (namespace, key)
+        with self._lock:
+            entry = self._lru.get(item)
+            if entry is not None:
+                self._lru.move_to_end(item)
+                return entry
+        row = self.db.cache_get(namespace, key)
+        if row is None:
+            return None
+        value, fetched_at, ttl = row
+        self._remember(item, value, fetched_at + ttl)
+        return value, fetched_at + ttl
+
+    def get(self, namespace, key, loader, ttl):
+        """读取缓存；过期时返回旧值并在后台刷新，未缓存时同步调用 loader()
+
+        同步调用 loader 时的异常会抛给调用方。
+        """
+        entry = self._lookup(namespace, key)
+        if entry is not None:
+            value, expires_at = entry
+            if time.time() >= expires_at:
+                self.refresh(namespace, key, loader, ttl)
+            return value
+        value = loader()
+        if value is not None:
+            self.set(namespace, key, value, ttl)
+        return value
+
+    def peek(self, namespace, key):
+        """只读缓存，返回 (value, fresh)；未缓存返回 None"""
+        entry = self._lookup(namespace, key)
+        if entry is None:
+            return None
+        return entry[0], time.time() < entry[1]
+
+    def peek_many(self, namespace, keys):
+        """批量只读缓存，LRU 未命中的 key 用一次查询从 kv_cache 读取
 
         Returns:
-            list[dict] 或 None（无缓存）：[{title, author, cover_url, category, status, source_url}]
+            dict: {key: (value, fresh)}（仅包含已缓存的）
         """
-        import datetime
-        today = datetime.date.today().isoformat()
-        with self.get_connection() as conn:
-            cursor = conn.cursor()
-            cursor.execute('''
-                SELECT title, author, cover_url, category, status, source_url
-                FROM category_novels_cache
-                WHERE cached_date = ? AND category_key = ?
-                ORDER BY id ASC
-            ''', (today, category_key))
-            rows = cursor.fetchall()
-            if not rows:
-                return None
-            return [dict(row) for row in rows]
+        now = time.time()
+        result, missing = {}, []
+        with self._lock:
+            for key in keys:
+                entry = self._lru.get((namespace, key))
+                if entry is None:
+                    missing.append(key)
+                else:
+                    self._lru.move_to_end((namespace, key))
+                    result[key] = (entry[0], now < entry[1])
+        if missing:
+            for key, (value, fetched_at, ttl) in self.db.cache_get_many(namespace, missing).items():
+                self._remember((namespace, key), value, fetched_at + ttl)
+                result[key] = (value, now < fetched_at + ttl)
+        return result
+
+    def set(self, namespace, key, value, ttl):
+        self.db.cache_set(namespace, key, value, ttl)
+        self._remember((namespace, key), value, time.time() + ttl)
+
+    def set_many(self, namespace, items, ttl):
+        """批量写入 {key: value}"""
+        self.db.cache_set_many(namespace, items, ttl)
+        expires_at = time.time() + ttl
+        for key, value in items.items():
+            self._remember((namespace, key), value, expires_at)
+
+    def invalidate(self, namespace, key=None):
+        """删除一个条目（key 为 None 时删除整个命名空间），返回 kv_cache 中删除的条目数"""
+        with self._lock:
+            if key is None:
+                for item in [item for item in self._lru if item[0] == namespace]:
+                    del self._lru[item]
+            else:
+                self._lru.pop((namespace, key), None)
+        return self.db.cache_delete(namespace, key)
 
-    def save_category_novels_cache(self, category_key: str, novels: list):
-        """批量保存分类小说数据到缓存（先清除今日该分类缓存再写入）
+    def refresh(self, namespace, key, loader, ttl):
+        """在后台线程中调用 loader() 刷新条目，同一条目同时只刷新一次
 
-        Args:
-            category_key: 分类 key（如 'xuanhuan'）
-            novels: [{title, author, cover_url, category, status, source_url}]
+        Returns:
+            bool: 是否启动了刷新
         """
-        import datetime
-        today = datetime.date.today().isoformat()
-        with self.get_connection() as conn:
-            cursor = conn.cursor()
-            cursor.execute(
-                'DELETE FROM category_novels_cache WHERE cached_date = ? AND category_key = ?',
-                (today, category_key)
-            )
-            for n in novels:
-                cursor.execute('''
-                    INSERT OR REPLACE INTO category_novels_cache
-                    (category_key, title, author, cover_url, category, status, source_url, cached_date)
-                    VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-                ''', (
-                    category_key,
-                    n.get('title', ''),
-                    n.get('author', ''),
-                    n.get('cover_url', ''),
-                    n.get('category', ''),
-                    n.get('status', ''),
-                    n.get('source_url', ''),
-                    today,
-                ))
-            conn.commit()
+        item = (namespace, key)
+        with self._lock:
+            if item in self._refreshing:
+                return False
+            self._refreshing.add(item)
+
+        def run():
+            try:
+                value = loader()
+                if value is not None:
+                    self.set(namespace, key, value, ttl)
+                    return
+            except Exception as e:
+                print(f"[缓存] 刷新 {namespace}/{key} 失败: {e}")
+            finally:
+                with self._lock:
+                    self._refreshing.discard(item)
+            # 刷新失败：继续返回旧值，一段时间内不再重试，避免每次访问都请求失败的站点
+            entry = self._lookup(namespace, key)
+            if entry is not None:
+                self._remember(item, entry[0], time.time() + METADATA_RETRY_DELAY)
+
+        threading.Thread(target=run, name='MetadataRefresh', daemon=True).start()
+        return True
+
+
+_metadata_caches = {}
+_metadata_caches_lock = threading.Lock()
+
+
+def get_metadata_cache(db=None):
+    """获取数据库对应的 MetadataCache（同一个数据库文件共享一个 LRU）
+
+    Args:
+        db: NovelDatabase，默认使用默认数据库
+    """
+    path = os.path.abspath(db.db_path if db else DATABASE_PATH)
+    with _metadata_caches_lock:
+        cache = _metadata_caches.get(path)
+        if cache is None:
+            cache = _metadata_caches[path] = MetadataCache(db or NovelDatabase())
+        return cache
+
+
+# ============== 章节后台写入 ==============
+
+class ChapterWriter:
+    """章节后台批量写入器（write-behind）
+
+    下载线程调用 put() 把章节放入队列后立即返回，由单个写入线程取出，
+    每个事务用 executemany 写入一批章节，小说状态每批只更新一次。
+    导出等需要确保数据已落盘的地方先调用 flush()。
+
+    用法：
+        with ChapterWriter(db) as writer:
+            writer.put(novel_id, chapter_id, title, index, content, len(content))
+            ...
+            writer.flush()  # 之前 put 的章节都已提交
+    """
+
+    def __init__(self, db, batch_size=CHAPTER_BATCH_SIZE, batch_delay=CHAPTER_BATCH_DELAY,
+                 max_pending=CHAPTER_QUEUE_SIZE):
+        self.db = db
+        self.batch_size = batch_size
+        self.batch_delay = batch_delay
+        self._queue = queue.Queue(maxsize=max_pending)
+        self._thread = None
+        self._start_lock = threading.Lock()
+        self._failed = 0  # 写入失败的章节数，flush() 时返回并清零
+        self._failed_lock = threading.Lock()
+        self.written = 0  # 已提交的章节数
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def _ensure_thread(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._start_lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name='ChapterWriter', daemon=True)
+                self._thread.start()
+
+    def put(self, novel_id, chapter_id, chapter_title, chapter_index, content, word_count=0, original_title=None):
+        """把章节放入写入队列（参数与 NovelDatabase.save_chapter 相同）"""
+        self._ensure_thread()
+        self._queue.put((novel_id, chapter_id, chapter_title, original_title,
+                         chapter_index, content, word_count))
+
+    def flush(self, timeout=None):
+        """等待此前放入的章节全部提交
 
-    def has_category_novels_cache_today(self, category_key: str) -> bool:
-        """检查今日是否已有该分类的小说缓存"""
-        import datetime
-        today = datetime.date.today().isoformat()
-        with self.get_connection() as conn:
-            cursor = conn.cursor()
-            cursor.execute(
-                'SELECT COUNT(*) as cnt FROM category_novels_cache WHERE cached_date = ? AND category_key = ?',
-                (today, category_key)
-            )
-            return cursor.fetchone()['cnt'] > 0
\ No newline at end of file
+        Returns:
+            bool: 全部写入成功返回 True；有写入失败或等待超时返回 False
+        """
+        if self._thread is None:
+            return True
+        self._ensure_thread()
+        barrier = threading.Event()
+        self._queue.put(barrier)
+        if not barrier.wait(timeout):
+            return False
+        with self._failed_lock:
+            failed, self._failed = self._failed, 0
+        return failed == 0
+
+    def close(self, timeout=None):
+        """写完队列中剩余的章节并停止写入线程"""
+        ok = self.flush(timeout)
+        thread = self._thread
+        if thread is not None and thread.is_alive():
+            self._queue.put(None)
+            thread.join(timeout)
+        self._thread = None
+        return ok
+
+    def _next_batch(self):
+        """阻塞等待第一项，再在 batch_delay 内尽量凑满一批
+
+        Returns:
+            (rows, barriers, stop)
+        """
+        rows, barriers = [], []
+        item = self._queue.get()
+        deadline = time.monotonic() + self.batch_delay
+        while True:
+            if item is None:
+                return rows, barriers, True
+            if isinstance(item, threading.Event):
+                # 屏障之前的章节必须在通知等待方之前提交，直接结束本批
+                barriers.append(item)
+                return rows, barriers, False
+            rows.append(item)
+            if len(rows) >= self.batch_size:
+                return rows, barriers, False
+            remaining = deadline - time.monotonic()
+            try:
+                item = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+            except queue.Empty:
+                return rows, barriers, False
+
+    def _run(self):
+        while True:
+            rows, barriers, stop = self._next_batch()
+            try:
+                if rows:
+                    self.db.save_chapters(rows)
+                    self.written += len(rows)
+            except Exception as e:
+                # 任何异常都不能让写入线程退出，否则等待屏障的 flush()/close() 会一直阻塞
+                print(f"✗ 章节批量写入失败（{len(rows)} 章）: {e}")
+                with self._failed_lock:
+                    self._failed += len(rows)
+            finally:
+                for barrier in barriers:
+                    barrier.set()
+            if stop:
+                return
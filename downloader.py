@@ -1,26 +1,63 @@
 # 小说下载和导出模块
 import os
+import re
 import time
 import random
-from concurrent.futures import ThreadPoolExecutor, as_completed
+import shutil
+import tempfile
+import zipfile
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, ThreadPoolExecutor, as_completed, wait
 from config import (
     DOWNLOAD_DIR,
-    OUTPUT_FORMAT,
+    get_output_format,
+    get_remove_empty_lines,
     REQUEST_DELAY_MIN,
     REQUEST_DELAY_MAX,
     MAX_CONCURRENT_REQUESTS,
     calculate_smart_delay,
     MAX_CONCURRENT_DOWNLOADS
 )
-from database import NovelDatabase
+from database import NovelDatabase, ChapterWriter
+from epub_writer import EpubWriter
+
+# 导出 TXT 时的写缓冲区大小
+EXPORT_BUFFER_SIZE = 1024 * 1024
+# 导出进度回调的间隔（章）
+EXPORT_PROGRESS_STEP = 20
+# 批量导出时同时导出的书数上限（每本书一个进程，同时还受 CPU 核数限制；再多会在磁盘写入上互相等待）
+EXPORT_MAX_WORKERS = 4
+# 批量导出支持的格式：zip 为每本书一个 TXT，打包成一个压缩包
+EXPORT_BATCH_FORMATS = ('txt', 'epub', 'zip')
+# 文件名（以及压缩包内的文件名）中不能出现的字符
+_INVALID_FILENAME_CHARS = re.compile(r'[\\/:*?"<>|\x00-\x1f]')
+
+
+def safe_filename(name, default='未命名'):
+    """把书名转换为可用的文件名：非法字符替换为下划线，去掉首尾的空格和点"""
+    name = _INVALID_FILENAME_CHARS.sub('_', name or '').strip(' .')
+    return name or default
+
+
+# 导出子进程中复用的下载器（每个进程只打开一次数据库）
+_export_downloader = None
+
+
+def _export_book(db_path, ext, novel_id, path, download_range=None):
+    """在导出子进程中导出一本书，返回是否成功"""
+    global _export_downloader
+    if _export_downloader is None or _export_downloader.db.db_path != db_path:
+        _export_downloader = NovelDownloader(NovelDatabase(db_path))
+    downloader = _export_downloader
+    downloader.download_ranges = {novel_id: download_range} if download_range else {}
+    export = downloader.export_to_epub if ext == 'epub' else downloader.export_to_txt
+    return export(novel_id, path)
 
 
 class NovelDownloader:
-    def __init__(self):
-        self.db = NovelDatabase()
+    def __init__(self, db=None):
+        self.db = db if db is not None else NovelDatabase()
         self.download_ranges = {}  # 记录每个小说的下载范围
         self.current_source = None  # 当前使用的源：'official' 或 'third_party'
-        self.db_lock = None  # 数据库写入锁（并发模式下使用）
 
     def download_novel(self, spider, novel_id, start_chapter=1, end_chapter=None, source='official'):
         """
@@ -98,14 +135,11 @@ class NovelDownloader:
 
         # 第三方模式：使用并发下载
         if not apply_delay:
-            import threading
-
-            # 初始化线程锁
-            self.db_lock = threading.Lock()
+            # 章节交给后台写入线程批量入库，下载线程不再排队等待数据库
+            writer = ChapterWriter(self.db)
 
             # 定义下载单个章节的函数
             def download_single_chapter(chapter_info):
-                nonlocal success_count
                 chapter = chapter_info
                 chapter_id = chapter['chapter_id']
                 chapter_title = chapter['chapter_title']
@@ -123,19 +157,16 @@ class NovelDownloader:
                     content = chapter_data.get('content', '')
                     word_count = len(content)
 
-                    # 使用锁保护数据库写入
-                    with self.db_lock:
-                        # 保存到数据库，同时保存原始标题（来自章节列表）
-                        self.db.save_chapter(
-                            novel_id=novel_id,
-                            chapter_id=chapter_id,
-                            chapter_title=real_title,
-                            chapter_index=chapter_index,
-                            content=content,
-                            word_count=word_count,
-                            original_title=chapter_title  # 保存章节列表中的原始标题
-                        )
-                        success_count += 1
+                    # 放入写入队列，同时保存原始标题（来自章节列表）
+                    writer.put(
+                        novel_id=novel_id,
+                        chapter_id=chapter_id,
+                        chapter_title=real_title,
+                        chapter_index=chapter_index,
+                        content=content,
+                        word_count=word_count,
+                        original_title=chapter_title  # 保存章节列表中的原始标题
+                    )
 
                     print(f"  ✓ 成功下载 - {real_title}")
                     return True
@@ -151,9 +182,17 @@ class NovelDownloader:
                     for idx in range(start_index, end_index)
                 }
 
-                # 等待所有任务完成
-                for future in as_completed(future_to_chapter):
-                    pass  # 结果已在 download_single_chapter 中处理
+                # 等待所有任务完成，统计成功章节数
+                queued_count = sum(
+                    1 for future in as_completed(future_to_chapter)
+                    if future.exception() is None and future.result()
+                )
+
+            # 等待写入线程提交全部章节，之后才能更新最终状态和导出
+            if writer.close():
+                success_count = queued_count
+            else:
+                success_count = self.db.count_chapters(novel_id, start_index + 1, end_index)
 
         # 官网模式：使用顺序下载
         else:
@@ -220,15 +259,43 @@ class NovelDownloader:
         """去除多余空行，只保留段落间必要的单个换行"""
         if not text:
             return ''
-        lines = text.split('\n')
-        cleaned = [line.strip() for line in lines]
-        cleaned = [line for line in cleaned if line]
-        return '\n'.join(cleaned)
+        return '\n'.join(filter(None, map(str.strip, text.split('\n'))))
 
-    def export_to_txt(self, novel_id, output_path=None):
+    @staticmethod
+    def _chapter_display_title(chapter):
+        """章节标题：为空或只有 "-" 时依次退回到原始标题（来自章节列表）和“第N章”"""
+        chapter_title = chapter.get('chapter_title') or ''
+        if chapter_title.strip() and chapter_title.strip() != '-':
+            return chapter_title.strip()
+        # 尝试使用原始标题（来自章节列表）
+        original_title = chapter.get('original_title') or ''
+        if original_title.strip() and original_title.strip() != '-':
+            print(f"  ✓ 使用原始标题: {original_title.strip()}")
+            return original_title.strip()
+        # 如果原始标题也为空，则使用章节索引生成默认标题
+        chapter_title = f"第{chapter.get('chapter_index', 0)}章"
+        print(f"  ⚠ 警告：章节标题为空，使用默认标题: {chapter_title}")
+        return chapter_title
+
+    def export(self, novel_id, output_path=None, progress_callback=None):
+        """按格式导出：output_path 以 .epub/.txt 结尾时按扩展名，否则按 config.output_format"""
+        ext = os.path.splitext(output_path or '')[1].lower()
+        fmt = ext[1:] if ext in ('.txt', '.epub') else get_output_format()
+        if fmt == 'epub':
+            return self.export_to_epub(novel_id, output_path, progress_callback)
+        return self.export_to_txt(novel_id, output_path, progress_callback)
+
+    def export_to_txt(self, novel_id, output_path=None, progress_callback=None):
         """导出为TXT文件
 
         根据 config.remove_empty_lines 决定是否去除空行（默认不去除）。
+        章节按顺序从数据库游标逐批读取、边读边写，内存占用与书的大小无关。
+
+        Args:
+            novel_id: 小说ID
+            output_path: 输出文件或文件夹路径，默认保存到下载目录
+            progress_callback: 可选，progress_callback(已处理章节数, 总章节数)，
+                每 EXPORT_PROGRESS_STEP 章及结束时调用一次（在调用 export_to_txt 的线程中）
         """
         novel = self.db.get_novel(novel_id)
         if not novel:
@@ -250,13 +317,13 @@ class NovelDownloader:
         # 使用记录的下载范围，如果没有记录则导出所有章节
         if novel_id in self.download_ranges:
             start_index, end_index = self.download_ranges[novel_id]
-            chapters = self.db.get_chapters_range(novel_id, start_index, end_index)
             print(f"导出范围: 第{start_index}章 - 第{end_index}章")
         else:
-            chapters = self.db.get_chapters(novel_id)
+            start_index = end_index = None
             print(f"导出所有章节")
 
-        if not chapters:
+        total = self.db.count_chapters(novel_id, start_index, end_index)
+        if not total:
             print("没有可导出的章节！")
             return False
 
@@ -275,12 +342,12 @@ class NovelDownloader:
         novel_dict = dict(novel)
 
         try:
-            with open(output_path, 'w', encoding='utf-8') as f:
+            with open(output_path, 'w', encoding='utf-8', buffering=EXPORT_BUFFER_SIZE) as f:
                 # 写入小说信息
                 f.write("=" * 50 + "\n")
                 f.write(f"书名: {novel_dict['title']}\n")
                 f.write(f"作者: {novel_dict['author']}\n")
-                f.write(f"简介: {_clean(novel_dict.get('description', ''))}\n")
+                f.write(f"简介: {_clean(novel_dict.get('description') or '')}\n")
                 # 只有官网模式才显示字数和章节数
                 if novel_dict.get('source', 'official') == 'official':
                     f.write(f"字数: {novel_dict['word_count']:,} 字\n")
@@ -288,36 +355,81 @@ class NovelDownloader:
                 f.write("=" * 50 + "\n")
 
                 # 写入章节内容
+                separator = '=' * 30
+                chapters = self.db.iter_chapters(novel_id, start_index, end_index)
+                done = 0
                 for chapter in chapters:
-                    # 将 sqlite3.Row 对象转换为字典以支持 .get() 方法
-                    chapter_dict = dict(chapter)
-
-                    # 获取章节标题，如果为空或只有 "-"，则尝试使用原始标题
-                    chapter_title = chapter_dict.get('chapter_title', '')
-                    if not chapter_title or chapter_title.strip() == '-' or len(chapter_title.strip()) == 0:
-                        # 尝试使用原始标题（来自章节列表）
-                        original_title = chapter_dict.get('original_title', '')
-                        if original_title and original_title.strip() and original_title.strip() != '-':
-                            chapter_title = original_title.strip()
-                            print(f"  ✓ 使用原始标题: {chapter_title}")
-                        else:
-                            # 如果原始标题也为空，则使用章节索引生成默认标题
-                            chapter_index = chapter_dict.get('chapter_index', 0)
-                            chapter_title = f"第{chapter_index}章"
-                            print(f"  ⚠ 警告：章节标题为空，使用默认标题: {chapter_title}")
-                    else:
-                        chapter_title = chapter_title.strip()
-
-                    content = _clean(chapter_dict.get('content', ''))
+                    done += 1
+                    if progress_callback and done % EXPORT_PROGRESS_STEP == 0:
+                        progress_callback(done, total)
+                    content = _clean(chapter.get('content') or '')
                     if not content:
                         continue
+                    chapter_title = self._chapter_display_title(chapter)
+                    f.write(f"\n{separator}\n{chapter_title}\n{separator}\n{content}\n")
 
-                    f.write(f"\n{'='*30}\n")
-                    f.write(f"{chapter_title}\n")
-                    f.write(f"{'='*30}\n")
-                    f.write(content)
-                    f.write("\n")
+            if progress_callback:
+                progress_callback(total, total)
+            print(f"✓ 导出成功！文件保存到: {output_path}")
+            return True
+
+        except PermissionError:
+            print(f"✗ 导出失败: 权限不足，无法保存历史记录，请将软件放在C盘以外【不受保护的】磁盘中 {output_path}")
+            return False
+        except OSError as e:
+            print(f"✗ 导出失败: 系统错误 - {e}")
+            return False
+        except Exception as e:
+            print(f"✗ 导出失败: {e}")
+            return False
 
+    def export_to_epub(self, novel_id, output_path=None, progress_callback=None):
+        """导出为EPUB文件
+
+        与 export_to_txt 相同，章节从数据库游标逐批读取，每章写入 zip 中的一个 XHTML 文件，
+        内存占用与书的大小无关。参数同 export_to_txt。
+        """
+        novel = self.db.get_novel(novel_id)
+        if not novel:
+            print("小说不存在！")
+            return False
+
+        if novel_id in self.download_ranges:
+            start_index, end_index = self.download_ranges[novel_id]
+            print(f"导出范围: 第{start_index}章 - 第{end_index}章")
+        else:
+            start_index = end_index = None
+            print(f"导出所有章节")
+
+        total = self.db.count_chapters(novel_id, start_index, end_index)
+        if not total:
+            print("没有可导出的章节！")
+            return False
+
+        if not output_path:
+            output_path = os.path.join(DOWNLOAD_DIR, f"{novel['title']}.epub")
+        elif os.path.isdir(output_path):
+            output_path = os.path.join(output_path, f"{novel['title']}.epub")
+
+        print(f"正在导出到: {output_path}")
+        novel_dict = dict(novel)
+
+        try:
+            with EpubWriter(output_path, novel_dict['title'], novel_dict.get('author') or '',
+                            novel_dict.get('description') or '') as epub:
+                done = 0
+                for chapter in self.db.iter_chapters(novel_id, start_index, end_index):
+                    done += 1
+                    if progress_callback and done % EXPORT_PROGRESS_STEP == 0:
+                        progress_callback(done, total)
+                    content = chapter.get('content') or ''
+                    if not content.strip():
+                        continue
+                    epub.add_chapter(self._chapter_display_title(chapter), content,
+                                     order=chapter['chapter_index'])
+
+            if progress_callback:
+                progress_callback(total, total)
             print(f"✓ 导出成功！文件保存到: {output_path}")
             return True
 
@@ -331,6 +443,149 @@ class NovelDownloader:
             print(f"✗ 导出失败: {e}")
             return False
 
+    def export_batch(self, novel_ids, output_dir, fmt=None, progress_callback=None,
+                     max_workers=None, stop_event=None):
+        """批量导出多本书（多进程并发，每本书流式读取数据库）
+
+        导出主要是 Python 层的解压和拼接文本，受 GIL 限制，因此每本书交给一个子进程导出，
+        进程数不超过 CPU 核数和 EXPORT_MAX_WORKERS；只有一本书或单核时在本进程中逐本导出。
+        txt/epub 格式下，已经导出过、文件未被改动且内容没有变化（content_checksum 相同）的书直接跳过。
+        zip 格式每次重新打包：各书先导出到临时目录，导出完成一本就写入压缩包一本。
+        文件名由书名得到（去掉 / \\ : ? * 等不能用于文件名的字符）。
+
+        Args:
+            novel_ids: 小说ID列表
+            output_dir: 输出文件夹
+            fmt: 'txt' / 'epub' / 'zip'，默认取 config.output_format
+            progress_callback: 可选，progress_callback(event)，在调用 export_batch 的线程中调用，event 为 dict：
+                {novel_id, title, status, done, total, books_done, books_total, path, error}
+                status 为 'running'（章节进度，只在本进程中导出时报告）、'done'、'skipped' 或 'failed'
+            max_workers: 进程数，默认 min(CPU 核数, EXPORT_MAX_WORKERS)
+            stop_event: 可选 threading.Event，set 后不再开始新的书
+
+        Returns:
+            dict: {exported: [novel_id], skipped: [novel_id], failed: [(novel_id, 原因)], path: 输出路径}
+        """
+        fmt = fmt or get_output_format()
+        if fmt not in EXPORT_BATCH_FORMATS:
+            raise ValueError(f'不支持的导出格式: {fmt}')
+        os.makedirs(output_dir, exist_ok=True)
+        summary = {'exported': [], 'skipped': [], 'failed': [], 'path': output_dir}
+        books_total = len(novel_ids)
+
+        def report(novel_id, title, status, done=0, total=0, path=None, error=None):
+            if status in ('done', 'skipped', 'failed'):
+                key = {'done': 'exported', 'skipped': 'skipped', 'failed': 'failed'}[status]
+                summary[key].append((novel_id, error) if status == 'failed' else novel_id)
+            if progress_callback:
+                books_done = len(summary['exported']) + len(summary['skipped']) + len(summary['failed'])
+                progress_callback({
+                    'novel_id': novel_id, 'title': title, 'status': status,
+                    'done': done, 'total': total, 'books_done': books_done, 'books_total': books_total,
+                    'path': path, 'error': error,
+                })
+
+        # 先确定每本书的文件名（同名书加上 ID 区分，避免互相覆盖）
+        work_dir = tempfile.mkdtemp(prefix='export_') if fmt == 'zip' else output_dir
+        ext = 'epub' if fmt == 'epub' else 'txt'
+        jobs, used = [], set()
+        for novel_id in novel_ids:
+            novel = self.db.get_novel(novel_id)
+            if not novel:
+                report(novel_id, '', 'failed', error='小说不存在')
+                continue
+            stem = safe_filename(novel['title'], default=str(novel_id))
+            name = f"{stem}.{ext}"
+            if name.lower() in used:
+                name = f"{stem}_{safe_filename(str(novel_id))}.{ext}"
+            used.add(name.lower())
+            jobs.append((novel_id, novel['title'], os.path.join(work_dir, name)))
+
+        # 校验和混入会影响输出内容的选项
+        salt = f"{ext}|{get_remove_empty_lines()}"
+
+        # 内容没有变化的书在本进程中直接跳过，其余的交给导出进程
+        pending = []
+        for novel_id, title, path in jobs:
+            checksum = self.db.content_checksum(novel_id, salt)
+            if fmt != 'zip':
+                record = self.db.get_export_record(novel_id, path)
+                if (record and record['checksum'] == checksum and os.path.exists(path)
+                        and os.path.getsize(path) == record['size']):
+                    report(novel_id, title, 'skipped', path=path)
+                    continue
+            pending.append((novel_id, title, path, checksum))
+
+        def stopped():
+            return stop_event is not None and stop_event.is_set()
+
+        def finish(novel_id, title, path, checksum):
+            """一本书导出完成：写入压缩包或记录导出信息（压缩包只能顺序写入，都在本进程中进行）"""
+            if archive is not None:
+                archive.write(path, os.path.basename(path))
+                os.remove(path)
+                path = summary['path']
+            else:
+                self.db.save_export_record(novel_id, path, checksum, os.path.getsize(path))
+            report(novel_id, title, 'done', path=path)
+
+        if max_workers is None:
+            max_workers = min(os.cpu_count() or 1, EXPORT_MAX_WORKERS)
+        workers = min(max_workers, len(pending))
+        archive = None
+        if fmt == 'zip':
+            summary['path'] = os.path.join(output_dir, f"书库导出_{time.strftime('%Y%m%d_%H%M%S')}.zip")
+            archive = zipfile.ZipFile(summary['path'], 'w', compression=zipfile.ZIP_DEFLATED)
+        try:
+            if workers <= 1:
+                for novel_id, title, path, checksum in pending:
+                    if stopped():
+                        break
+
+                    def progress(done, total):
+                        report(novel_id, title, 'running', done, total)
+
+                    export = self.export_to_epub if ext == 'epub' else self.export_to_txt
+                    try:
+                        ok = export(novel_id, path, progress)
+                    except Exception as e:
+                        report(novel_id, title, 'failed', error=str(e))
+                        continue
+                    if not ok:
+                        report(novel_id, title, 'failed', error='导出失败')
+                        continue
+                    finish(novel_id, title, path, checksum)
+            else:
+                # 同时只提交 workers 本，stop_event set 后不再提交新的书
+                queue = list(reversed(pending))
+                running = {}
+                with ProcessPoolExecutor(max_workers=workers) as pool:
+                    while queue or running:
+                        while queue and len(running) < workers and not stopped():
+                            job = queue.pop()
+                            future = pool.submit(_export_book, self.db.db_path, ext, job[0], job[2],
+                                                 self.download_ranges.get(job[0]))
+                            running[future] = job
+                        if not running:
+                            break
+                        done, _ = wait(running, return_when=FIRST_COMPLETED)
+                        for future in done:
+                            novel_id, title, path, checksum = running.pop(future)
+                            try:
+                                ok = future.result()
+                            except Exception as e:
+                                report(novel_id, title, 'failed', error=str(e))
+                                continue
+                            if not ok:
+                                report(novel_id, title, 'failed', error='导出失败')
+                                continue
+                            finish(novel_id, title, path, checksum)
+        finally:
+            if archive is not None:
+                archive.close()
+                shutil.rmtree(work_dir, ignore_errors=True)
+        return summary
+
     def list_novels(self):
         """列出所有已下载的小说"""
         novels = self.db.get_all_novels()
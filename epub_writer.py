@@ -0,0 +1,254 @@
+# EPUB 流式写入模块
+"""边下载边写入 EPUB
+
+EPUB 是一个 zip 包：mimetype（必须是第一个、不压缩）、META-INF/container.xml、
+每章一个 XHTML 文件，以及描述目录和阅读顺序的 content.opf / toc.ncx / nav.xhtml。
+
+EpubWriter 每收到一章就把它压缩写入 zip，内存中只保留各章的文件序号和标题；
+目录文件在 close() 时最后写入。追加模式打开已有的 EPUB 时，只截掉末尾的目录文件，
+已写入的章节原样保留，新章节接在后面，最后重新生成目录。
+
+写入始终在旁边的临时文件（<path>.tmp）上进行，close() 写完目录后才用 os.replace 替换目标文件：
+追加模式先把已有 EPUB 复制一份再改动，中途崩溃时原文件保持完整。
+"""
+import html
+import os
+import posixpath
+import shutil
+import time
+import uuid
+import zipfile
+import xml.etree.ElementTree as ET
+
+# 章节文件所在目录（相对 OEBPS）
+TEXT_DIR = 'text'
+# close() 时重新生成的目录文件，始终位于 zip 的末尾
+MANIFEST_FILES = ('OEBPS/content.opf', 'OEBPS/toc.ncx', 'OEBPS/nav.xhtml')
+
+_CONTAINER_XML = '''<?xml version="1.0" encoding="UTF-8"?>
+<container version="1.0" xmlns="urn:oasis:names:tc:opendocument:xmlns:container">
+  <rootfiles>
+    <rootfile full-path="OEBPS/content.opf" media-type="application/oebps-package+xml"/>
+  </rootfiles>
+</container>
+'''
+
+_STYLE_CSS = '''body { margin: 0 5%; line-height: 1.8; }
+h2 { text-align: center; margin: 1.5em 0; }
+p { text-indent: 2em; margin: 0.4em 0; }
+'''
+
+_NS = {
+    'opf': 'http://www.idpf.org/2007/opf',
+    'dc': 'http://purl.org/dc/elements/1.1/',
+    'xhtml': 'http://www.w3.org/1999/xhtml',
+}
+
+
+def _xhtml_page(title, body, stylesheet='../style.css'):
+    return (
+        '<?xml version="1.0" encoding="utf-8"?>\n'
+        '<!DOCTYPE html>\n'
+        '<html xmlns="http://www.w3.org/1999/xhtml" xmlns:epub="http://www.idpf.org/2007/ops" lang="zh-CN">\n'
+        f'<head><meta charset="utf-8"/><title>{html.escape(title)}</title>'
+        f'<link rel="stylesheet" type="text/css" href="{stylesheet}"/></head>\n'
+        f'<body>\n{body}</body>\n</html>\n'
+    )
+
+
+def chapter_xhtml(title, content):
+    """把一章纯文本转换为 XHTML：标题为 <h2>，每个非空行一个 <p>"""
+    parts = [f'<h2>{html.escape(title)}</h2>\n']
+    for line in (content or '').split('\n'):
+        line = line.strip()
+        if line:
+            parts.append(f'<p>{html.escape(line)}</p>\n')
+    return _xhtml_page(title, ''.join(parts))
+
+
+class EpubWriter:
+    """流式 EPUB 写入器
+
+    用法：
+        with EpubWriter(path, title, author) as epub:
+            epub.add_chapter('第一章', text, order=0)
+            ...
+
+    order 是章节在全书中的位置（从 0 开始），决定目录和阅读顺序，
+    章节可以按任意顺序加入（并发下载时按完成顺序）；省略时排在当前最后一章之后。
+    同一个 order 只写入一次，重复加入会被忽略。
+    """
+
+    def __init__(self, path, title, author='', description='', append=False):
+        self.path = path
+        self._tmp_path = path + '.tmp'  # 写入中的文件，close() 成功后替换 path
+        self.title = title or '未命名'
+        self.author = author or ''
+        self.description = description or ''
+        self.identifier = f'urn:uuid:{uuid.uuid4()}'
+        self._chapters = {}  # {order: 标题}
+        self._zip = None
+        if append and os.path.exists(path):
+            self._reopen()
+        else:
+            self._create()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def __len__(self):
+        return len(self._chapters)
+
+    def __contains__(self, order):
+        return order in self._chapters
+
+    def _create(self):
+        self._zip = zipfile.ZipFile(self._tmp_path, 'w', compression=zipfile.ZIP_DEFLATED)
+        # mimetype 必须是第一个文件且不压缩，阅读器靠它识别 EPUB
+        self._zip.writestr('mimetype', 'application/epub+zip', compress_type=zipfile.ZIP_STORED)
+        self._zip.writestr('META-INF/container.xml', _CONTAINER_XML)
+        self._zip.writestr('OEBPS/style.css', _STYLE_CSS)
+
+    def _reopen(self):
+        """以追加模式打开已有 EPUB 的副本：读出章节目录，截掉末尾的目录文件，之后的写入从那里开始"""
+        shutil.copyfile(self.path, self._tmp_path)
+        zf = zipfile.ZipFile(self._tmp_path, 'a', compression=zipfile.ZIP_DEFLATED)
+        try:
+            self._read_metadata(zf)
+            self._read_chapters(zf)
+        except (KeyError, ET.ParseError) as e:
+            self._discard(zf)
+            raise ValueError(f'无法追加到 {self.path}：不是本程序生成的 EPUB（{e}）') from e
+
+        manifest = [info for info in zf.infolist() if info.filename in MANIFEST_FILES]
+        if manifest:
+            start = min(info.header_offset for info in manifest)
+            if any(info.header_offset > start for info in zf.infolist() if info not in manifest):
+                self._discard(zf)
+                raise ValueError(f'无法追加到 {self.path}：目录文件不在末尾')
+            # 从文件列表中去掉目录文件，并让后续写入覆盖它们原来的位置（start_dir 是
+            # 追加模式下新文件的写入位置）；close() 写中央目录后 zipfile 会截断文件多余的部分
+            for info in manifest:
+                zf.filelist.remove(info)
+                del zf.NameToInfo[info.filename]
+            zf.start_dir = start
+        self._zip = zf
+
+    def _discard(self, zf):
+        """关闭 zip 并删除临时文件，目标文件保持不变"""
+        try:
+            zf.close()
+        finally:
+            if os.path.exists(self._tmp_path):
+                os.remove(self._tmp_path)
+
+    def _read_metadata(self, zf):
+        opf = ET.fromstring(zf.read('OEBPS/content.opf'))
+        metadata = opf.find('opf:metadata', _NS)
+        self.identifier = metadata.findtext('dc:identifier', self.identifier, _NS)
+        self.title = metadata.findtext('dc:title', self.title, _NS)
+        self.author = metadata.findtext('dc:creator', self.author, _NS)
+        self.description = metadata.findtext('dc:description', self.description, _NS)
+
+    def _read_chapters(self, zf):
+        nav = ET.fromstring(zf.read('OEBPS/nav.xhtml'))
+        for link in nav.iter(f"{{{_NS['xhtml']}}}a"):
+            name = posixpath.basename(link.get('href', ''))
+            stem = name.split('.', 1)[0]
+            if stem.isdigit():
+                self._chapters[int(stem)] = link.text or ''
+
+    @staticmethod
+    def _chapter_href(order):
+        return f'{TEXT_DIR}/{order:06d}.xhtml'
+
+    def add_chapter(self, title, content, order=None):
+        """写入一章，返回是否写入（order 已存在时返回 False）"""
+        if order is None:
+            order = max(self._chapters, default=-1) + 1
+        if order in self._chapters:
+            return False
+        title = title or f'第{order + 1}章'
+        self._zip.writestr(f'OEBPS/{self._chapter_href(order)}', chapter_xhtml(title, content))
+        self._chapters[order] = title
+        return True
+
+    def close(self):
+        """写入目录文件并关闭 zip，再用临时文件替换目标文件（可重复调用）
+
+        写目录失败时丢弃临时文件，目标文件保持原样。
+        """
+        if self._zip is None:
+            return
+        zf, self._zip = self._zip, None
+        try:
+            orders = sorted(self._chapters)
+            zf.writestr('OEBPS/content.opf', self._content_opf(orders))
+            zf.writestr('OEBPS/toc.ncx', self._toc_ncx(orders))
+            zf.writestr('OEBPS/nav.xhtml', self._nav_xhtml(orders))
+        except BaseException:
+            self._discard(zf)
+            raise
+        zf.close()
+        os.replace(self._tmp_path, self.path)
+
+    def _content_opf(self, orders):
+        esc = html.escape
+        items = ''.join(
+            f'    <item id="c{order}" href="{self._chapter_href(order)}" media-type="application/xhtml+xml"/>\n'
+            for order in orders
+        )
+        spine = ''.join(f'    <itemref idref="c{order}"/>\n' for order in orders)
+        description = f'    <dc:description>{esc(self.description)}</dc:description>\n' if self.description else ''
+        return (
+            '<?xml version="1.0" encoding="utf-8"?>\n'
+            '<package xmlns="http://www.idpf.org/2007/opf" version="3.0" unique-identifier="book-id">\n'
+            '  <metadata xmlns:dc="http://purl.org/dc/elements/1.1/">\n'
+            f'    <dc:identifier id="book-id">{esc(self.identifier)}</dc:identifier>\n'
+            f'    <dc:title>{esc(self.title)}</dc:title>\n'
+            f'    <dc:creator>{esc(self.author)}</dc:creator>\n'
+            f'{description}'
+            '    <dc:language>zh-CN</dc:language>\n'
+            f'    <meta property="dcterms:modified">{time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime())}</meta>\n'
+            '  </metadata>\n'
+            '  <manifest>\n'
+            '    <item id="nav" href="nav.xhtml" media-type="application/xhtml+xml" properties="nav"/>\n'
+            '    <item id="ncx" href="toc.ncx" media-type="application/x-dtbncx+xml"/>\n'
+            '    <item id="style" href="style.css" media-type="text/css"/>\n'
+            f'{items}'
+            '  </manifest>\n'
+            '  <spine toc="ncx">\n'
+            f'{spine}'
+            '  </spine>\n'
+            '</package>\n'
+        )
+
+    def _toc_ncx(self, orders):
+        esc = html.escape
+        points = ''.join(
+            f'    <navPoint id="p{order}" playOrder="{i}"><navLabel><text>{esc(self._chapters[order])}</text>'
+            f'</navLabel><content src="{self._chapter_href(order)}"/></navPoint>\n'
+            for i, order in enumerate(orders, 1)
+        )
+        return (
+            '<?xml version="1.0" encoding="utf-8"?>\n'
+            '<ncx xmlns="http://www.daisy.org/z3986/2005/ncx/" version="2005-1">\n'
+            f'  <head><meta name="dtb:uid" content="{esc(self.identifier)}"/></head>\n'
+            f'  <docTitle><text>{esc(self.title)}</text></docTitle>\n'
+            '  <navMap>\n'
+            f'{points}'
+            '  </navMap>\n'
+            '</ncx>\n'
+        )
+
+    def _nav_xhtml(self, orders):
+        esc = html.escape
+        links = ''.join(
+            f'<li><a href="{self._chapter_href(order)}">{esc(self._chapters[order])}</a></li>\n'
+            for order in orders
+        )
+        body = f'<nav epub:type="toc" id="toc">\n<h1>目录</h1>\n<ol>\n{links}</ol>\n</nav>\n'
+        return _xhtml_page(self.title, body, stylesheet='style.css')
@@ -3,10 +3,14 @@ import requests
 import os
 import re
 import json
+import hashlib
+import threading
+import importlib.util
+from concurrent.futures import Future, ProcessPoolExecutor
 from PIL import Image, ImageDraw, ImageFont
 from fontTools.ttLib import TTFont
 from io import BytesIO
-from typing import Dict, Optional
+from typing import Dict, List, Optional
 
 # 博客中提供的静态字体映射（参考博客实现）
 DEFAULT_FONT_MAPPING = {
@@ -51,25 +55,263 @@ DEFAULT_FONT_MAPPING = {
 }
 
 
+# 番茄加密字体使用的私用区（PUA）码位范围
+PUA_START = 0xE000
+PUA_END = 0xF8FF
+_PUA_PATTERN = re.compile('[\ue000-\uf8ff]')
+
+# OCR 渲染画布边长（ddddocr 识别前会把图片缩到 64 像素高，更大的画布只会增加渲染和编码开销）
+OCR_IMG_SIZE = 128
+# 每个 OCR 子进程至少分到的字形数，字形较少时直接在本进程识别，省去启动子进程和加载模型的开销
+OCR_MIN_BATCH = 16
+
+
+def pua_codes(text: str) -> set:
+    """文本中出现的私用区码位（即需要解密的字符）"""
+    return {ord(ch) for ch in set(_PUA_PATTERN.findall(text or ''))}
+
+
+def render_glyph(code: int, font, img_size: int = OCR_IMG_SIZE) -> Optional[bytes]:
+    """把单个字形居中画到白底 PNG 上（font 为 ImageFont 对象）"""
+    try:
+        img = Image.new('1', (img_size, img_size), 255)
+        draw = ImageDraw.Draw(img)
+        txt = chr(code)
+        bbox = draw.textbbox((0, 0), txt, font=font)
+        x = bbox[2] - bbox[0]
+        y = bbox[3] - bbox[1]
+        draw.text(((img_size - x) // 2, (img_size - y) // 2), txt, font=font, fill=0)
+
+        img_bytes = BytesIO()
+        img.save(img_bytes, format="PNG")
+        return img_bytes.getvalue()
+    except Exception:
+        return None
+
+
+_worker_ocr = None  # OCR 子进程内复用的 ddddocr 实例
+
+
+def _ocr_glyphs(font_path: str, codes: List[int], img_size: int = OCR_IMG_SIZE, ocr=None) -> Dict[int, str]:
+    """渲染并识别一批字形，返回 {码位: 字符}（可在子进程中运行）"""
+    global _worker_ocr
+    if ocr is None:
+        if _worker_ocr is None:
+            import ddddocr
+            _worker_ocr = ddddocr.DdddOcr(beta=True)
+        ocr = _worker_ocr
+
+    font = ImageFont.truetype(font_path, int(img_size * 0.7))
+    result = {}
+    for code in codes:
+        img = render_glyph(code, font, img_size)
+        if img is None:
+            continue
+        try:
+            text = ocr.classification(img)
+        except Exception:
+            continue
+        if text:
+            result[code] = text[0]
+    return result
+
+
+def font_sha256(font_path: str) -> str:
+    """字体文件内容的 SHA-256（跨进程稳定，作为映射表的缓存键）"""
+    digest = hashlib.sha256()
+    with open(font_path, 'rb') as f:
+        for chunk in iter(lambda: f.read(65536), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def glyph_fingerprints(font_path: str) -> Dict[int, str]:
+    """计算字体中私用区字形的轮廓指纹 {码位: 指纹}
+
+    指纹是字形绘制指令（RecordingPen 记录的 moveTo/lineTo/curveTo 及坐标）的哈希，
+    番茄轮换字体时即使码位打乱，只要字形轮廓复用，指纹就相同。
+    空字形无法区分，不参与指纹。woff2 字体需要安装 brotli。
+    """
+    from fontTools.pens.recordingPen import RecordingPen
+
+    font = TTFont(font_path, lazy=True)
+    try:
+        cmap = font.getBestCmap() or {}
+        glyph_set = font.getGlyphSet()
+        result = {}
+        for code, glyph_name in cmap.items():
+            if not PUA_START <= code <= PUA_END:
+                continue
+            pen = RecordingPen()
+            glyph_set[glyph_name].draw(pen)
+            if not pen.value:
+                continue
+            result[code] = hashlib.sha256(repr(pen.value).encode('utf-8')).hexdigest()[:24]
+        return result
+    finally:
+        font.close()
+
+
+def compile_mapping(word_data: Dict[int, str]) -> Dict[int, str]:
+    """把映射表编译成 str.translate 使用的转换表（键统一为码位，JSON 缓存中的字符串键也兼容）"""
+    table = {}
+    for code, char in word_data.items():
+        if isinstance(code, str) and code.isdigit():
+            code = int(code)
+        if isinstance(code, int) and isinstance(char, str):
+            table[code] = char
+    return str.maketrans(table)
+
+
+class FontMapping(dict):
+    """单个字体的映射表 {码位: 字符}，同时带着编译好的 str.translate 转换表
+
+    由 FontMappingStore 创建，按只读使用：映射表有变化时 store 会创建新对象并重新编译转换表。
+    """
+
+    def __init__(self, font_hash: str, mapping: Dict[int, str]):
+        super().__init__(mapping)
+        self.font_hash = font_hash
+        self.table = compile_mapping(self)
+
+
+# 静态映射表的转换表（模块常量，只编译一次）
+_DEFAULT_TABLE = compile_mapping(DEFAULT_FONT_MAPPING)
+
+
+class FontMappingStore:
+    """字体映射表持久化存储
+
+    - mapping_<字体SHA-256>.json：单个字体文件已确认的 {码位: 字符}（来自字形索引或 OCR，不含静态映射的猜测）
+    - glyph_index.json：{字形轮廓指纹: 字符}，所有字体共享，
+      新字体的字形只要出现过，就能直接得到对应字符而无需 OCR；只记录 OCR 识别的结果
+    """
+
+    GLYPH_INDEX_FILE = 'glyph_index.json'
+
+    def __init__(self, cache_dir: str):
+        self.cache_dir = cache_dir
+        self._lock = threading.Lock()
+        self._mappings: Dict[str, FontMapping] = {}  # 字体 SHA-256 -> 映射表（附带转换表）
+        self._glyph_index: Optional[Dict[str, str]] = None
+
+    def _mapping_file(self, font_hash: str) -> str:
+        return os.path.join(self.cache_dir, f'mapping_{font_hash}.json')
+
+    def _write_json(self, path: str, data):
+        """先写临时文件再替换，避免中途退出留下损坏的缓存"""
+        tmp_path = f'{path}.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(data, f, ensure_ascii=False)
+        os.replace(tmp_path, path)
+
+    def _load_glyph_index(self) -> Dict[str, str]:
+        """加载字形指纹索引（调用方需持有锁）"""
+        if self._glyph_index is None:
+            self._glyph_index = {}
+            path = os.path.join(self.cache_dir, self.GLYPH_INDEX_FILE)
+            if os.path.exists(path):
+                try:
+                    with open(path, 'r', encoding='utf-8') as f:
+                        self._glyph_index = json.load(f)
+                except (OSError, ValueError):
+                    pass
+        return self._glyph_index
+
+    def get(self, font_hash: str) -> Optional[FontMapping]:
+        """按字体哈希获取映射表（内存 → 磁盘），不存在返回 None"""
+        with self._lock:
+            if font_hash in self._mappings:
+                return self._mappings[font_hash]
+            path = self._mapping_file(font_hash)
+            if not os.path.exists(path):
+                return None
+            try:
+                with open(path, 'r', encoding='utf-8') as f:
+                    mapping = {int(k): v for k, v in json.load(f).items()}
+            except (OSError, ValueError):
+                return None
+            mapping = self._mappings[font_hash] = FontMapping(font_hash, mapping)
+            return mapping
+
+    def match_glyphs(self, fingerprints: Dict[int, str]) -> Dict[int, str]:
+        """用字形指纹索引还原映射 {码位: 字符}（只包含索引中已知的字形）"""
+        with self._lock:
+            index = self._load_glyph_index()
+            return {code: index[fp] for code, fp in fingerprints.items() if fp in index}
+
+    def put(self, font_hash: str, mapping: Dict[int, str]) -> FontMapping:
+        """保存映射表（重新编译转换表）"""
+        with self._lock:
+            mapping = self._mappings[font_hash] = FontMapping(font_hash, mapping)
+            self._write_json(self._mapping_file(font_hash), mapping)
+            return mapping
+
+    def learn(self, font_hash: str, recognized: Dict[int, str],
+              fingerprints: Optional[Dict[int, str]] = None) -> FontMapping:
+        """把 OCR 识别的 {码位: 字符} 并入字体的映射表，并把这些字形的指纹记入索引
+
+        OCR 结果视为已确认，覆盖映射表和索引中已有的条目。
+        在锁内合并，多个线程同时识别同一字体的不同码位时不会互相覆盖。
+        """
+        with self._lock:
+            current = self._mappings.get(font_hash) or {}
+            mapping = self._mappings[font_hash] = FontMapping(font_hash, {**current, **recognized})
+            self._write_json(self._mapping_file(font_hash), mapping)
+            if not fingerprints:
+                return mapping
+            index = self._load_glyph_index()
+            changed = 0
+            for code, char in recognized.items():
+                fp = fingerprints.get(code)
+                if fp and char and index.get(fp) != char:
+                    index[fp] = char
+                    changed += 1
+            if changed:
+                self._write_json(os.path.join(self.cache_dir, self.GLYPH_INDEX_FILE), index)
+            return mapping
+
+
 class FontDecryptor:
     """番茄小说字体加密解密器 - 使用OCR自动生成映射"""
     
-    def __init__(self, cache_dir='font_cache'):
+    def __init__(self, cache_dir='font_cache', use_ocr=False, ocr_workers=None):
+        """
+        Args:
+            cache_dir: 字体和映射表缓存目录
+            use_ocr: 是否对映射表中缺少的字形做 OCR（按需识别正文中出现的码位）
+            ocr_workers: OCR 进程数（默认 CPU 核数）
+
+        同一个解密器可被多个下载线程共用：下面几个缓存字典由 _lock 保护，
+        OCR 进程池只创建一次，同时请求识别的相同码位只识别一次。
+        """
         self.cache_dir = cache_dir
         os.makedirs(cache_dir, exist_ok=True)
-        self.mapping_cache = {}
+        self.store = FontMappingStore(cache_dir)
+        self.use_ocr = use_ocr
+        self.ocr_workers = ocr_workers
+        self._font_hashes = {}  # 字体路径 -> SHA-256
+        self._fingerprints = {}  # 字体 SHA-256 -> {码位: 字形指纹}
+        self._fonts_by_url = {}  # 字体 URL -> 本地路径
+        # 不启用 OCR 时用静态映射补齐后的映射表：字体 SHA-256 -> (补齐所依据的映射表, 补齐后的映射表)
+        self._padded = {}
+        self._lock = threading.Lock()
+        self._download_lock = threading.Lock()
+        self._ocr_pool = None  # OCR 进程池（首次需要多进程识别时创建，子进程各自只加载一次模型）
+        self._ocr_pending: Dict[tuple, Future] = {}  # 正在识别的 (字体路径, 码位) -> 该批识别结果
         self.ocr = None
     
     def _init_ocr(self):
         """延迟初始化OCR"""
-        if self.ocr is None:
-            try:
-                import ddddocr
-                self.ocr = ddddocr.DdddOcr(beta=True)
-            except ImportError:
-                print("警告: ddddocr未安装，OCR功能不可用")
-                print("请运行: pip install ddddocr")
-                self.ocr = False
+        with self._lock:
+            if self.ocr is None:
+                try:
+                    import ddddocr
+                    self.ocr = ddddocr.DdddOcr(beta=True)
+                except ImportError:
+                    print("警告: ddddocr未安装，OCR功能不可用")
+                    print("请运行: pip install ddddocr")
+                    self.ocr = False
     
     def extract_font_url(self, html_content: str) -> Optional[str]:
         """从HTML中提取字体URL"""
@@ -83,9 +325,10 @@ class FontDecryptor:
     def download_font(self, url: str, save_path: str = None) -> str:
         """下载字体文件"""
         if save_path is None:
-            font_hash = abs(hash(url))
+            # 用 URL 的 SHA-256 命名（内置 hash() 每个进程随机，重启后缓存永远不命中）
+            url_hash = hashlib.sha256(url.encode('utf-8')).hexdigest()[:16]
             ext = os.path.splitext(url)[1] or '.woff2'
-            save_path = os.path.join(self.cache_dir, f'font_{font_hash}{ext}')
+            save_path = os.path.join(self.cache_dir, f'font_{url_hash}{ext}')
         
         if os.path.exists(save_path):
             return save_path
@@ -103,82 +346,208 @@ class FontDecryptor:
         
         return save_path
     
-    def font_to_img(self, _code: int, font_path: str) -> Optional[bytes]:
-        """将每个字体画成图片（参考博客实现）"""
+    def font_to_img(self, _code: int, font_path: str, img_size: int = OCR_IMG_SIZE) -> Optional[bytes]:
+        """将单个字形画成图片"""
         try:
-            img_size = 1024
-            img = Image.new('1', (img_size, img_size), 255)
-            draw = ImageDraw.Draw(img)
             font = ImageFont.truetype(font_path, int(img_size * 0.7))
-            txt = chr(_code)
-            bbox = draw.textbbox((0, 0), txt, font=font)
-            x = bbox[2] - bbox[0]
-            y = bbox[3] - bbox[1]
-            draw.text(((img_size - x) // 2, (img_size - y) // 2), txt, font=font, fill=0)
-            
-            img_bytes = BytesIO()
-            img.save(img_bytes, format="PNG")
-            return img_bytes.getvalue()
-        except Exception as e:
+        except Exception:
             return None
-    
-    def generate_mapping(self, font_path: str) -> Dict[int, str]:
-        """使用OCR生成字体映射（参考博客实现，优先使用静态映射）"""
-        # 检查缓存
-        cache_key = abs(hash(os.path.basename(font_path)))
-        if cache_key in self.mapping_cache:
-            return self.mapping_cache[cache_key]
-        
-        # 尝试从文件加载缓存
-        cache_file = os.path.join(self.cache_dir, f'mapping_{cache_key}.json')
-        if os.path.exists(cache_file):
+        return render_glyph(_code, font, img_size)
+
+    def _font_hash(self, font_path: str) -> str:
+        with self._lock:
+            font_hash = self._font_hashes.get(font_path)
+        if font_hash is None:
+            font_hash = font_sha256(font_path)
+            with self._lock:
+                font_hash = self._font_hashes.setdefault(font_path, font_hash)
+        return font_hash
+
+    def _font_fingerprints(self, font_path: str, font_hash: str) -> Dict[int, str]:
+        """字体私用区字形指纹（每个字体只计算一次，失败返回空字典）"""
+        with self._lock:
+            fingerprints = self._fingerprints.get(font_hash)
+        if fingerprints is None:
             try:
-                with open(cache_file, 'r', encoding='utf-8') as f:
-                    mapping = json.load(f)
-                    self.mapping_cache[cache_key] = {int(k): v for k, v in mapping.items()}
-                    print(f"从缓存加载映射表: {len(mapping)} 个字符")
-                    return self.mapping_cache[cache_key]
-            except:
-                pass
-        
-        # 优先使用静态映射
-        print(f"使用静态字体映射: {len(DEFAULT_FONT_MAPPING)} 个字符")
-        font_mapping = DEFAULT_FONT_MAPPING.copy()
-        
-        # 保存缓存
-        with open(cache_file, 'w', encoding='utf-8') as f:
-            json.dump(font_mapping, f, ensure_ascii=False)
-        
-        self.mapping_cache[cache_key] = font_mapping
-        return font_mapping
-    
-    def change(self, content: str, word_data: Dict[int, str]) -> str:
-        """解密字体加密（参考博客实现）"""
-        result = ''
-        for i in content:
-            code = ord(i)
-            if code in word_data:
-                result += word_data[code]
-            else:
-                result += i
+                fingerprints = glyph_fingerprints(font_path)
+            except Exception as e:
+                print(f"字形指纹计算失败（woff2 字体需要安装 brotli）: {e}")
+                fingerprints = {}
+            with self._lock:
+                fingerprints = self._fingerprints.setdefault(font_hash, fingerprints)
+        return fingerprints
+
+    def _ocr_enabled(self) -> bool:
+        if not self.use_ocr:
+            return False
+        if importlib.util.find_spec('ddddocr') is None:
+            print("警告: ddddocr未安装，OCR功能不可用")
+            print("请运行: pip install ddddocr")
+            self.use_ocr = False
+        return self.use_ocr
+
+    def ocr_codes(self, font_path: str, codes) -> Dict[int, str]:
+        """OCR 识别指定码位的字形
+
+        其他线程正在识别的码位不重复识别，等待其结果。
+        """
+        codes = set(codes)
+        if not codes:
+            return {}
+        batch = Future()
+        waiting = {}  # 其他线程正在识别的码位 -> 该批结果
+        with self._lock:
+            for code in codes:
+                pending = self._ocr_pending.get((font_path, code))
+                if pending is None:
+                    self._ocr_pending[(font_path, code)] = batch
+                else:
+                    waiting[code] = pending
+        mine = sorted(codes.difference(waiting))
+        result = {}
+        try:
+            if mine:
+                result = self._ocr_batch(font_path, mine)
+        finally:
+            batch.set_result(result)
+            with self._lock:
+                for code in mine:
+                    self._ocr_pending.pop((font_path, code), None)
+        for code, pending in waiting.items():
+            char = pending.result().get(code)
+            if char:
+                result[code] = char
         return result
+
+    def _ocr_batch(self, font_path: str, codes: List[int]) -> Dict[int, str]:
+        """识别一批字形：字形较多时分批交给共用的进程池，较少时在本进程识别"""
+        max_workers = self.ocr_workers or os.cpu_count() or 1
+        workers = min(max_workers, len(codes) // OCR_MIN_BATCH)
+        if workers <= 1:
+            self._init_ocr()
+            if not self.ocr:
+                return {}
+            return _ocr_glyphs(font_path, codes, OCR_IMG_SIZE, self.ocr)
+
+        with self._lock:
+            if self._ocr_pool is None:
+                self._ocr_pool = ProcessPoolExecutor(max_workers=max_workers)
+            pool = self._ocr_pool
+        chunks = [codes[i::workers] for i in range(workers)]
+        result = {}
+        for part in pool.map(_ocr_glyphs, [font_path] * workers, chunks):
+            result.update(part)
+        return result
+
+    def close(self):
+        """关闭 OCR 进程池"""
+        with self._lock:
+            pool, self._ocr_pool = self._ocr_pool, None
+        if pool is not None:
+            pool.shutdown()
+
+    def generate_mapping(self, font_path: str, text: Optional[str] = None) -> FontMapping:
+        """生成字体映射
+
+        1. 按字体内容 SHA-256 查持久化映射表（跨重启命中）
+        2. 用字形轮廓指纹在已知字形索引中还原（字体轮换但字形复用时无需 OCR）
+        3. 启用 OCR 时，只识别 text 中出现、映射表里还没有的码位，结果并入持久化存储；
+           未启用 OCR 时，指纹未覆盖的码位用静态映射补齐（只用于本次解密，不写入存储和索引，
+           之后启用 OCR 时这些码位仍会被识别）
+        """
+        with self._lock:
+            first_seen = font_path not in self._font_hashes
+        font_hash = self._font_hash(font_path)
+        mapping = self.store.get(font_hash)
+        if mapping is None:
+            fingerprints = self._font_fingerprints(font_path, font_hash)
+            mapping = self.store.match_glyphs(fingerprints)
+            if mapping:
+                print(f"按字形指纹还原映射表: {len(mapping)}/{len(fingerprints)} 个字符")
+            mapping = self.store.put(font_hash, mapping)
+        elif first_seen:
+            print(f"从缓存加载映射表: {len(mapping)} 个字符")
+
+        if not self._ocr_enabled():
+            return self._padded_mapping(font_path, mapping)
+
+        if text:
+            missing = pua_codes(text).difference(mapping)
+            fingerprints = self._font_fingerprints(font_path, font_hash)
+            if fingerprints:
+                # 字体中不存在的码位画出来只是缺字方框，不必识别
+                missing.intersection_update(fingerprints)
+            if missing:
+                print(f"OCR 识别 {len(missing)} 个新字形...")
+                recognized = self.ocr_codes(font_path, missing)
+                if recognized:
+                    mapping = self.store.learn(font_hash, recognized, fingerprints)
+                    print(f"OCR 识别完成: {len(recognized)}/{len(missing)} 个字符")
+        return mapping
+
+    def _padded_mapping(self, font_path: str, mapping: FontMapping) -> FontMapping:
+        """用静态映射补齐字形指纹未覆盖的码位（每个映射表只补齐一次）"""
+        with self._lock:
+            cached = self._padded.get(mapping.font_hash)
+        if cached is not None and cached[0] is mapping:
+            return cached[1]
+        fingerprints = self._font_fingerprints(font_path, mapping.font_hash)
+        if fingerprints and len(mapping) >= len(fingerprints):
+            padded = mapping
+        else:
+            print(f"使用静态字体映射补齐: {len(DEFAULT_FONT_MAPPING)} 个字符")
+            padded = FontMapping(mapping.font_hash, {**DEFAULT_FONT_MAPPING, **mapping})
+        with self._lock:
+            self._padded[mapping.font_hash] = (mapping, padded)
+        return padded
+
+    compile_mapping = staticmethod(compile_mapping)
+
+    def change(self, content: str, word_data: Dict[int, str]) -> str:
+        """解密字体加密
+
+        映射表编译为转换表后，整章文本由 str.translate 在 C 层一次完成替换，
+        不再逐字符拼接字符串。generate_mapping 返回的 FontMapping 自带转换表，
+        静态映射表使用预编译的转换表，其他字典每次调用时编译。
+        """
+        if not content or not word_data:
+            return content
+        table = getattr(word_data, 'table', None)
+        if table is None:
+            table = _DEFAULT_TABLE if word_data is DEFAULT_FONT_MAPPING else compile_mapping(word_data)
+        return content.translate(table)
     
     def decrypt_text(self, text: str, mapping: Dict[int, str]) -> str:
         """使用映射表解密文本"""
         return self.change(text, mapping)
     
-    def decrypt_from_html(self, html_content: str) -> Dict[int, str]:
-        """从HTML内容中提取字体并生成映射"""
+    def decrypt_from_html(self, html_content: str, text: Optional[str] = None) -> Dict[int, str]:
+        """从HTML内容中提取字体并生成映射
+
+        Args:
+            html_content: 章节页 HTML
+            text: 章节正文（启用 OCR 时用于确定需要识别的码位）
+        """
         font_url = self.extract_font_url(html_content)
         if not font_url:
             print("未找到字体URL")
             return {}
-        
-        print(f"找到字体URL: {font_url}")
-        font_path = self.download_font(font_url)
-        print(f"字体已下载到: {font_path}")
-        
-        return self.generate_mapping(font_path)
+
+        with self._lock:
+            font_path = self._fonts_by_url.get(font_url)
+        if font_path is None:
+            # 同一字体只下载一次（其他线程等待）
+            with self._download_lock:
+                with self._lock:
+                    font_path = self._fonts_by_url.get(font_url)
+                if font_path is None:
+                    print(f"找到字体URL: {font_url}")
+                    font_path = self.download_font(font_url)
+                    print(f"字体已下载到: {font_path}")
+                    with self._lock:
+                        self._fonts_by_url[font_url] = font_path
+
+        return self.generate_mapping(font_path, text)
 
 
 def test_decrypt():
@@ -2,10 +2,12 @@
 import tkinter as tk
 from tkinter import ttk, messagebox, filedialog, scrolledtext
 import threading
+import multiprocessing
 import sys
-from spider import FanqieSpider, parse_novel_url
+from spider import parse_novel_url
+from sources import get_shared_source, drop_shared_sources
 from downloader import NovelDownloader
-from database import NovelDatabase
+from database import NovelDatabase, start_compression_migration
 from config import save_cookies, load_cookies
 import http.server
 import socketserver
@@ -1179,7 +1181,29 @@ class DownloadHistoryDialog:
             style='Success.TButton'
         )
         batch_download_btn.pack(side='left', padx=(10, 0))
-        
+
+        # 批量导出格式（zip：每本书一个 TXT，打包成一个压缩包）
+        from config import get_output_format
+        self.export_format_var = tk.StringVar(value=get_output_format())
+        export_format_combo = ttk.Combobox(
+            button_frame,
+            textvariable=self.export_format_var,
+            values=('txt', 'epub', 'zip'),
+            state='readonly',
+            width=6
+        )
+        export_format_combo.pack(side='left', padx=(5, 0))
+
+        # 批量导出进度
+        self.export_progress_label = tk.Label(
+            button_frame,
+            text="",
+            bg=ModernStyle.COLORS['bg'],
+            fg=ModernStyle.COLORS['text'],
+            font=ModernStyle.FONTS['normal']
+        )
+        self.export_progress_label.pack(side='left', padx=(10, 0))
+
         # 关闭按钮
         close_btn = ttk.Button(
             button_frame,
@@ -1442,7 +1466,6 @@ class DownloadHistoryDialog:
         
         # 在新线程中执行批量下载
         def do_batch_download():
-            from spider import FanqieSpider
             from config import get_concurrent_downloads, SOURCE_OFFICIAL, SOURCE_THIRD_PARTY
             from concurrent.futures import ThreadPoolExecutor, as_completed
             import threading
@@ -1454,7 +1477,8 @@ class DownloadHistoryDialog:
 
             use_api = self.download_mode != SOURCE_OFFICIAL
 
-            spider = FanqieSpider(use_api=use_api)
+            # 共享的 spider（API 模式只选择一次节点，官网模式只加载一次字体解密器）
+            spider = get_shared_source('fanqie', use_api=use_api).spider
             concurrent_downloads = get_concurrent_downloads()
 
             # 线程安全的结果统计
@@ -1482,8 +1506,8 @@ class DownloadHistoryDialog:
                 novel_id = novel_info['novel_id']
                 title = novel_info['title']
 
-                # 每个线程创建自己的spider实例
-                thread_spider = FanqieSpider(use_api=use_api)
+                # 各线程共用同一个 spider（章节本来就在线程池中并发下载）
+                thread_spider = spider
                 
                 # 添加开始日志
                 progress_dialog.after(0, lambda: self._add_log(progress_text, f"正在下载: {title}\n"))
@@ -1517,7 +1541,6 @@ class DownloadHistoryDialog:
                     # 下载章节
                     chapter_success = 0
                     total_chapters = len(chapters)
-                    db_lock = threading.Lock()
 
                     progress_dialog.after(0, lambda t=title, tc=total_chapters:
                         self._add_log(progress_text, f"  《{t}》共 {tc} 章\n"))
@@ -1525,9 +1548,12 @@ class DownloadHistoryDialog:
                     # 第三方模式：使用线程池并发下载章节
                     if use_api:
                         from config import MAX_CONCURRENT_DOWNLOADS
+                        from database import ChapterWriter
+
+                        # 章节交给后台写入线程批量入库
+                        writer = ChapterWriter(self.db)
 
                         def download_single_chapter(idx, chapter):
-                            nonlocal chapter_success
                             chapter_title = chapter['chapter_title']
                             chapter_data = thread_spider.get_chapter_content(novel_id, chapter['chapter_id'])
 
@@ -1538,18 +1564,15 @@ class DownloadHistoryDialog:
                                 content = chapter_data.get('content', '')
                                 word_count = len(content)
 
-                                # 使用锁保护数据库写入
-                                with db_lock:
-                                    self.db.save_chapter(
-                                        novel_id=novel_id,
-                                        chapter_id=chapter['chapter_id'],
-                                        chapter_title=real_title,
-                                        chapter_index=chapter['chapter_index'],
-                                        content=content,
-                                        word_count=word_count,
-                                        original_title=chapter_title  # 保存章节列表中的原始标题
-                                    )
-                                    chapter_success += 1
+                                writer.put(
+                                    novel_id=novel_id,
+                                    chapter_id=chapter['chapter_id'],
+                                    chapter_title=real_title,
+                                    chapter_index=chapter['chapter_index'],
+                                    content=content,
+                                    word_count=word_count,
+                                    original_title=chapter_title  # 保存章节列表中的原始标题
+                                )
 
                                 progress_dialog.after(0, lambda t=title, i=idx, tc=total_chapters, wc=word_count:
                                     self._add_log(progress_text, f"    [{i}/{tc}] 第{i}章 ({wc}字)\n"))
@@ -1565,9 +1588,17 @@ class DownloadHistoryDialog:
                                 executor.submit(download_single_chapter, idx, chapter): idx
                                 for idx, chapter in enumerate(chapters, 1)
                             }
-                            # 等待所有任务完成
-                            for future in as_completed(future_to_chapter):
-                                pass
+                            # 等待所有任务完成，统计成功章节数
+                            queued_count = sum(
+                                1 for future in as_completed(future_to_chapter)
+                                if future.exception() is None and future.result()
+                            )
+
+                        # 等待写入线程提交全部章节，之后才能导出
+                        if writer.close():
+                            chapter_success = queued_count
+                        else:
+                            chapter_success = self.db.count_chapters(novel_id)
 
                     # 官网模式：顺序下载章节
                     else:
@@ -1851,66 +1882,56 @@ class DownloadHistoryDialog:
             )
             return
         
-        # 导出小说
-        success_count = 0
-        failed_novels = []
-        
-        for novel_id, title in selected_novels:
+        # 后台多进程导出（每本书一个进程，流式读取数据库），内容没有变化的书跳过
+        fmt = self.export_format_var.get()
+        titles = dict(selected_novels)
+        self.export_progress_label.config(text=f'正在导出 0/{len(selected_novels)}...')
+
+        def on_progress(event):
+            if event['status'] == 'running':
+                text = (f"正在导出 {event['books_done']}/{event['books_total']}："
+                        f"{event['title']} {event['done']}/{event['total']} 章")
+            else:
+                text = f"正在导出 {event['books_done']}/{event['books_total']}..."
+            self.dialog.after(0, self._set_export_progress, text)
+
+        def worker():
             try:
-                filename = f"{title}.txt"
-                output_path = os.path.join(export_path, filename)
-
-                novel = self.db.get_novel(novel_id)
-                if not novel:
-                    failed_novels.append(f"{title} (小说不存在)")
-                    continue
-
-                # 将Row对象转换为字典
-                novel_dict = dict(novel)
-
-                chapters = self.db.get_chapters(novel_id)
-                if not chapters:
-                    failed_novels.append(f"{title} (没有可导出的章节)")
-                    continue
-
-                from config import get_remove_empty_lines as _get_rel
-                _remove_empty2 = _get_rel()
-                def _clean_gui2(text):
-                    if not _remove_empty2:
-                        return text
-                    return self.downloader._clean_empty_lines(text)
-                with open(output_path, 'w', encoding='utf-8') as f:
-                    # 写入小说信息
-                    f.write("=" * 50 + "\n")
-                    f.write(f"书名: {novel_dict['title']}\n")
-                    f.write(f"作者: {novel_dict['author']}\n")
-                    f.write(f"简介: {_clean_gui2(novel_dict.get('description', ''))}\n")
-                    # 只有官网模式才显示字数和章节数
-                    if novel_dict.get('source', 'official') == 'official':
-                        f.write(f"字数: {novel_dict['word_count']:,} 字\n")
-                        f.write(f"章节数: {novel_dict['chapter_count']} 章\n")
-                    f.write("=" * 50 + "\n")
-                    
-                    # 写入章节内容
-                    for chapter in chapters:
-                        content = _clean_gui2(chapter.get('content', ''))
-                        if not content:
-                            continue
-                        f.write(f"\n{'='*30}\n")
-                        f.write(f"{chapter['chapter_title']}\n")
-                        f.write(f"{'='*30}\n")
-                        f.write(content)
-                        f.write("\n")
-                
-                success_count += 1
+                summary = NovelDownloader().export_batch(
+                    [novel_id for novel_id, _ in selected_novels], export_path, fmt,
+                    progress_callback=on_progress
+                )
             except Exception as e:
-                failed_novels.append(f"{title} ({str(e)})")
-        
-        if failed_novels:
-            error_msg = f"部分小说导出失败：\n\n" + "\n".join(failed_novels)
+                msg = str(e)  # except 结束后 e 会被解除绑定，先取出错误信息
+                self.dialog.after(0, self._set_export_progress, '')
+                self.dialog.after(0, lambda: messagebox.showerror('错误', f'批量导出失败：{msg}'))
+                return
+            self.dialog.after(0, self._finish_batch_export, summary, titles)
+
+        threading.Thread(target=worker, daemon=True).start()
+
+    def _set_export_progress(self, text):
+        try:
+            if self.export_progress_label.winfo_exists():
+                self.export_progress_label.config(text=text)
+        except Exception:
+            # 窗口已关闭，忽略错误
+            pass
+
+    def _finish_batch_export(self, summary, titles):
+        """批量导出结束：汇总导出、跳过和失败的书"""
+        self._set_export_progress('')
+        if summary['failed']:
+            error_msg = "部分小说导出失败：\n\n" + "\n".join(
+                f"{titles.get(novel_id, novel_id)} ({reason})" for novel_id, reason in summary['failed']
+            )
             messagebox.showwarning('部分失败', error_msg)
-        
-        messagebox.showinfo('完成', f'成功导出 {success_count}/{len(selected_novels)} 个小说')
+
+        total = len(titles)
+        message = f"成功导出 {len(summary['exported'])}/{total} 个小说"
+        if summary['skipped']:
+            message += f"\n{len(summary['skipped'])} 个小说内容没有变化，已跳过"
+        messagebox.showinfo('完成', f"{message}\n\n保存位置：{summary['path']}")
     
     def delete_selected_novels(self):
         """删除选中的小说"""
@@ -1963,8 +1984,10 @@ class NovelDownloaderGUI:
             self.download_mode = None
 
             # 初始化爬虫和下载器
-            self.spider = FanqieSpider(use_api=False)
+            self.spider = get_shared_source('fanqie', use_api=False).spider
             self.downloader = NovelDownloader()
+            # 开启章节压缩后，在后台压缩数据库中尚未压缩的旧章节
+            start_compression_migration(self.downloader.db)
             self.current_novel_id = None
             self.is_logged_in = False
             
@@ -2077,12 +2100,12 @@ class NovelDownloaderGUI:
         from config import SOURCE_OFFICIAL
 
         if self.download_mode == SOURCE_OFFICIAL:
-            self.spider = FanqieSpider(use_api=False)
+            self.spider = get_shared_source('fanqie', use_api=False).spider
             self.log("当前模式：官网下载（需登录，需字体解密）", 'info')
             # 官网模式需要登录，创建登录区域
             self._create_login_area()
         else:
-            self.spider = FanqieSpider(use_api=True)
+            self.spider = get_shared_source('fanqie', use_api=True).spider
             self.log("当前模式：第三方下载（点击下载按钮将启动 TomatoNovelDownloader）", 'info')
             # 第三方模式不需要登录，不创建登录区域
 
@@ -2291,6 +2314,7 @@ class NovelDownloaderGUI:
                         _cfg.USER_INFO.clear()
                 except:
                     pass
+                self._reset_spider()
                 self.update_login_status()
                 self.log("已退出登录", 'info')
         else:
@@ -2307,11 +2331,17 @@ class NovelDownloaderGUI:
                 refresh_user_info()
             except:
                 pass
+            self._reset_spider()
             self.update_login_status()
             self.log("登录成功！", 'success')
         else:
             self.log("登录失败", 'error')
     
+    def _reset_spider(self):
+        """丢弃共享的番茄源实例并重新获取 spider（登录状态或设置变化后重新建立会话）"""
+        drop_shared_sources('fanqie')
+        self.spider = get_shared_source('fanqie', use_api=self.spider.use_api).spider
+
     def update_login_status(self):
         """更新登录状态显示"""
         self.login_status_label.config(
@@ -2348,6 +2378,7 @@ class NovelDownloaderGUI:
             from config import refresh_user_info
             refresh_user_info()
             self.update_login_status()
+        self._reset_spider()
 
         # 显示刷新提示
         self.log("设置已更新", 'info')
@@ -3210,7 +3241,8 @@ class NovelDownloaderGUI:
                     self.root.update()
 
                     try:
-                        if self.downloader.export_to_txt(self.current_novel_id, export_path):
+                        if self.downloader.export(self.current_novel_id, export_path,
+                                                  progress_callback=self._on_export_progress):
                             # 保存导出路径
                             from config import set_last_export_path
                             set_last_export_path(export_path)
@@ -3264,6 +3296,21 @@ class NovelDownloaderGUI:
             self.root.after(0, lambda: self.download_button.config(state='normal'))
             self.root.after(0, lambda: self.export_button.config(state='normal'))
 
+    def _on_export_progress(self, done, total):
+        """导出进度回调：更新进度条（可在任意线程中调用）"""
+        percent = done * 100 / total if total else 100
+
+        def update():
+            self.progress_bar.config(value=percent)
+            self.progress_label.config(text=f"导出中: {done}/{total} 章 ({percent:.0f}%)")
+
+        if threading.current_thread() is threading.main_thread():
+            # 在主线程中导出时界面事件循环被阻塞，需要主动刷新
+            update()
+            self.root.update_idletasks()
+        else:
+            self.root.after(0, update)
+
     def export_novel(self):
         """导出小说"""
         if not self.current_novel_id:
@@ -3277,15 +3324,22 @@ class NovelDownloaderGUI:
         last_export_path = get_last_export_path()
         initial_dir = os.path.dirname(last_export_path) if last_export_path else None
 
+        # 默认格式取自设置，也可以在对话框中选择另一种（按扩展名导出）
+        from config import get_output_format
+        ext = '.' + get_output_format()
+        filetypes = [('文本文件', '*.txt'), ('EPUB 电子书', '*.epub')]
+        if ext == '.epub':
+            filetypes.reverse()
         file_path = filedialog.asksaveasfilename(
-            defaultextension='.txt',
-            filetypes=[('文本文件', '*.txt'), ('所有文件', '*.*')],
-            initialfile=f"{title}.txt",
+            defaultextension=ext,
+            filetypes=filetypes + [('所有文件', '*.*')],
+            initialfile=f"{title}{ext}",
             initialdir=initial_dir
         )
 
         if file_path:
-            if self.downloader.export_to_txt(self.current_novel_id, file_path):
+            if self.downloader.export(self.current_novel_id, file_path,
+                                      progress_callback=self._on_export_progress):
                 # 保存导出路径
                 from config import set_last_export_path
                 set_last_export_path(file_path)
@@ -3346,4 +3400,6 @@ def main():
 
 
 if __name__ == '__main__':
+    # PyInstaller 打包后使用进程池（批量导出、OCR）需要 freeze_support
+    multiprocessing.freeze_support()
     main()
\ No newline at end of file
@@ -0,0 +1,64 @@
+# 拼音首字母模块
+"""汉字拼音首字母
+
+使用 pypinyin（requirements.txt 中的依赖）取首字母，所有汉字都有首字母。
+未安装时退回 GB2312 编码表：一级汉字（3755 个常用字）按拼音排序，字的 GB2312 编码落在哪个区间
+即可得到首字母；二级汉字（按部首排序，如"穹"）和 GB2312 以外的字取不到首字母，
+用 UNKNOWN_INITIAL 占位，不让后面的字错位（"斗破苍穹" -> 'dpc?'，输入 'dpc' 仍能匹配，
+但 'dpcq' 或其他书名的首字母不会误配到它）。
+字母和数字原样保留（转小写），其他字符忽略。多音字按 pypinyin / GB2312 收录的读音。
+"""
+import bisect
+
+try:
+    from pypinyin import Style, lazy_pinyin  # 可选依赖
+except ImportError:
+    lazy_pinyin = None
+
+# 每个首字母对应区间的起始编码（GB2312 一级汉字 0xB0A1-0xD7F9；没有 i/u/v 开头的拼音）
+_BOUNDARIES = (
+    (0xB0A1, 'a'), (0xB0C5, 'b'), (0xB2C1, 'c'), (0xB4EE, 'd'), (0xB6EA, 'e'),
+    (0xB7A2, 'f'), (0xB8C1, 'g'), (0xB9FE, 'h'), (0xBBF7, 'j'), (0xBFA6, 'k'),
+    (0xC0AC, 'l'), (0xC2E8, 'm'), (0xC4C3, 'n'), (0xC5B6, 'o'), (0xC5BE, 'p'),
+    (0xC6DA, 'q'), (0xC8BB, 'r'), (0xC8F6, 's'), (0xCBFA, 't'), (0xCDDA, 'w'),
+    (0xCEF4, 'x'), (0xD1B9, 'y'), (0xD4D1, 'z'),
+)
+_STARTS = [code for code, _ in _BOUNDARIES]
+_LEVEL1_END = 0xD7F9
+# 取不到首字母的文字（汉字、假名等）的占位符；联想查询只接受字母和数字，不会匹配它
+UNKNOWN_INITIAL = '?'
+
+
+def initial(ch):
+    """单个字符的拼音首字母（小写）
+
+    文字取不到首字母时返回 UNKNOWN_INITIAL，标点等其他字符返回 ''。
+    """
+    if ch.isascii():
+        return ch.lower() if ch.isalnum() else ''
+    letter = _initial(ch)
+    if letter:
+        return letter
+    return UNKNOWN_INITIAL if ch.isalnum() else ''
+
+
+def _initial(ch):
+    """非 ASCII 字符的拼音首字母，取不到时返回 ''"""
+    if lazy_pinyin is not None:
+        letter = lazy_pinyin(ch, style=Style.FIRST_LETTER)[0][:1].lower()
+        return letter if letter.isascii() and letter.isalpha() else ''
+    try:
+        data = ch.encode('gb2312')
+    except UnicodeEncodeError:
+        return ''
+    if len(data) != 2:
+        return ''
+    code = (data[0] << 8) | data[1]
+    if code < _STARTS[0] or code > _LEVEL1_END:
+        return ''
+    return _BOUNDARIES[bisect.bisect_right(_STARTS, code) - 1][1]
+
+
+def initials(text):
+    """文本的拼音首字母串，如 '凡人修仙传' -> 'frxxc'"""
+    return ''.join(initial(ch) for ch in text or '')
@@ -9,7 +9,9 @@
 - parse_novel_url(url) -> str | None  （可选）
 """
 
-from .base import BaseSource, SourceError, NovelInfo, ChapterInfo
+import threading
+
+from .base import BaseSource, SourceError, NovelInfo, ChapterInfo, ChapterList
 from .fanqie_source import FanqieSource
 from .biquge_source import BiqugeSource
 from .sto66_source import Sto66Source
@@ -20,6 +22,7 @@ from .generic_source import (
     QianbiSource,
     HaitangSource,
 )
+from .parse_pool import ChapterParsePool
 
 # 源注册表
 SOURCE_REGISTRY = {
@@ -36,21 +39,52 @@ SOURCE_REGISTRY = {
 SEARCHABLE_SOURCES = ['biquge', 'sto66', 'dingdian', 'bxwx', 'qianbi', 'haitang']
 
 
+# 进程内共享的源实例 {(name, 参数): 实例}
+_shared_sources = {}
+_shared_sources_lock = threading.Lock()
+
+
 def get_source(name, **kwargs):
-    """获取源实例"""
+    """获取源实例（每次新建，一般应使用 get_shared_source）"""
     if name not in SOURCE_REGISTRY:
         raise ValueError(f"未知源: {name}, 可用源: {list(SOURCE_REGISTRY.keys())}")
     return SOURCE_REGISTRY[name](**kwargs)
 
 
+def get_shared_source(name, **kwargs):
+    """获取进程内共享的源实例（同名同参数只创建一次，线程安全）
+
+    源实例可在多个线程间共用：番茄源的 FanqieSpider（会话、字体解密器）只初始化一次，
+    其他源切换到的可用镜像也对之后的请求生效。WebUI、多源搜索和 GUI 都从这里取实例。
+    """
+    key = (name, repr(sorted(kwargs.items())))
+    with _shared_sources_lock:
+        source = _shared_sources.get(key)
+    if source is None:
+        # 在锁外创建（番茄 API 模式会选择节点），同时创建时以先放入的为准
+        source = get_source(name, **kwargs)
+        with _shared_sources_lock:
+            source = _shared_sources.setdefault(key, source)
+    return source
+
+
+def drop_shared_sources(name=None):
+    """丢弃共享的源实例（name 为 None 时全部丢弃），如番茄登录状态变化后，下次获取时重新创建"""
+    with _shared_sources_lock:
+        for key in [k for k in _shared_sources if name is None or k[0] == name]:
+            del _shared_sources[key]
+
+
 def list_sources():
     """列出所有可用源"""
     return list(SOURCE_REGISTRY.keys())
 
 
 __all__ = [
-    'BaseSource', 'SourceError', 'NovelInfo', 'ChapterInfo',
+    'BaseSource', 'SourceError', 'NovelInfo', 'ChapterInfo', 'ChapterList',
     'FanqieSource', 'BiqugeSource', 'Sto66Source',
     'ConfigurableSource', 'DingdianSource', 'BxwxSource', 'QianbiSource', 'HaitangSource',
-    'SOURCE_REGISTRY', 'SEARCHABLE_SOURCES', 'get_source', 'list_sources',
+    'SOURCE_REGISTRY', 'SEARCHABLE_SOURCES', 'get_source', 'get_shared_source', 'drop_shared_sources',
+    'list_sources',
+    'ChapterParsePool',
 ]
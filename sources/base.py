@@ -31,12 +31,121 @@ class NovelInfo:
     extra: dict = field(default_factory=dict)
 
 
-@dataclass
 class ChapterInfo:
-    """章节信息"""
-    chapter_id: str
-    chapter_title: str
-    chapter_index: int
+    """章节信息
+
+    长篇书籍会一次性生成上千个实例，用 __slots__ 代替 dataclass 的实例 __dict__
+    （dataclass 的 slots 参数需要 Python 3.10+）。
+    """
+    __slots__ = ('chapter_id', 'chapter_title', 'chapter_index')
+
+    def __init__(self, chapter_id: str, chapter_title: str, chapter_index: int):
+        self.chapter_id = chapter_id
+        self.chapter_title = chapter_title
+        self.chapter_index = chapter_index
+
+    def __repr__(self):
+        return (f'ChapterInfo(chapter_id={self.chapter_id!r}, '
+                f'chapter_title={self.chapter_title!r}, chapter_index={self.chapter_index!r})')
+
+    def __eq__(self, other):
+        if other.__class__ is not self.__class__:
+            return NotImplemented
+        return (self.chapter_id, self.chapter_title, self.chapter_index) == \
+            (other.chapter_id, other.chapter_title, other.chapter_index)
+
+
+class ChapterList:
+    """紧凑的章节列表
+
+    章节 ID 和标题分两列存储，另有 ID→下标索引：
+    - 按 ID 去重、查找下标/标题都是 O(1)
+    - 遍历或下标访问时才按需生成 ChapterInfo（chapter_index 即下标 + 1）
+    - 可当作 list[ChapterInfo] 使用（len / 迭代 / 下标 / 切片）
+    """
+    __slots__ = ('_ids', '_titles', '_index', '_title_index')
+
+    def __init__(self):
+        self._ids: list[str] = []
+        self._titles: list[str] = []
+        self._index: dict[str, int] = {}
+        self._title_index: Optional[dict] = None  # 去空格标题 → 下标，首次按标题查找时构建
+
+    @classmethod
+    def of(cls, chapters) -> 'ChapterList':
+        """把任意 ChapterInfo 序列转换为 ChapterList（已是 ChapterList 则原样返回）"""
+        if isinstance(chapters, cls):
+            return chapters
+        result = cls()
+        for ch in chapters or ():
+            result.append(str(ch.chapter_id), ch.chapter_title)
+        return result
+
+    def append(self, chapter_id: str, chapter_title: str) -> bool:
+        """追加章节；chapter_id 已存在时忽略并返回 False"""
+        if chapter_id in self._index:
+            return False
+        self._index[chapter_id] = len(self._ids)
+        self._ids.append(chapter_id)
+        self._titles.append(chapter_title)
+        self._title_index = None
+        return True
+
+    @property
+    def ids(self) -> list[str]:
+        return self._ids
+
+    @property
+    def titles(self) -> list[str]:
+        return self._titles
+
+    def index_of(self, chapter_id: str) -> Optional[int]:
+        """章节 ID 对应的下标（从 0 开始），不存在返回 None"""
+        return self._index.get(str(chapter_id))
+
+    def title_of(self, chapter_id: str, default: str = '') -> str:
+        """章节 ID 对应的标题"""
+        i = self._index.get(str(chapter_id))
+        return default if i is None else self._titles[i]
+
+    def find_by_title(self, title: str) -> Optional[str]:
+        """按标题查找章节 ID（忽略空格，重复标题取第一个）"""
+        if not title:
+            return None
+        if self._title_index is None:
+            self._title_index = {}
+            for i, t in enumerate(self._titles):
+                self._title_index.setdefault(t.replace(' ', ''), i)
+        i = self._title_index.get(title.replace(' ', ''))
+        return None if i is None else self._ids[i]
+
+    def _info(self, i: int) -> ChapterInfo:
+        return ChapterInfo(self._ids[i], self._titles[i], i + 1)
+
+    def __len__(self):
+        return len(self._ids)
+
+    def __iter__(self):
+        for i in range(len(self._ids)):
+            yield self._info(i)
+
+    def __contains__(self, chapter_id):
+        return str(chapter_id) in self._index
+
+    def __getitem__(self, item):
+        if isinstance(item, slice):
+            result = ChapterList()
+            for cid, title in zip(self._ids[item], self._titles[item]):
+                result.append(cid, title)
+            return result
+        if item < 0:
+            item += len(self._ids)
+        if not 0 <= item < len(self._ids):
+            raise IndexError('章节下标越界')
+        return self._info(item)
+
+    def __repr__(self):
+        return f'ChapterList({len(self._ids)} 章)'
 
 
 class BaseSource(ABC):
@@ -47,6 +156,7 @@ class BaseSource(ABC):
     display_name: str = '基础源'   # 用户可见名称
     needs_login: bool = False      # 是否需要登录
     supports_search: bool = False  # 是否支持搜索
+    supports_raw_fetch: bool = False  # 是否支持抓取/解析分离（fetch_chapter_raw + parse_chapter_body）
 
     def __init__(self, **kwargs):
         # 子类可读取 kwargs 中的 cookies / config
@@ -83,6 +193,18 @@ class BaseSource(ABC):
             return []
         raise NotImplementedError
 
+    def fetch_chapter_raw(self, novel_id: str, chapter_id: str) -> bytes:
+        """只抓取章节页原始字节，不做解析（supports_raw_fetch 为 True 的源需实现）"""
+        raise NotImplementedError
+
+    @classmethod
+    def parse_chapter_body(cls, body: bytes) -> dict:
+        """从章节页原始字节解析出 {'title', 'content'}
+
+        只能依赖类属性（不能依赖实例状态），以便在子进程中按源名称调用。
+        """
+        raise NotImplementedError
+
     def get_rankings(self, category: str = 'all', page: int = 1) -> list[NovelInfo]:
         """获取排行榜/分类推荐小说（默认不支持，子类可覆盖）
 
@@ -11,11 +11,14 @@
 from __future__ import annotations
 
 import re
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from urllib.parse import quote, urljoin
 from typing import List, Tuple, Optional
 
 import requests
-from bs4 import BeautifulSoup
+from lxml import etree
+from requests.adapters import HTTPAdapter
 
 
 # 各源的站点域名和 URL 模式
@@ -44,6 +47,48 @@ _HEADERS = {
     'Accept-Language': 'zh-CN,zh;q=0.9,en;q=0.8',
 }
 
+# 同时进行的 Bing 查询数（site: 查询 + 通用查询共 8 个）
+BING_MAX_WORKERS = 8
+# 找到这么多个不同的 (源, novel_id) 后不再等待其余查询
+BING_ENOUGH_RESULTS = 10
+
+# 搜索结果标题链接：<li class="b_algo"><h2><a href=...>
+_RESULT_LINKS = etree.XPath(
+    "//li[contains(concat(' ', normalize-space(@class), ' '), ' b_algo ')]//h2//a[@href]"
+)
+
+_session = None
+_session_lock = threading.Lock()
+
+
+def _get_session() -> requests.Session:
+    """所有 Bing 查询共用的 keep-alive 会话（连接池大小与并发数一致）"""
+    global _session
+    with _session_lock:
+        if _session is None:
+            session = requests.Session()
+            session.headers.update(_HEADERS)
+            adapter = HTTPAdapter(pool_connections=1, pool_maxsize=BING_MAX_WORKERS)
+            session.mount('https://', adapter)
+            session.mount('http://', adapter)
+            _session = session
+        return _session
+
+
+def _parse_results(body: bytes, encoding: Optional[str] = None) -> List[Tuple[str, str]]:
+    """从 Bing 结果页中取出 [(标题, URL), ...]，只用 XPath 定位结果链接，不遍历整棵树"""
+    parser = etree.HTMLParser(encoding=encoding or 'utf-8')
+    root = etree.fromstring(body, parser)
+    if root is None:
+        return []
+    results = []
+    for a in _RESULT_LINKS(root):
+        href = a.get('href', '')
+        text = ''.join(part.strip() for part in a.itertext())
+        if href and text:
+            results.append((text, href))
+    return results
+
 
 def _bing_search(query: str, timeout: int = 15) -> List[Tuple[str, str]]:
     """用 Bing 搜索，返回 [(标题, URL), ...]
@@ -53,21 +98,10 @@ def _bing_search(query: str, timeout: int = 15) -> List[Tuple[str, str]]:
     # 不使用 setlang/cc 参数，避免被强制到中国版 Bing
     url = f'https://www.bing.com/search?q={quote(query)}'
     try:
-        resp = requests.get(url, headers=_HEADERS, timeout=timeout, allow_redirects=True)
+        resp = _get_session().get(url, timeout=timeout, allow_redirects=True)
         if resp.status_code != 200:
             return []
-        soup = BeautifulSoup(resp.text, 'lxml')
-        results = []
-        for item in soup.find_all('li', class_='b_algo'):
-            h2 = item.find('h2')
-            if h2:
-                a = h2.find('a')
-                if a:
-                    href = a.get('href', '')
-                    text = a.get_text(strip=True)
-                    if href and text:
-                        results.append((text, href))
-        return results
+        return _parse_results(resp.content, resp.encoding)
     except Exception:
         return []
 
@@ -81,52 +115,51 @@ def _bing_site_search(keyword: str, site: str, timeout: int = 15) -> List[Tuple[
     return _bing_search(query, timeout)
 
 
-def search_via_bing(keyword: str) -> List[dict]:
+def _match_source(url: str, sites) -> Optional[Tuple[str, str]]:
+    """用 sites 中的 URL 模式识别结果链接，返回 (source_key, novel_id)"""
+    for src_key, _, pattern in sites:
+        m = pattern.search(url)
+        if m:
+            return src_key, m.group(1)
+    return None
+
+
+def search_via_bing(keyword: str, enough: int = BING_ENOUGH_RESULTS) -> List[dict]:
     """通过 Bing 搜索小说，返回所有源的聚合结果
 
     搜索策略：
     1. 对每个支持的源站点，用 site: 搜索精准匹配
-    2. 通用 Bing 搜索作为补充
+    2. 通用 Bing 搜索作为补充（可能找到未被 site: 搜索覆盖的源）
+
+    所有查询在共用的 keep-alive 会话上并发进行；找到 enough 个不同的 (源, novel_id) 后
+    直接返回，不再等待其余查询。结果按查询返回的先后排列。
 
     返回: [{source, novel_id, title, url}, ...]
     """
     found = {}  # 用 (source, novel_id) 作 key 去重
 
-    # 1. 对每个源站点做 site: 搜索（精准）
-    for src_key, domain, pattern in SOURCE_SITES:
-        try:
-            results = _bing_site_search(keyword, domain)
-            for title, url in results:
-                m = pattern.search(url)
-                if m:
-                    book_id = m.group(1)
-                    key = (src_key, book_id)
-                    if key not in found:
-                        found[key] = {
-                            'source': src_key,
-                            'novel_id': book_id,
-                            'title': title,
-                            'url': url,
-                        }
-        except Exception:
-            continue
-
-    # 2. 通用搜索作为补充（可能找到未被 site: 搜索覆盖的源）
-    for query in [f'{keyword} 小说', f'{keyword} 阅读']:
-        results = _bing_search(query)
-        for title, url in results:
-            for src_key, _, pattern in SOURCE_SITES:
-                m = pattern.search(url)
-                if m:
-                    book_id = m.group(1)
-                    key = (src_key, book_id)
-                    if key not in found:
-                        found[key] = {
-                            'source': src_key,
-                            'novel_id': book_id,
-                            'title': title,
-                            'url': url,
-                        }
-                    break
+    # (查询, 用于识别结果链接的源)：site: 查询只认对应源的链接
+    queries = [(f'site:{domain} {keyword}', [(src_key, domain, pattern)])
+               for src_key, domain, pattern in SOURCE_SITES]
+    queries += [(f'{keyword} 小说', SOURCE_SITES), (f'{keyword} 阅读', SOURCE_SITES)]
+
+    executor = ThreadPoolExecutor(max_workers=min(BING_MAX_WORKERS, len(queries)))
+    try:
+        future_to_sites = {executor.submit(_bing_search, query): sites for query, sites in queries}
+        for future in as_completed(future_to_sites):
+            for title, url in future.result():
+                match = _match_source(url, future_to_sites[future])
+                if match and match not in found:
+                    found[match] = {
+                        'source': match[0],
+                        'novel_id': match[1],
+                        'title': title,
+                        'url': url,
+                    }
+            if len(found) >= enough:
+                break
+    finally:
+        # 提前返回时不等待仍在进行的查询
+        executor.shutdown(wait=False)
 
     return list(found.values())
@@ -15,7 +15,8 @@ import re
 from urllib.parse import urljoin, quote
 from typing import Optional
 
-from .base import BaseSource, NovelInfo, ChapterInfo, SourceError
+from .base import BaseSource, NovelInfo, ChapterList, SourceError
+from .stream_parse import stream_extract_chapter
 
 
 class BiqugeSource(BaseSource):
@@ -25,6 +26,12 @@ class BiqugeSource(BaseSource):
     display_name = '蚂蚁文学'
     needs_login = False
     supports_search = True
+    supports_raw_fetch = True
+
+    # mayiwsk.com 使用 UTF-8 编码
+    ENCODING = 'utf-8'
+    # 章节页优先流式解析（读到正文容器结束即停止；失败时回退到完整解析）
+    STREAMING_PARSE = True
 
     # 镜像列表（mayiwsk 为主，保留其他镜像作为后备）
     BIQUGE_MIRRORS = [
@@ -149,9 +156,8 @@ class BiqugeSource(BaseSource):
         if not resp.body:
             raise SourceError('响应内容为空', error_type='NETWORK')
         from scrapling import Selector
-        # mayiwsk.com 使用 UTF-8 编码
-        text = resp.text or resp.body.decode('utf-8', errors='replace')
-        return Selector(text, adaptive=True)
+        # mayiwsk.com 使用 UTF-8 编码，直接按字节解析
+        return Selector(resp.body, encoding=self.ENCODING, adaptive=True)
 
     # ===================== BaseSource 接口实现 =====================
 
@@ -228,7 +234,7 @@ class BiqugeSource(BaseSource):
         except Exception as e:
             raise SourceError(f'获取小说信息失败: {e}', error_type='UNKNOWN') from e
 
-    def get_chapter_list(self, novel_id: str) -> list[ChapterInfo]:
+    def get_chapter_list(self, novel_id: str) -> ChapterList:
         """获取章节列表（自动剔除开头倒序/重复章节）"""
         try:
             novel_id = str(novel_id).strip()
@@ -275,64 +281,82 @@ class BiqugeSource(BaseSource):
             raise SourceError(f'获取章节列表失败: {e}', error_type='UNKNOWN') from e
 
     def get_chapter_content(self, novel_id: str, chapter_id: str) -> dict:
-        """获取章节内容"""
+        """获取章节内容（抓取 + 解析）"""
         try:
-            novel_id = str(novel_id).strip()
-            chapter_id = str(chapter_id).strip()
+            body = self.fetch_chapter_raw(novel_id, chapter_id)
+            return self.parse_chapter_body(body)
+        except SourceError:
+            raise
+        except Exception as e:
+            raise SourceError(f'获取章节内容失败: {e}', error_type='UNKNOWN') from e
 
-            # 构造章节 URL：/数字_数字/数字.html
-            if re.match(r'^\d+_\d+$', novel_id):
-                chapter_url = f'/{novel_id}/{chapter_id}.html'
-            else:
-                # 如果 novel_id 不是标准格式，尝试直接组合
-                chapter_url = f'/{novel_id}/{chapter_id}.html'
+    def fetch_chapter_raw(self, novel_id: str, chapter_id: str) -> bytes:
+        """只抓取章节页原始字节，不做解析"""
+        novel_id = str(novel_id).strip()
+        chapter_id = str(chapter_id).strip()
 
-            resp = self._fetch(chapter_url)
-            page = self._parse_html(resp)
+        # 构造章节 URL：/数字_数字/数字.html
+        # 如果 novel_id 不是标准格式，也直接组合
+        chapter_url = f'/{novel_id}/{chapter_id}.html'
+
+        resp = self._fetch(chapter_url)
+        if not resp.body:
+            raise SourceError('响应内容为空', error_type='NETWORK')
+        return resp.body
+
+    @classmethod
+    def _extract_chapter_full(cls, body: bytes) -> tuple:
+        """完整解析章节页，返回 (标题, 正文, 页面 title)"""
+        from scrapling import Selector
+        page = Selector(body, encoding=cls.ENCODING)
+
+        # 提取章节标题
+        title = page.css('h1::text').get('')
+
+        # 提取章节内容 - mayiwsk.com 使用 #content
+        content_el = page.css('#content')
+        if not content_el:
+            content_el = page.css('div#content, div.content, .bookcontent, #booktxt')
+
+        if not content_el:
+            raise SourceError('未找到章节内容', error_type='PARSE')
 
-            # 提取章节标题
-            title = page.css('h1::text').get('')
-
-            # 提取章节内容 - mayiwsk.com 使用 #content
-            content_el = page.css('#content')
-            if not content_el:
-                content_el = page.css('div#content, div.content, .bookcontent, #booktxt')
-
-            if not content_el:
-                raise SourceError('未找到章节内容', error_type='PARSE')
-
-            # 注意：Scrapling Selector 的 .text 属性在元素含有子节点时会返回空，
-            # 需要使用 .get_all_text() 递归提取所有文本节点。
-            content_node = content_el[0]
-            try:
-                content_text = content_node.get_all_text() or ''
-            except Exception:
-                # 兜底：用 ::text 选择器拼接
-                text_nodes = content_node.css('::text')
-                content_text = '\n'.join(str(t).strip() for t in text_nodes if str(t).strip())
-
-            # 清理内容
-            # 移除常见广告/提示文字
-            ad_patterns = [
-                r'最新网址：www\.mayiwsk\.com',
-                r'蚂蚁文学全文字更新.*?www\.mayiwsk\.com',
-                r'牢记网址：www\.mayiwsk\.com',
-                r'请刷新页面.*?获取最新更新',
-                r'正在手打中.*?请稍等片刻',
-            ]
-            for pattern in ad_patterns:
-                content_text = re.sub(pattern, '', content_text, flags=re.DOTALL)
-
-            # 清理多余空行
-            content_text = re.sub(r'\n{3,}', '\n\n', content_text)
-            content_text = content_text.strip()
+        # 注意：Scrapling Selector 的 .text 属性在元素含有子节点时会返回空，
+        # 需要使用 .get_all_text() 递归提取所有文本节点。
+        content_node = content_el[0]
+        try:
+            content_text = content_node.get_all_text() or ''
+        except Exception:
+            # 兜底：用 ::text 选择器拼接
+            text_nodes = content_node.css('::text')
+            content_text = '\n'.join(str(t).strip() for t in text_nodes if str(t).strip())
+
+        page_title = '' if title else page.css('title::text').get('')
+        return title, content_text, page_title
+
+    @classmethod
+    def parse_chapter_body(cls, body: bytes) -> dict:
+        """从章节页原始字节中提取标题和正文（可在子进程中调用）"""
+        try:
+            if not body:
+                raise SourceError('响应内容为空', error_type='NETWORK')
+
+            # 优先流式解析：mayiwsk.com 正文在 #content 中，读完即停止
+            extracted = None
+            if cls.STREAMING_PARSE:
+                extracted = stream_extract_chapter(body, cls.ENCODING, '#content', 'h1::text')
+            if extracted is not None:
+                title, content_text, page_title = extracted
+            else:
+                title, content_text, page_title = cls._extract_chapter_full(body)
+
+            content_text = cls._clean_content(content_text)
 
             if not content_text:
                 raise SourceError('章节内容为空', error_type='PARSE')
 
             # 如果标题为空，从页面 title 提取
             if not title:
-                page_title = page.css('title::text').get('')
                 if '_' in page_title:
                     title = page_title.split('_')[0].strip()
 
@@ -343,7 +367,24 @@ class BiqugeSource(BaseSource):
         except SourceError:
             raise
         except Exception as e:
-            raise SourceError(f'获取章节内容失败: {e}', error_type='UNKNOWN') from e
+            raise SourceError(f'解析章节内容失败: {e}', error_type='PARSE') from e
+
+    @staticmethod
+    def _clean_content(text: str) -> str:
+        """移除常见广告/提示文字并清理多余空行"""
+        ad_patterns = [
+            r'最新网址：www\.mayiwsk\.com',
+            r'蚂蚁文学全文字更新.*?www\.mayiwsk\.com',
+            r'牢记网址：www\.mayiwsk\.com',
+            r'请刷新页面.*?获取最新更新',
+            r'正在手打中.*?请稍等片刻',
+        ]
+        for pattern in ad_patterns:
+            text = re.sub(pattern, '', text, flags=re.DOTALL)
+
+        # 清理多余空行
+        text = re.sub(r'\n{3,}', '\n\n', text)
+        return text.strip()
 
     # ===================== 搜索 =====================
 
@@ -10,6 +10,7 @@
 from __future__ import annotations
 
 import re
+import threading
 from typing import Optional
 
 from .base import BaseSource, NovelInfo, ChapterInfo, SourceError
@@ -32,6 +33,13 @@ class FanqieSource(BaseSource):
         # 官网模式需要登录
         if not use_api:
             self.needs_login = True
+        self._search_spider = None  # API 模式搜索用的官网 spider（首次搜索时创建）
+        self._search_spider_lock = threading.Lock()
+
+    @property
+    def spider(self):
+        """底层的 FanqieSpider（GUI 直接调用其下载接口）"""
+        return self._spider
 
     @staticmethod
     def parse_novel_url(url: str) -> Optional[str]:
@@ -110,11 +118,14 @@ class FanqieSource(BaseSource):
     def search_novel(self, keyword: str) -> list[NovelInfo]:
         """搜索小说 - 两种模式都通过官网搜索接口实现"""
         try:
-            # API 模式下创建临时官网 spider 进行搜索
+            # API 模式下用官网 spider 进行搜索（创建一次后复用）
             # 番茄搜索接口需要访问 fanqienovel.com/search 页面解析，API 接口不提供搜索
             if self.use_api:
-                from spider import FanqieSpider
-                search_spider = FanqieSpider(use_api=False)
+                with self._search_spider_lock:
+                    if self._search_spider is None:
+                        from spider import FanqieSpider
+                        self._search_spider = FanqieSpider(use_api=False)
+                search_spider = self._search_spider
             else:
                 search_spider = self._spider
 
@@ -12,10 +12,12 @@
 from __future__ import annotations
 
 import re
+from itertools import islice
 from urllib.parse import urljoin, quote
 from typing import Optional, List
 
-from .base import BaseSource, NovelInfo, ChapterInfo, SourceError
+from .base import BaseSource, NovelInfo, ChapterList, SourceError
+from .stream_parse import stream_extract_chapter
 
 
 class ConfigurableSource(BaseSource):
@@ -42,6 +44,10 @@ class ConfigurableSource(BaseSource):
     CONTENT_SELECTOR: str = '#content'  # 章节正文选择器
     TITLE_SELECTOR: str = 'h1::text'  # 章节标题选择器
     USE_OG_META: bool = True  # 是否使用 og:meta 解析书籍信息
+    # 章节正文解析后端：'lxml'（默认）或 'lexbor'（需安装 selectolax，解析更快）
+    PARSER_BACKEND: str = 'lxml'
+    # 章节页是否优先流式解析（读到正文容器结束即停止，不构建整棵树；失败时回退到完整解析）
+    STREAMING_PARSE: bool = True
 
     # 搜索（None 表示不支持自身搜索，依赖 Bing）
     SEARCH_URL: Optional[str] = None
@@ -53,6 +59,8 @@ class ConfigurableSource(BaseSource):
     RETRIES: int = 2
     RETRY_DELAY: int = 1
 
+    supports_raw_fetch = True
+
     def __init__(self, **kwargs):
         super().__init__(**kwargs)
         self._active_mirror = self.MIRRORS[0]
@@ -168,14 +176,8 @@ class ConfigurableSource(BaseSource):
         if not resp.body:
             raise SourceError('响应内容为空', error_type='NETWORK')
         from scrapling import Selector
-        # 优先用 resp.text，如果乱码则按配置编码解码
-        text = resp.text
-        if not text or self.ENCODING == 'gbk':
-            try:
-                text = resp.body.decode(self.ENCODING, errors='replace')
-            except Exception:
-                text = resp.text or ''
-        return Selector(text, adaptive=True)
+        # 按源声明的编码直接把原始字节交给 lxml 解码，不再先解码成 str 再解析
+        return Selector(resp.body, encoding=self.ENCODING, adaptive=True)
 
     # ===================== BaseSource 接口实现 =====================
 
@@ -244,7 +246,7 @@ class ConfigurableSource(BaseSource):
         except Exception as e:
             raise SourceError(f'获取小说信息失败: {e}', error_type='UNKNOWN') from e
 
-    def get_chapter_list(self, novel_id: str) -> list[ChapterInfo]:
+    def get_chapter_list(self, novel_id: str) -> ChapterList:
         """获取章节列表（自动剔除倒序/重复章节）"""
         try:
             novel_id = str(novel_id).strip()
@@ -285,7 +287,7 @@ class ConfigurableSource(BaseSource):
             raise SourceError(f'获取章节列表失败: {e}', error_type='UNKNOWN') from e
 
     @staticmethod
-    def _dedup_and_sort_chapters(raw_chapters: list) -> list[ChapterInfo]:
+    def _dedup_and_sort_chapters(raw_chapters: list) -> ChapterList:
         """剔除倒序和重复章节，正确排序（staticmethod，可被其他源复用）
 
         很多小说网站章节列表开头会有几章"最新章节"的倒序排列，
@@ -296,9 +298,12 @@ class ConfigurableSource(BaseSource):
         注意：必须先跳过倒序段再去重。如果先去重（保留首次出现），
         倒序段的章节会被保留，正序主体中的同名章节被丢弃，
         随后剔除倒序段会导致这些章节彻底丢失。
+
+        倒序段检测只扫描到正序起点为止，之后一遍遍历直接写入 ChapterList，
+        不再生成中间列表。
         """
         if not raw_chapters:
-            return []
+            return ChapterList()
 
         # 尝试将 chapter_id 转为数字用于排序判断
         def to_num(cid):
@@ -307,51 +312,31 @@ class ConfigurableSource(BaseSource):
             except (ValueError, TypeError):
                 return None
 
-        numeric_ids = [(to_num(c[0]), c) for c in raw_chapters]
-
         # 检测开头的倒序段
         # 典型模式：[最新N章倒序] [完整正序列表]
         # 倒序段特征：开头几章 ID 递减，然后突然出现小 ID 开始正序递增
         main_start = 0
-        if numeric_ids and numeric_ids[0][0] is not None:
-            nums = [n for n, _ in numeric_ids if n is not None]
-            if len(nums) >= 4:
+        if to_num(raw_chapters[0][0]) is not None:
+            nums = []  # 只保存扫描过的前缀
+            for i, chapter in enumerate(raw_chapters):
+                nums.append(to_num(chapter[0]))
                 # 找到正序主体起点：第一个 nums[i] < nums[i+1] < nums[i+2] 的位置
-                for i in range(len(numeric_ids) - 2):
-                    n0 = numeric_ids[i][0]
-                    n1 = numeric_ids[i + 1][0]
-                    n2 = numeric_ids[i + 2][0]
-                    if n0 is not None and n1 is not None and n2 is not None:
-                        if n0 < n1 < n2:
-                            main_start = i
-                            break
-                # 如果找到了正序起点，且起点之前有内容（倒序段）
-                if main_start > 0:
-                    # 只有当倒序段的 ID 都 >= 正序段起点 ID 时，才确认是倒序段
-                    main_min = numeric_ids[main_start][0]
-                    reversed_part = numeric_ids[:main_start]
-                    if not all(n is None or n >= main_min for n, _ in reversed_part):
-                        # 不是真正的倒序段，不跳过
-                        main_start = 0
-
-        # 先跳过倒序段，再对剩余正序主体去重
-        effective = [c for _, c in numeric_ids[main_start:]] if main_start > 0 else raw_chapters
-        seen_ids = set()
-        deduped = []
-        for cid, title, idx in effective:
-            if cid in seen_ids:
-                continue
-            seen_ids.add(cid)
-            deduped.append((cid, title, idx))
-
-        return [
-            ChapterInfo(
-                chapter_id=cid,
-                chapter_title=title,
-                chapter_index=i + 1,
-            )
-            for i, (cid, title, _) in enumerate(deduped)
-        ]
+                if i >= 2 and None not in nums[-3:] and nums[-3] < nums[-2] < nums[-1]:
+                    main_start = i - 2
+                    break
+            # 如果找到了正序起点，且起点之前有内容（倒序段），
+            # 只有当倒序段的 ID 都 >= 正序段起点 ID 时，才确认是倒序段
+            if main_start > 0:
+                main_min = nums[main_start]
+                if any(n is not None and n < main_min for n in nums[:main_start]):
+                    # 不是真正的倒序段，不跳过
+                    main_start = 0
+
+        # 先跳过倒序段，再对剩余正序主体去重（ChapterList 按 ID 自动去重）
+        chapters = ChapterList()
+        for cid, title, _ in islice(raw_chapters, main_start, None):
+            chapters.append(cid, title)
+        return chapters
 
     def _get_link_text(self, link) -> str:
         """安全获取链接文本"""
@@ -371,43 +356,83 @@ class ConfigurableSource(BaseSource):
             return ''
 
     def get_chapter_content(self, novel_id: str, chapter_id: str) -> dict:
-        """获取章节内容"""
+        """获取章节内容（抓取 + 解析）"""
         try:
-            novel_id = str(novel_id).strip()
-            chapter_id = str(chapter_id).strip()
-            chapter_url = self.CHAPTER_URL_TEMPLATE.format(
-                novel_id=novel_id, chapter_id=chapter_id
-            )
+            body = self.fetch_chapter_raw(novel_id, chapter_id)
+            return self.parse_chapter_body(body)
+        except SourceError:
+            raise
+        except Exception as e:
+            raise SourceError(f'获取章节内容失败: {e}', error_type='UNKNOWN') from e
 
-            resp = self._fetch(chapter_url)
-            page = self._parse_html(resp)
+    def fetch_chapter_raw(self, novel_id: str, chapter_id: str) -> bytes:
+        """只抓取章节页原始字节，不做解析（供进程池解析流水线使用）"""
+        novel_id = str(novel_id).strip()
+        chapter_id = str(chapter_id).strip()
+        chapter_url = self.CHAPTER_URL_TEMPLATE.format(
+            novel_id=novel_id, chapter_id=chapter_id
+        )
+        resp = self._fetch(chapter_url)
+        if not resp.body:
+            raise SourceError('响应内容为空', error_type='NETWORK')
+        return resp.body
 
-            # 章节标题
-            title = page.css(self.TITLE_SELECTOR).get('')
+    @classmethod
+    def _selector_from_body(cls, body: bytes):
+        """按源声明的编码把原始字节解析为 Selector（不依赖实例状态）"""
+        if not body:
+            raise SourceError('响应内容为空', error_type='NETWORK')
+        from scrapling import Selector
+        return Selector(body, encoding=cls.ENCODING, backend=cls.PARSER_BACKEND)
 
-            # 章节正文
-            content_el = page.css(self.CONTENT_SELECTOR)
-            if not content_el:
-                content_el = page.css(f'div{self.CONTENT_SELECTOR}, .content, .chapter-content, .article-content, #acontent')
+    @classmethod
+    def _extract_chapter_full(cls, body: bytes) -> tuple:
+        """完整解析章节页，返回 (标题, 正文, 页面 title)"""
+        page = cls._selector_from_body(body)
 
-            if not content_el:
-                raise SourceError('未找到章节内容', error_type='PARSE')
+        # 章节标题
+        title = page.css(cls.TITLE_SELECTOR).get('')
 
-            content_node = content_el[0]
-            try:
-                content_text = content_node.get_all_text() or ''
-            except Exception:
-                text_nodes = content_node.css('::text')
-                content_text = '\n'.join(str(t).strip() for t in text_nodes if str(t).strip())
+        # 章节正文
+        content_el = page.css(cls.CONTENT_SELECTOR)
+        if not content_el:
+            content_el = page.css(f'div{cls.CONTENT_SELECTOR}, .content, .chapter-content, .article-content, #acontent')
+
+        if not content_el:
+            raise SourceError('未找到章节内容', error_type='PARSE')
+
+        content_node = content_el[0]
+        try:
+            content_text = content_node.get_all_text() or ''
+        except Exception:
+            text_nodes = content_node.css('::text')
+            content_text = '\n'.join(str(t).strip() for t in text_nodes if str(t).strip())
+
+        page_title = '' if title else page.css('title::text').get('')
+        return title, content_text, page_title
+
+    @classmethod
+    def parse_chapter_body(cls, body: bytes) -> dict:
+        """从章节页原始字节中提取标题和正文
+
+        classmethod 且只依赖类属性，可以在子进程中按源名称调用。
+        """
+        try:
+            extracted = None
+            if cls.STREAMING_PARSE and body:
+                extracted = stream_extract_chapter(body, cls.ENCODING, cls.CONTENT_SELECTOR, cls.TITLE_SELECTOR)
+            if extracted is not None:
+                title, content_text, page_title = extracted
+            else:
+                title, content_text, page_title = cls._extract_chapter_full(body)
 
             # 清理广告/提示文字
-            content_text = self._clean_content(content_text)
+            content_text = cls._clean_content(content_text)
 
             if not content_text:
                 raise SourceError('章节内容为空', error_type='PARSE')
 
             if not title:
-                page_title = page.css('title::text').get('')
                 if '_' in page_title:
                     title = page_title.split('_')[0].strip()
                 elif '-' in page_title:
@@ -420,9 +445,10 @@ class ConfigurableSource(BaseSource):
         except SourceError:
             raise
         except Exception as e:
-            raise SourceError(f'获取章节内容失败: {e}', error_type='UNKNOWN') from e
+            raise SourceError(f'解析章节内容失败: {e}', error_type='PARSE') from e
 
-    def _clean_content(self, text: str) -> str:
+    @staticmethod
+    def _clean_content(text: str) -> str:
         """清理章节内容中的广告和提示文字"""
         ad_patterns = [
             r'最新网址[：:].*?www\.\S+',
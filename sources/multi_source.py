@@ -10,13 +10,54 @@
 """
 from __future__ import annotations
 
-from concurrent.futures import ThreadPoolExecutor, as_completed
+import copy
+import math
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, as_completed, wait
 from typing import List, Dict
 
-from . import get_source, SOURCE_REGISTRY, SEARCHABLE_SOURCES, NovelInfo
+from . import get_shared_source, SOURCE_REGISTRY, SEARCHABLE_SOURCES, NovelInfo
 from .bing_search import search_via_bing
 from .base import SourceError
 
+# 跨源书籍对应（数据库 book_identity 表）的可信度：
+# 从该源下载到了章节 > 搜索结果（书名作者都有） > 书名匹配（作者未知或只是包含关系）
+IDENTITY_VERIFIED = 1.0
+IDENTITY_EXACT = 0.8
+IDENTITY_LOOSE = 0.5
+# 上次在所有源中查找超过这么久后，先返回已知结果，再在后台重新查找
+IDENTITY_REVERIFY_AGE = 7 * 24 * 3600
+# 没在所有源中查找过时，已知的其他源不少于这么多个才直接使用
+IDENTITY_ENOUGH_SOURCES = 2
+# 后台重新查找跨源对应的线程数（到期的书排队依次查找，不为每本书新开线程）
+IDENTITY_REFRESH_WORKERS = 2
+
+_identity_refreshing = set()  # 正在查找或已排队的 (书名, 作者)
+_identity_refreshing_lock = threading.Lock()
+_identity_executor = ThreadPoolExecutor(max_workers=IDENTITY_REFRESH_WORKERS)
+
+# 搜索结果缓存：各源（以及 Bing）的结果按规范化关键词分别缓存，
+# 过期后先返回旧结果，只在后台重新搜索这一个源
+SEARCH_CACHE_NAMESPACE = 'search_results'
+SEARCH_CACHE_TTL = 6 * 3600
+# Bing 补充结果在缓存中使用的键名
+BING_CACHE_SOURCE = 'bing'
+
+# 多源搜索的总时限（秒）：到时返回已有结果，未返回的源在后台完成后写入缓存
+SEARCH_DEADLINE = 3.0
+# 需要 Bing 补充时，即使已到时限也至少再等待的时间（秒）
+SEARCH_SUPPLEMENT_MIN_WAIT = 1.0
+# 等待各源时检查取消的间隔（秒）
+SEARCH_POLL_INTERVAL = 0.2
+
+# 各源搜索请求的自适应超时：按观测到的耗时计算 平均值 + 4 × 平均偏差（指数加权），
+# 限制在 [SEARCH_TIMEOUT_MIN, 源自身的 TIMEOUT] 之间；没有观测数据时使用源自身的 TIMEOUT
+SEARCH_LATENCY_ALPHA = 0.25
+SEARCH_TIMEOUT_MIN = 4
+_search_latency = {}  # {source_key: (平均耗时, 平均偏差)}
+_search_latency_lock = threading.Lock()
+
 
 # 源显示名映射
 SOURCE_DISPLAY_NAMES = {
@@ -29,8 +70,20 @@ SOURCE_DISPLAY_NAMES = {
     'fanqie': '番茄小说',
 }
 
+# 主源优先级（数字越小越优先）：相关性排序同分时、以及从书目索引中选取源时使用
+SOURCE_PRIORITY = {
+    'biquge': 0,
+    'sto66': 1,
+    'dingdian': 2,
+    'qianbi': 3,
+    'bxwx': 4,
+    'haitang': 5,
+    'fanqie': 6,
+}
+
 
-def search_all_sources(keyword: str, include_fanqie: bool = True) -> List[dict]:
+def search_all_sources(keyword: str, include_fanqie: bool = True, on_update=None,
+                       cancel_event=None, deadline: float = SEARCH_DEADLINE) -> List[dict]:
     """多源并发搜索，聚合所有源的可用结果
 
     搜索策略：
@@ -45,95 +98,272 @@ def search_all_sources(keyword: str, include_fanqie: bool = True) -> List[dict]:
     5. 其他 → 4 分
     同分时主源（蚂蚁文学）优先，有封面优先
 
+    各源的结果按规范化关键词（normalize_keyword）分别缓存 SEARCH_CACHE_TTL，
+    重复搜索只需合并缓存；某个源的缓存过期时返回旧结果，并在后台重新搜索该源。
+
+    所有源同时搜索，最多等待 deadline 秒（需要 Bing 补充时最多再等 SEARCH_SUPPLEMENT_MIN_WAIT 秒），
+    超时未返回的源不再等待，它们的结果在后台写入缓存，下次搜索时直接使用。
+
     Args:
         keyword: 搜索关键词或URL
         include_fanqie: 是否包含番茄源
+        on_update: 可选，每个源（包括 Bing）返回后调用 on_update(source_key, 当前已排序的全部结果)，
+            在调用 search_all_sources 的线程中执行
+        cancel_event: 可选 threading.Event，set 后不再等待其余的源，直接返回已有结果
+            （已发出的请求在后台完成并写入缓存）
+        deadline: 总时限（秒），None 表示等待所有源
 
     Returns:
         [{novel_id, title, author, source, source_name, status, ...}, ...]
     """
     results = {}  # key=(source, novel_id) 去重
 
-    # 1. 各源自身搜索（并发，主要搜索方式）
+    # 1. 各源自身搜索（并发，主要搜索方式；命中缓存的源不发请求）
     search_sources = list(SEARCHABLE_SOURCES)
     if include_fanqie:
         search_sources.append('fanqie')
 
-    def _source_search(source_key):
-        try:
-            source = get_source(source_key)
-            if not getattr(source, 'supports_search', False):
-                return []
-            return source.search_novel(keyword)
-        except Exception as e:
-            print(f'[多源搜索] {source_key} 搜索失败: {e}')
-            return []
-
-    with ThreadPoolExecutor(max_workers=4) as executor:
-        future_to_source = {
-            executor.submit(_source_search, sk): sk
+    def _add(items):
+        for item in items:
+            key = (item['source'], item['novel_id'])
+            if key not in results:
+                results[key] = dict(item)  # 缓存中的对象不交给调用方修改
+
+    def _cancelled():
+        return cancel_event is not None and cancel_event.is_set()
+
+    def _update(source_key):
+        if on_update and not _cancelled():
+            on_update(source_key, _sort_by_relevance(list(results.values()), keyword))
+
+    def _collect(future_to_source, deadline_at):
+        """等待各源返回，直到全部返回、到达时限或被取消"""
+        pending = set(future_to_source)
+        while pending and not _cancelled():
+            timeout = SEARCH_POLL_INTERVAL
+            if deadline_at is not None:
+                remaining = deadline_at - time.monotonic()
+                if remaining <= 0:
+                    break
+                timeout = min(timeout, remaining)
+            done, pending = wait(pending, timeout=timeout, return_when=FIRST_COMPLETED)
+            for future in done:
+                try:
+                    _add(future.result())
+                except Exception as e:
+                    print(f'[多源搜索] {future_to_source[future]} 搜索失败: {e}')
+                _update(future_to_source[future])
+        if pending and not _cancelled():
+            late = ', '.join(sorted(future_to_source[f] for f in pending))
+            print(f'[多源搜索] 超过时限未返回（结果将在后台写入缓存）: {late}')
+
+    deadline_at = None if deadline is None else time.monotonic() + deadline
+    # 每个源一个线程，不让慢的源排队挡住其他源；返回时不等待未完成的请求
+    executor = ThreadPoolExecutor(max_workers=len(search_sources) + 1)
+    try:
+        _collect({
+            executor.submit(_cached_search, sk, keyword, _search_source): sk
             for sk in search_sources
-        }
-        for future in as_completed(future_to_source):
-            sk = future_to_source[future]
-            try:
-                novels = future.result()
-                for n in novels:
-                    key = (sk, str(n.novel_id))
-                    if key not in results:
-                        # 从 extra 中提取状态字段，便于前端统一显示
-                        extra = n.extra or {}
-                        status = extra.get('status', '') or extra.get('novel_status', '')
-                        results[key] = {
-                            'novel_id': str(n.novel_id),
-                            'title': n.title or '',
-                            'author': n.author or '',
-                            'description': n.description or '',
-                            'cover_url': n.cover_url or '',
-                            'word_count': n.word_count or 0,
-                            'chapter_count': n.chapter_count or 0,
-                            'status': status,
-                            'source': sk,
-                            'source_key': sk,
-                            'source_name': SOURCE_DISPLAY_NAMES.get(sk, sk),
-                            'extra': extra,
-                        }
-            except Exception:
-                pass
-
-    # 2. Bing 搜索作为补充（如果各源搜索结果不足）
-    if len(results) < 3:
-        try:
-            bing_results = search_via_bing(keyword)
-            for r in bing_results:
-                src = r.get('source', '')
-                nid = str(r.get('novel_id', ''))
-                if not src or not nid:
-                    continue
-                key = (src, nid)
-                if key not in results:
-                    results[key] = {
-                        'novel_id': nid,
-                        'title': r.get('title', ''),
-                        'author': '',
-                        'description': '',
-                        'cover_url': '',
-                        'word_count': 0,
-                        'chapter_count': 0,
-                        'status': '',
-                        'source': src,
-                        'source_key': src,
-                        'source_name': SOURCE_DISPLAY_NAMES.get(src, src),
-                        'extra': {'_search_url': r.get('url', '')},
-                    }
-        except Exception as e:
-            print(f'[多源搜索] Bing 补充搜索失败: {e}')
+        }, deadline_at)
+
+        # 2. Bing 搜索作为补充（如果各源搜索结果不足）
+        if len(results) < 3 and not _cancelled():
+            if deadline_at is not None:
+                deadline_at = max(deadline_at, time.monotonic() + SEARCH_SUPPLEMENT_MIN_WAIT)
+            _collect({
+                executor.submit(_cached_search, BING_CACHE_SOURCE, keyword, _search_bing): BING_CACHE_SOURCE
+            }, deadline_at)
+    finally:
+        executor.shutdown(wait=False)
 
     # 3. 相关性排序：最准确的名字排在首位
     sorted_results = _sort_by_relevance(list(results.values()), keyword)
     return sorted_results
 
 
+def normalize_keyword(keyword: str) -> str:
+    """关键词的规范形式：去除首尾空格和书名号《》，转小写
+
+    用于相关性排序和搜索缓存的键（《斗破苍穹》、斗破苍穹 等写法共用一份缓存）。
+    """
+    return (keyword or '').strip().lstrip('《').rstrip('》').strip().lower()
+
+
+def _cached_search(source_key: str, keyword: str, search) -> List[dict]:
+    """读取 source_key 对 keyword 的缓存结果，未缓存时调用 search(source_key, keyword)
+
+    没有结果（或搜索失败）时不缓存，下次搜索会重新请求该源。
+    """
+    def load():
+        try:
+            results = search(source_key, keyword)
+        except Exception as e:
+            print(f'[多源搜索] {source_key} 搜索失败: {e}')
+            return None
+        _add_to_catalog(results)
+        return results or None
+
+    kw = normalize_keyword(keyword)
+    if not kw:
+        return []
+    try:
+        from database import get_metadata_cache
+        cache = get_metadata_cache()
+    except Exception as e:
+        print(f'[多源搜索] 读取缓存失败: {e}')
+        return load() or []
+    return cache.get(SEARCH_CACHE_NAMESPACE, f'{source_key}\x1f{kw}', load, SEARCH_CACHE_TTL) or []
+
+
+def _record_search_latency(source_key: str, elapsed: float):
+    """记录一次搜索请求的耗时（失败时也记录，超时会把自适应超时推高）"""
+    with _search_latency_lock:
+        entry = _search_latency.get(source_key)
+        if entry is None:
+            _search_latency[source_key] = (elapsed, elapsed / 2)
+            return
+        mean, dev = entry
+        dev += SEARCH_LATENCY_ALPHA * (abs(elapsed - mean) - dev)
+        mean += SEARCH_LATENCY_ALPHA * (elapsed - mean)
+        _search_latency[source_key] = (mean, dev)
+
+
+def search_timeout(source_key: str, default: float) -> float:
+    """source_key 搜索请求的自适应超时（秒），default 为源自身的 TIMEOUT"""
+    with _search_latency_lock:
+        entry = _search_latency.get(source_key)
+    if entry is None:
+        return default
+    mean, dev = entry
+    return min(default, max(SEARCH_TIMEOUT_MIN, math.ceil(mean + 4 * dev)))
+
+
+def _catalog_db():
+    from database import get_metadata_cache
+    return get_metadata_cache().db
+
+
+def _add_to_catalog(items: List[dict]):
+    """把搜索等得到的书写入本地书目索引（输入联想、排行榜预先匹配源）和跨源书籍对应表"""
+    if not items:
+        return
+    try:
+        db = _catalog_db()
+        db.catalog_add_many(
+            (item.get('source_key') or item.get('source'), item.get('novel_id'),
+             item.get('title'), item.get('author'), item.get('cover_url'))
+            for item in items
+        )
+        db.save_book_identities(
+            (item['title'], item.get('author', ''), sk, item['novel_id'],
+             IDENTITY_EXACT if item.get('author') else IDENTITY_LOOSE)
+            for item in items
+            for sk in [item.get('source_key') or item.get('source')]
+            if sk in SEARCHABLE_SOURCES and item.get('title') and item.get('novel_id')
+        )
+    except Exception as e:
+        print(f'[书目索引] 写入失败: {e}')
+
+
+def _best_source(sources: Dict[str, str]):
+    """从 {source_key: novel_id} 中按 SOURCE_PRIORITY 选出可直接打开的源，没有时返回 None"""
+    usable = [sk for sk in sources if sk in SOURCE_PRIORITY]
+    if not usable:
+        return None
+    sk = min(usable, key=SOURCE_PRIORITY.get)
+    return {'source_key': sk, 'novel_id': sources[sk], 'source_name': SOURCE_DISPLAY_NAMES.get(sk, sk)}
+
+
+def _resolve_from_catalog(novels: List[dict]) -> List[dict]:
+    """为排行榜/分类中的书（只有书名）补上书目索引中已知的源：novel['resolved'] = {source_key, novel_id, source_name}
+
+    点击时有 resolved 就直接打开该源，不必再做一轮多源搜索。
+    """
+    try:
+        matches = _catalog_db().catalog_sources_many([(n['title'], n.get('author', '')) for n in novels])
+    except Exception as e:
+        print(f'[书目索引] 查询失败: {e}')
+        return novels
+    for novel, sources in zip(novels, matches):
+        novel['resolved'] = _best_source(sources)
+    return novels
+
+
+def suggest_from_catalog(keyword: str, limit: int = 10) -> List[dict]:
+    """输入联想：从本地书目索引中按书名/作者片段或拼音首字母查找见过的书（不访问网络）
+
+    Returns:
+        [{title, author, cover_url, sources: {source_key: novel_id}, resolved}]
+        resolved 为可直接打开的源（见 _best_source），只在排行榜中见过的书为 None
+    """
+    suggestions = _catalog_db().catalog_suggest(keyword, limit)
+    for item in suggestions:
+        item['sources'] = {sk: nid for sk, nid in item['sources'].items() if sk in SOURCE_PRIORITY}
+        item['resolved'] = _best_source(item['sources'])
+    return suggestions
+
+
+def _search_source(source_key: str, keyword: str) -> List[dict]:
+    """调用单个源的搜索接口，返回结果字典列表（不使用缓存）"""
+    source = get_shared_source(source_key)
+    if not getattr(source, 'supports_search', False):
+        return []
+    if hasattr(source, 'TIMEOUT'):
+        # 在浅拷贝上改超时，不影响共享实例上下载等其他请求的超时
+        source = copy.copy(source)
+        source.TIMEOUT = search_timeout(source_key, source.TIMEOUT)
+    start = time.monotonic()
+    try:
+        novels = source.search_novel(keyword)
+    finally:
+        _record_search_latency(source_key, time.monotonic() - start)
+    results = []
+    for n in novels:
+        # 从 extra 中提取状态字段，便于前端统一显示
+        extra = n.extra or {}
+        status = extra.get('status', '') or extra.get('novel_status', '')
+        results.append({
+            'novel_id': str(n.novel_id),
+            'title': n.title or '',
+            'author': n.author or '',
+            'description': n.description or '',
+            'cover_url': n.cover_url or '',
+            'word_count': n.word_count or 0,
+            'chapter_count': n.chapter_count or 0,
+            'status': status,
+            'source': source_key,
+            'source_key': source_key,
+            'source_name': SOURCE_DISPLAY_NAMES.get(source_key, source_key),
+            'extra': extra,
+        })
+    return results
+
+
+def _search_bing(_source_key: str, keyword: str) -> List[dict]:
+    """Bing 补充搜索，返回结果字典列表（不使用缓存）"""
+    results = []
+    for r in search_via_bing(keyword):
+        src = r.get('source', '')
+        nid = str(r.get('novel_id', ''))
+        if not src or not nid:
+            continue
+        results.append({
+            'novel_id': nid,
+            'title': r.get('title', ''),
+            'author': '',
+            'description': '',
+            'cover_url': '',
+            'word_count': 0,
+            'chapter_count': 0,
+            'status': '',
+            'source': src,
+            'source_key': src,
+            'source_name': SOURCE_DISPLAY_NAMES.get(src, src),
+            'extra': {'_search_url': r.get('url', '')},
+        })
+    return results
+
+
 def _sort_by_relevance(results: List[dict], keyword: str) -> List[dict]:
     """按标题相关性排序搜索结果
 
@@ -149,24 +379,11 @@ def _sort_by_relevance(results: List[dict], keyword: str) -> List[dict]:
     if not keyword or not results:
         return results
 
-    kw = keyword.strip()
     # 去除书名号《》和首尾空格
-    kw_clean = kw.lstrip('《').rstrip('》').strip().lower()
-
-    # 主源优先级（数字越小越优先）
-    source_priority = {
-        'biquge': 0,
-        'sto66': 1,
-        'dingdian': 2,
-        'qianbi': 3,
-        'bxwx': 4,
-        'haitang': 5,
-        'fanqie': 6,
-    }
+    kw_clean = normalize_keyword(keyword)
 
     def _score(item):
-        title = (item.get('title') or '').strip()
-        title_clean = title.lstrip('《').rstrip('》').strip().lower()
+        title_clean = normalize_keyword(item.get('title'))
 
         # 标题相关性评分
         if not title_clean:
@@ -186,7 +403,7 @@ def _sort_by_relevance(results: List[dict], keyword: str) -> List[dict]:
         has_cover = 0 if item.get('cover_url') else 1
         # 次级排序：主源优先
         src = item.get('source_key') or item.get('source') or ''
-        src_pri = source_priority.get(src, 9)
+        src_pri = SOURCE_PRIORITY.get(src, 9)
         # 次级排序：标题长度短优先（更精确的匹配）
         title_len = len(title_clean)
 
@@ -196,9 +413,12 @@ def _sort_by_relevance(results: List[dict], keyword: str) -> List[dict]:
 
 
 def find_novel_in_all_sources(title: str, author: str = '', exclude_source: str = '') -> Dict[str, str]:
-    """在各源搜索同一本书（用于多源分工下载）
+    """查找同一本书在各源的 novel_id（用于多源分工下载、失败章节换源重试）
 
-    按书名+作者匹配，返回 {source_key: novel_id}
+    先查跨源书籍对应表（数据库 book_identity，由搜索结果和换源下载成功的记录填充）：
+    在所有源中查找过、或已知的其他源足够多时直接返回，不访问网络；
+    上次查找已过 IDENTITY_REVERIFY_AGE 时交给后台线程池重新查找。
+    否则按书名+作者在各源搜索（很慢），结果写入对应表。
 
     Args:
         title: 书名
@@ -208,23 +428,117 @@ def find_novel_in_all_sources(title: str, author: str = '', exclude_source: str
     Returns:
         {source_key: novel_id} 匹配到的各源 novel_id
     """
-    matches = {}
     if not title:
+        return {}
+
+    from database import BOOK_IDENTITY_ALL_SOURCES
+
+    try:
+        known = _catalog_db().get_book_identity(title, author)
+    except Exception as e:
+        print(f'[多源匹配] 读取跨源对应表失败: {e}')
+        return {sk: nid for sk, (nid, _) in _match_in_all_sources(title, author, exclude_source).items()}
+
+    checked = known.pop(BOOK_IDENTITY_ALL_SOURCES, None)
+    matches = {sk: entry['novel_id'] for sk, entry in known.items()
+               if sk != exclude_source and sk in SEARCHABLE_SOURCES}
+    if matches and (checked or len(matches) >= IDENTITY_ENOUGH_SOURCES):
+        if not checked or time.time() - checked['verified_at'] > IDENTITY_REVERIFY_AGE:
+            _schedule_identity_refresh(title, author, exclude_source)
         return matches
 
+    found = _refresh_identity(title, author, exclude_source)
+    if found is None:
+        # 其他线程正在查找同一本书，这次直接搜索
+        found = _match_in_all_sources(title, author, exclude_source)
+    return {sk: nid for sk, (nid, _) in found.items() if sk != exclude_source}
+
+
+def record_verified_source(title: str, author: str, source_key: str, novel_id: str):
+    """记录从 source_key 下载到了这本书的章节（跨源对应的最高可信度，重新查找时不会被删除）"""
+    try:
+        _catalog_db().save_book_identities([(title, author, source_key, novel_id, IDENTITY_VERIFIED)])
+    except Exception as e:
+        print(f'[多源匹配] 写入跨源对应表失败: {e}')
+
+
+def _claim_identity_refresh(title: str, author: str) -> bool:
+    """登记这本书正在查找，已在查找或排队时返回 False"""
+    key = (title, author)
+    with _identity_refreshing_lock:
+        if key in _identity_refreshing:
+            return False
+        _identity_refreshing.add(key)
+        return True
+
+
+def _schedule_identity_refresh(title: str, author: str, exclude_source: str):
+    """把重新查找交给后台线程池（同一本书已在查找或排队时不重复提交）"""
+    if _claim_identity_refresh(title, author):
+        _identity_executor.submit(_do_refresh_identity, title, author, exclude_source)
+
+
+def _refresh_identity(title: str, author: str, exclude_source: str = ''):
+    """在除 exclude_source 以外的所有源中查找这本书并更新跨源对应表
+
+    这次没找到、且没有下载验证过的旧记录会被删除（不搜索的 exclude_source 保留原记录）。
+    同一本书已在查找时返回 None。
+
+    Returns:
+        {source_key: (novel_id, confidence)}
+    """
+    if not _claim_identity_refresh(title, author):
+        return None
+    return _do_refresh_identity(title, author, exclude_source)
+
+
+def _do_refresh_identity(title: str, author: str, exclude_source: str):
+    """_refresh_identity 的实际查找（调用前已登记，结束时取消登记）"""
+    try:
+        from database import BOOK_IDENTITY_ALL_SOURCES
+
+        found = _match_in_all_sources(title, author, exclude_source)
+        db = _catalog_db()
+        stale = [sk for sk, entry in db.get_book_identity(title, author).items()
+                 if sk in SEARCHABLE_SOURCES and sk != exclude_source and sk not in found
+                 and entry['confidence'] < IDENTITY_VERIFIED]
+        db.save_book_identities(
+            [(title, author, sk, nid, confidence) for sk, (nid, confidence) in found.items()]
+            + [(title, author, BOOK_IDENTITY_ALL_SOURCES, BOOK_IDENTITY_ALL_SOURCES, 0.0)]
+        )
+        db.forget_book_identity(title, author, stale)
+        return found
+    except Exception as e:
+        print(f'[多源匹配] 更新跨源对应表失败: {e}')
+        return {}
+    finally:
+        with _identity_refreshing_lock:
+            _identity_refreshing.discard((title, author))
+
+
+def _match_in_all_sources(title: str, author: str, exclude_source: str) -> Dict[str, tuple]:
+    """并发在各源搜索书名，返回 {source_key: (novel_id, confidence)}（不读写对应表）"""
+    matches = {}
     search_sources = [s for s in SEARCHABLE_SOURCES if s != exclude_source]
+    title_key = normalize_keyword(title)
 
     def _match_in_source(source_key):
         try:
-            source = get_source(source_key)
+            source = get_shared_source(source_key)
             results = source.search_novel(title)
+            best = None
             for n in results:
                 # 标题包含匹配 + 作者匹配（如果有）
                 if title.lower() in (n.title or '').lower() or (n.title or '').lower() in title.lower():
                     if author and n.author and author not in n.author and n.author not in author:
                         continue
-                    return (source_key, str(n.novel_id))
-            return None
+                    exact = (normalize_keyword(n.title) == title_key
+                             and bool(author) and (n.author or '').strip() == author.strip())
+                    if exact:
+                        return (source_key, str(n.novel_id), IDENTITY_EXACT)
+                    if best is None:
+                        best = (source_key, str(n.novel_id), IDENTITY_LOOSE)
+            return best
         except Exception:
             return None
 
@@ -233,16 +547,17 @@ def find_novel_in_all_sources(title: str, author: str = '', exclude_source: str
         for future in as_completed(futures):
             result = future.result()
             if result:
-                matches[result[0]] = result[1]
+                matches[result[0]] = result[1:]
 
     return matches
 
 
 def get_all_rankings(category: str = 'all', page: int = 1) -> List[dict]:
-    """获取排行榜数据（来源：速读谷 sudugu.org，按天缓存）
+    """获取排行榜数据（来源：速读谷 sudugu.org，带缓存）
 
-    排行榜数据统一从速读谷获取，每日只请求一次后缓存到本地。
-    排行榜中的小说封面和书名已缓存，点击后用书名在各源搜索。
+    排行榜数据统一从速读谷获取，缓存在本地 kv_cache 中，过期后在后台刷新。
+    排行榜中的小说封面和书名已缓存，点击后用书名在各源搜索；
+    书目索引中已有该书时附带 resolved（见 _resolve_from_catalog），点击后直接打开。
 
     Returns:
         [{novel_id, title, author, source, source_name, cover_url, category, status, ...}]
@@ -273,7 +588,7 @@ def get_all_rankings(category: str = 'all', page: int = 1) -> List[dict]:
                 'rank': n.get('rank', 0),
                 'extra': {},
             })
-        return results
+        return _resolve_from_catalog(results)
     except Exception as e:
         print(f'[多源排行] 获取速读谷排行榜失败: {e}')
         return []
@@ -298,9 +613,9 @@ def get_all_categories() -> List[dict]:
 
 
 def get_category_novels(category_key: str, page: int = 1) -> List[dict]:
-    """获取分类下的小说列表（来源：速读谷 sudugu.org，按天缓存）
+    """获取分类下的小说列表（来源：速读谷 sudugu.org，带缓存）
 
-    点击分类后调用，返回该分类最新小说（带封面，已按天缓存）。
+    点击分类后调用，返回该分类最新小说（带封面，已缓存）。
     点击具体小说后用书名在各源搜索。
 
     Args:
@@ -334,7 +649,7 @@ def get_category_novels(category_key: str, page: int = 1) -> List[dict]:
                 'status': n.get('status', ''),
                 'extra': {},
             })
-        return results
+        return _resolve_from_catalog(results)
     except Exception as e:
         print(f'[多源分类] 获取分类 {category_key} 小说失败: {e}')
         return []
@@ -0,0 +1,142 @@
+# -*- coding: utf-8 -*-
+"""章节解析进程池
+
+批量下载时，线程池里的网络线程只负责抓取章节页原始字节，
+HTML 建树、get_all_text、正则清理等 CPU 密集步骤交给子进程完成，
+从而绕开 GIL，让解析吞吐随 CPU 核数增长。
+
+- 进程数默认等于 CPU 核数
+- 提交的任务先在本进程攒批（够 batch_size 条或等待 linger 秒），
+  一次 IPC 发送一批，减少序列化/进程间通信的固定开销
+- 调用方拿到的是单条任务的 Future，用法与普通线程池一致
+"""
+from __future__ import annotations
+
+import os
+import time
+import threading
+from concurrent.futures import Future, ProcessPoolExecutor
+from typing import List, Optional, Tuple
+
+from .base import SourceError
+
+
+def _parse_batch(items: List[Tuple[str, bytes]]) -> list:
+    """子进程入口：按源名称解析一批章节页
+
+    结果以元组返回（('ok', data) 或 ('error', message, error_type)），
+    避免自定义异常在进程间序列化时出错。
+    """
+    from . import SOURCE_REGISTRY
+
+    results = []
+    for source_name, body in items:
+        try:
+            source_cls = SOURCE_REGISTRY[source_name]
+            results.append(('ok', source_cls.parse_chapter_body(body)))
+        except SourceError as e:
+            results.append(('error', e.message, e.error_type))
+        except Exception as e:
+            results.append(('error', f'解析章节内容失败: {e}', 'PARSE'))
+    return results
+
+
+class ChapterParsePool:
+    """章节解析进程池（自动按 CPU 核数扩展 + 批量提交）"""
+
+    def __init__(self, max_workers: Optional[int] = None, batch_size: int = 8, linger: float = 0.05):
+        """
+        Args:
+            max_workers: 子进程数（默认等于 CPU 核数）
+            batch_size: 单次 IPC 发送的最大章节数
+            linger: 不满一批时最多等待的秒数
+        """
+        self.max_workers = max(1, max_workers or os.cpu_count() or 1)
+        self.batch_size = max(1, batch_size)
+        self.linger = linger
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._pending = []  # [(source_name, body, future)]
+        self._cond = threading.Condition()
+        self._dispatcher: Optional[threading.Thread] = None
+        self._closed = False
+
+    # ============== 对外接口 ==============
+
+    def submit(self, source_name: str, body: bytes) -> Future:
+        """提交一个章节页，返回结果为 {'title', 'content'} 的 Future"""
+        future = Future()
+        with self._cond:
+            if self._closed:
+                raise RuntimeError('解析进程池已关闭')
+            self._ensure_started()
+            self._pending.append((source_name, body, future))
+            self._cond.notify()
+        return future
+
+    def parse(self, source_name: str, body: bytes, timeout: Optional[float] = None) -> dict:
+        """提交并阻塞等待解析结果（解析失败抛出 SourceError）"""
+        return self.submit(source_name, body).result(timeout=timeout)
+
+    def shutdown(self, wait: bool = True):
+        """关闭进程池（未发送的任务会先发送完）"""
+        with self._cond:
+            if self._closed:
+                return
+            self._closed = True
+            self._cond.notify()
+        if self._dispatcher:
+            self._dispatcher.join()
+        if self._executor:
+            self._executor.shutdown(wait=wait)
+
+    # ============== 内部实现 ==============
+
+    def _ensure_started(self):
+        """首次提交时才创建子进程和分发线程（调用方需持有 _cond）"""
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(max_workers=self.max_workers)
+        if self._dispatcher is None:
+            self._dispatcher = threading.Thread(target=self._dispatch_loop, daemon=True)
+            self._dispatcher.start()
+
+    def _dispatch_loop(self):
+        """分发线程：攒够一批或等待超时后整批发送到子进程"""
+        while True:
+            with self._cond:
+                while not self._pending and not self._closed:
+                    self._cond.wait()
+                if not self._pending and self._closed:
+                    return
+                # 不满一批时再等一会儿，让更多任务合并到同一次 IPC
+                deadline = time.monotonic() + self.linger
+                while len(self._pending) < self.batch_size and not self._closed:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self._cond.wait(remaining)
+                batch = self._pending[:self.batch_size]
+                del self._pending[:self.batch_size]
+
+            futures = [f for _, _, f in batch]
+            try:
+                proc_future = self._executor.submit(_parse_batch, [(n, b) for n, b, _ in batch])
+            except Exception as e:
+                for f in futures:
+                    f.set_exception(SourceError(f'提交解析任务失败: {e}', error_type='PARSE'))
+                continue
+            proc_future.add_done_callback(lambda pf, fs=futures: self._resolve(pf, fs))
+
+    @staticmethod
+    def _resolve(proc_future: Future, futures: List[Future]):
+        """把子进程返回的一批结果分发到各自的 Future"""
+        try:
+            results = proc_future.result()
+        except Exception as e:
+            for f in futures:
+                f.set_exception(SourceError(f'解析进程异常: {e}', error_type='PARSE'))
+            return
+        for f, item in zip(futures, results):
+            if item[0] == 'ok':
+                f.set_result(item[1])
+            else:
+                f.set_exception(SourceError(item[1], error_type=item[2]))
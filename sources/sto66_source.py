@@ -17,7 +17,8 @@ import re
 from urllib.parse import urljoin, quote
 from typing import Optional, List
 
-from .base import BaseSource, NovelInfo, ChapterInfo, SourceError
+from .base import BaseSource, NovelInfo, ChapterList, SourceError
+from .stream_parse import stream_extract_chapter
 
 
 class Sto66Source(BaseSource):
@@ -27,9 +28,12 @@ class Sto66Source(BaseSource):
     display_name = '思兔阅读'
     needs_login = False
     supports_search = True
+    supports_raw_fetch = True
 
     MIRRORS = ['https://www.sto66.com']
     ENCODING = 'utf-8'
+    # 章节页优先流式解析（读到正文容器结束即停止；失败时回退到完整解析）
+    STREAMING_PARSE = True
 
     # URL 模式：/book/{22位ID}.html
     URL_PATTERN = re.compile(r'/book/([A-Za-z0-9]{20,26})')
@@ -110,8 +114,7 @@ class Sto66Source(BaseSource):
         if not resp.body:
             raise SourceError('响应内容为空', error_type='NETWORK')
         from scrapling import Selector
-        text = resp.text or resp.body.decode(self.ENCODING, errors='replace')
-        return Selector(text, adaptive=True)
+        return Selector(resp.body, encoding=self.ENCODING, adaptive=True)
 
     def _get_link_text(self, link) -> str:
         """安全获取链接文本"""
@@ -211,7 +214,7 @@ class Sto66Source(BaseSource):
         except Exception as e:
             raise SourceError(f'获取小说信息失败: {e}', error_type='UNKNOWN') from e
 
-    def get_chapter_list(self, novel_id: str) -> list[ChapterInfo]:
+    def get_chapter_list(self, novel_id: str) -> ChapterList:
         """获取章节列表（支持分页抓取）
 
         sto66.com 章节列表分页：/chapter/{id}.html, /chapter/{id}/2.html, ...
@@ -226,8 +229,7 @@ class Sto66Source(BaseSource):
                 if m:
                     novel_id = m.group(1)
 
-            all_chapters = []  # [(chapter_id, title), ...]
-            seen_ids = set()
+            all_chapters = ChapterList()  # 按 chapter_id 自动去重
 
             for page_num in range(1, self.MAX_CHAPTER_PAGES + 1):
                 if page_num == 1:
@@ -267,12 +269,8 @@ class Sto66Source(BaseSource):
                             has_next_page = True
                         continue
 
-                    chapter_id = m.group(1)
-                    if chapter_id in seen_ids:
-                        continue
-                    seen_ids.add(chapter_id)
-                    all_chapters.append((chapter_id, title or f'第{len(all_chapters) + 1}章'))
-                    page_chapter_count += 1
+                    if all_chapters.append(m.group(1), title or f'第{len(all_chapters) + 1}章'):
+                        page_chapter_count += 1
 
                 # 本页无章节或不足 500 章，视为最后一页
                 if page_chapter_count == 0:
@@ -280,14 +278,7 @@ class Sto66Source(BaseSource):
                 if not has_next_page and page_chapter_count < self.CHAPTERS_PER_PAGE:
                     break
 
-            return [
-                ChapterInfo(
-                    chapter_id=cid,
-                    chapter_title=title,
-                    chapter_index=i + 1,
-                )
-                for i, (cid, title) in enumerate(all_chapters)
-            ]
+            return all_chapters
         except SourceError:
             raise
         except Exception as e:
@@ -300,45 +291,80 @@ class Sto66Source(BaseSource):
         正文在 #content
         """
         try:
-            novel_id = str(novel_id).strip()
-            chapter_id = str(chapter_id).strip()
+            body = self.fetch_chapter_raw(novel_id, chapter_id)
+            return self.parse_chapter_body(body)
+        except SourceError:
+            raise
+        except Exception as e:
+            raise SourceError(f'获取章节内容失败: {e}', error_type='UNKNOWN') from e
 
-            # 如果 novel_id 是 URL，提取真实 ID
-            if novel_id.startswith('http'):
-                m = self.URL_PATTERN.search(novel_id)
-                if m:
-                    novel_id = m.group(1)
+    def fetch_chapter_raw(self, novel_id: str, chapter_id: str) -> bytes:
+        """只抓取章节页原始字节，不做解析"""
+        novel_id = str(novel_id).strip()
+        chapter_id = str(chapter_id).strip()
 
-            chapter_url = f'/chapter/{novel_id}/{chapter_id}.html'
-            resp = self._fetch(chapter_url)
-            page = self._parse_html(resp)
+        # 如果 novel_id 是 URL，提取真实 ID
+        if novel_id.startswith('http'):
+            m = self.URL_PATTERN.search(novel_id)
+            if m:
+                novel_id = m.group(1)
 
-            # 标题
-            title = page.css('h1::text').get('')
+        chapter_url = f'/chapter/{novel_id}/{chapter_id}.html'
+        resp = self._fetch(chapter_url)
+        if not resp.body:
+            raise SourceError('响应内容为空', error_type='NETWORK')
+        return resp.body
+
+    @classmethod
+    def _extract_chapter_full(cls, body: bytes) -> tuple:
+        """完整解析章节页，返回 (标题, 正文, 页面 title)"""
+        from scrapling import Selector
+        page = Selector(body, encoding=cls.ENCODING)
+
+        # 标题
+        title = page.css('h1::text').get('')
+
+        # 正文
+        content_el = page.css('#content')
+        if not content_el:
+            content_el = page.css('div#content, .content, .chapter-content, .article-content')
 
-            # 正文
-            content_el = page.css('#content')
-            if not content_el:
-                content_el = page.css('div#content, .content, .chapter-content, .article-content')
+        if not content_el:
+            raise SourceError('未找到章节内容', error_type='PARSE')
 
-            if not content_el:
-                raise SourceError('未找到章节内容', error_type='PARSE')
+        content_node = content_el[0]
+        try:
+            content_text = content_node.get_all_text() or ''
+        except Exception:
+            text_nodes = content_node.css('::text')
+            content_text = '\n'.join(str(t).strip() for t in text_nodes if str(t).strip())
+
+        page_title = '' if title else page.css('title::text').get('')
+        return title, content_text, page_title
 
-            content_node = content_el[0]
-            try:
-                content_text = content_node.get_all_text() or ''
-            except Exception:
-                text_nodes = content_node.css('::text')
-                content_text = '\n'.join(str(t).strip() for t in text_nodes if str(t).strip())
+    @classmethod
+    def parse_chapter_body(cls, body: bytes) -> dict:
+        """从章节页原始字节中提取标题和正文（可在子进程中调用）"""
+        try:
+            if not body:
+                raise SourceError('响应内容为空', error_type='NETWORK')
+
+            # 优先流式解析，读到 #content 结束即停止
+            extracted = None
+            if cls.STREAMING_PARSE:
+                extracted = stream_extract_chapter(body, cls.ENCODING, '#content', 'h1::text')
+            if extracted is not None:
+                title, content_text, page_title = extracted
+            else:
+                title, content_text, page_title = cls._extract_chapter_full(body)
 
             # 清理广告/提示文字
-            content_text = self._clean_content(content_text)
+            content_text = cls._clean_content(content_text)
 
             if not content_text:
                 raise SourceError('章节内容为空', error_type='PARSE')
 
             if not title:
-                page_title = page.css('title::text').get('')
                 if '-' in page_title:
                     title = page_title.split('-')[0].strip()
                 elif '_' in page_title:
@@ -351,9 +377,10 @@ class Sto66Source(BaseSource):
         except SourceError:
             raise
         except Exception as e:
-            raise SourceError(f'获取章节内容失败: {e}', error_type='UNKNOWN') from e
+            raise SourceError(f'解析章节内容失败: {e}', error_type='PARSE') from e
 
-    def _clean_content(self, text: str) -> str:
+    @staticmethod
+    def _clean_content(text: str) -> str:
         """清理章节内容中的广告和提示文字"""
         ad_patterns = [
             r'思兔阅读.*?最新章节',
@@ -0,0 +1,170 @@
+# -*- coding: utf-8 -*-
+"""章节页流式解析
+
+章节页里真正需要的只有标题（h1）和正文容器（如 #content），
+页头、导航、推荐列表、页脚等都不需要。这里用 lxml 的 feed 解析器 + target 回调：
+
+- 直接按源声明的编码喂入原始字节，不需要先把整页解码成 str
+- target 模式下 lxml 不构建任何树，只在回调里收集需要的文本
+- 正文容器闭合（且标题已拿到）后立即停止喂数据，跳过页面剩余部分
+
+提取结果与 Selector 的 ``css(TITLE_SELECTOR).get()`` /
+``css(CONTENT_SELECTOR)[0].get_all_text()`` 保持一致；
+遇到不支持的选择器或找不到正文容器时返回 None，由调用方回退到完整解析。
+"""
+from __future__ import annotations
+
+import re
+from typing import List, Optional, Tuple
+
+from lxml import etree
+
+# 支持的正文容器选择器：tag、#id、.class 及其组合（如 div#content、div.content.main）
+_SIMPLE_SELECTOR = re.compile(r'^([a-zA-Z][\w-]*)?(?:#([\w-]+))?((?:\.[\w-]+)*)$')
+# 支持的标题选择器：tag::text
+_TEXT_SELECTOR = re.compile(r'^([a-zA-Z][\w-]*)::text$')
+
+# 每次喂给解析器的字节数
+CHUNK_SIZE = 16 * 1024
+# 与 Selector.get_all_text 默认忽略的标签一致
+IGNORE_TAGS = ('script', 'style')
+
+
+class _ChapterTarget:
+    """lxml 解析器 target：只收集标题、<title> 和正文容器内的文本
+
+    文本按 lxml 的方式切分（元素的 text 和子元素的 tail 各为一段），
+    每次遇到开始/结束标签时把缓冲区的文本归属到当前栈顶元素。
+    """
+
+    def __init__(self, tag: Optional[str], elem_id: Optional[str], classes: List[str], title_tag: str):
+        self._tag = tag
+        self._id = elem_id
+        self._classes = classes
+        self._title_tag = title_tag
+
+        self._stack: List[str] = []
+        self._buffer: List[str] = []
+        self._content_depth: Optional[int] = None  # 正文容器所在的栈深度
+        self._ignored_open = 0  # 正文容器内尚未闭合的 script/style 数量
+
+        self.content_found = False
+        self.content_done = False
+        self.content_parts: List[str] = []
+        self.title: Optional[str] = None
+        self.page_title: Optional[str] = None
+
+    @property
+    def done(self) -> bool:
+        """正文容器已闭合且标题已拿到，后续内容无需再解析"""
+        return self.content_done and self.title is not None
+
+    def _matches(self, tag: str, attrib) -> bool:
+        if self._tag and tag != self._tag:
+            return False
+        if self._id and attrib.get('id') != self._id:
+            return False
+        if self._classes:
+            classes = (attrib.get('class') or '').split()
+            if not all(c in classes for c in self._classes):
+                return False
+        return True
+
+    def _flush(self):
+        if not self._buffer:
+            return
+        text = ''.join(self._buffer)
+        self._buffer.clear()
+        if not text or not self._stack:
+            return
+        owner = self._stack[-1]
+        if self._content_depth is not None and self._ignored_open == 0:
+            self.content_parts.append(text)
+        if owner == self._title_tag and self.title is None:
+            self.title = text
+        elif owner == 'title' and self.page_title is None:
+            self.page_title = text
+
+    def start(self, tag, attrib):
+        self._flush()
+        self._stack.append(tag)
+        if self._content_depth is not None:
+            if tag in IGNORE_TAGS:
+                self._ignored_open += 1
+        elif not self.content_found and self._matches(tag, attrib):
+            self.content_found = True
+            self._content_depth = len(self._stack)
+
+    def end(self, tag):
+        self._flush()
+        if self._content_depth is not None:
+            if len(self._stack) == self._content_depth:
+                self._content_depth = None
+                self.content_done = True
+            elif tag in IGNORE_TAGS and self._ignored_open:
+                self._ignored_open -= 1
+        if self._stack:
+            self._stack.pop()
+
+    def data(self, text):
+        self._buffer.append(text)
+
+    def close(self):
+        self._flush()
+
+
+def stream_extract_chapter(body: bytes, encoding: str, content_selector: str,
+                           title_selector: str = 'h1::text') -> Optional[Tuple[str, str, str]]:
+    """流式提取章节页的标题、正文和 <title>
+
+    Args:
+        body: 章节页原始字节
+        encoding: 源声明的编码（如 'utf-8'、'gbk'）
+        content_selector: 正文容器选择器（仅支持 tag / #id / .class 组合）
+        title_selector: 标题选择器（仅支持 tag::text）
+
+    Returns:
+        (title, content, page_title)；选择器不支持、解析出错或未找到正文容器时返回 None
+    """
+    if not body:
+        return None
+    content_match = _SIMPLE_SELECTOR.match(content_selector.strip())
+    title_match = _TEXT_SELECTOR.match(title_selector.strip())
+    if not content_match or not title_match or not any(content_match.groups()):
+        return None
+
+    tag, elem_id, classes = content_match.groups()
+    target = _ChapterTarget(
+        tag.lower() if tag else None,
+        elem_id,
+        [c for c in classes.split('.') if c],
+        title_match.group(1).lower(),
+    )
+    try:
+        parser = etree.HTMLParser(
+            target=target,
+            encoding=encoding,
+            recover=True,
+            remove_comments=True,
+            huge_tree=True,
+        )
+        # 与 Selector 一致：去除 \x00（GBK/UTF-8 的多字节序列中不会出现 0x00 字节）
+        for offset in range(0, len(body), CHUNK_SIZE):
+            chunk = body[offset:offset + CHUNK_SIZE]
+            if b'\x00' in chunk:
+                chunk = chunk.replace(b'\x00', b'')
+            parser.feed(chunk)
+            if target.done:
+                break
+        else:
+            parser.close()
+    except (etree.LxmlError, LookupError, ValueError):
+        # 未知编码或解析器异常，交给完整解析处理
+        return None
+
+    if not target.content_found:
+        return None
+
+    # 与 get_all_text() 默认参数一致：以换行连接，忽略空白段
+    content = '\n'.join(part for part in target.content_parts if part.strip())
+    return target.title or '', content, target.page_title or ''
@@ -2,7 +2,7 @@
 """速读谷 (sudugu.org) 排行榜抓取模块
 
 数据来源：https://www.sudugu.org/paihang/
-反爬策略：按天缓存到本地数据库，每日只请求一次
+反爬策略：缓存到本地数据库（kv_cache），一天内不重复请求；过期后先返回旧数据，再在后台刷新
 
 HTML 结构：
 <div class="item">
@@ -25,11 +25,14 @@ PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 if PROJECT_ROOT not in sys.path:
     sys.path.insert(0, PROJECT_ROOT)
 
-from database import NovelDatabase
+from database import get_metadata_cache
+
+# 排行榜/分类页缓存的有效期（秒）
+SUDUGU_CACHE_TTL = 24 * 3600
 
 
 class SuduguRankings:
-    """速读谷排行榜抓取器（带按天缓存）
+    """速读谷排行榜抓取器（带缓存）
 
     支持多页抓取：sudugu.org 排行榜按 /paihang/{N}.html 分页，每页 10 本。
     默认抓取前 3 页（共 30 本）。
@@ -37,9 +40,10 @@ class SuduguRankings:
 
     RANKING_URL = 'https://www.sudugu.org/paihang/'
     MAX_PAGES = 3  # 抓取页数（每页 10 本）
+    CACHE_NAMESPACE = 'sudugu_rankings'
 
     def __init__(self):
-        self._db = NovelDatabase()
+        self._cache = get_metadata_cache()
 
     def _fetch_html(self, page: int = 1) -> str:
         """从 sudugu.org 抓取指定页的排行榜 HTML
@@ -156,62 +160,72 @@ class SuduguRankings:
         results.sort(key=lambda x: x['rank'])
         return results
 
+    def _fetch_rankings(self) -> list[dict] | None:
+        """从网络获取排行榜（多页合并），没有获取到任何数据时返回 None（不写入缓存）"""
+        all_novels = []
+        for page in range(1, self.MAX_PAGES + 1):
+            try:
+                html = self._fetch_html(page)
+                # 第 N 页的 rank 偏移 = (N-1) * 10
+                rank_offset = (page - 1) * 10
+                novels = self._parse_rankings(html, rank_offset)
+                if not novels:
+                    # 该页无数据，停止翻页
+                    break
+                all_novels.extend(novels)
+            except Exception as e:
+                print(f'[SuduguRankings] 第 {page} 页抓取失败: {e}')
+                break
+
+        if not all_novels:
+            return None
+
+        # 补充前端需要的字段
+        for item in all_novels:
+            item['source_name'] = '速读谷排行'
+            item['source_key'] = 'sudugu'
+            item['novel_id'] = item.get('title', '')
+        _add_to_catalog(self._cache, all_novels)
+        return all_novels
+
     def get_rankings(self, category: str = 'all', use_cache: bool = True) -> list[dict]:
-        """获取排行榜数据（带按天缓存，多页合并）
+        """获取排行榜数据（带缓存，多页合并）
 
         Args:
-            category: 分类（暂未使用，sudugu 排行榜不区分分类）
-            use_cache: 是否使用缓存（True=优先缓存，每日只请求一次）
+            category: 按分类名过滤（'all' 不过滤；sudugu 排行榜本身不区分分类）
+            use_cache: 是否使用缓存（False 时强制从网络获取并更新缓存）
 
         Returns:
             [{rank, title, author, cover_url, category, status, source_url,
               source_name, source_key, novel_id}]
             novel_id 设为 title（因为点击后用书名搜索，不解析 sudugu URL）
         """
-        # 1. 优先从缓存读取
-        if use_cache:
-            cached = self._db.get_rankings_cache(category)
-            if cached:
-                # 补充前端需要的字段
-                for item in cached:
-                    item['source_name'] = '速读谷排行'
-                    item['source_key'] = 'sudugu'
-                    item['novel_id'] = item.get('title', '')
-                return cached
-
-        # 2. 缓存不存在，从网络获取（多页合并）
         try:
-            all_novels = []
-            for page in range(1, self.MAX_PAGES + 1):
-                try:
-                    html = self._fetch_html(page)
-                    # 第 N 页的 rank 偏移 = (N-1) * 10
-                    rank_offset = (page - 1) * 10
-                    novels = self._parse_rankings(html, rank_offset)
-                    if not novels:
-                        # 该页无数据，停止翻页
-                        break
-                    all_novels.extend(novels)
-                except Exception as e:
-                    print(f'[SuduguRankings] 第 {page} 页抓取失败: {e}')
-                    break
-
-            if not all_novels:
-                return []
-
-            # 3. 保存到缓存
-            self._db.save_rankings_cache(all_novels)
-
-            # 4. 返回（补充前端字段）
-            for item in all_novels:
-                item['source_name'] = '速读谷排行'
-                item['source_key'] = 'sudugu'
-                item['novel_id'] = item.get('title', '')
-
-            return all_novels
+            if use_cache:
+                novels = self._cache.get(self.CACHE_NAMESPACE, 'all', self._fetch_rankings, SUDUGU_CACHE_TTL)
+            else:
+                novels = self._fetch_rankings()
+                if novels:
+                    self._cache.set(self.CACHE_NAMESPACE, 'all', novels, SUDUGU_CACHE_TTL)
         except Exception as e:
             print(f'[SuduguRankings] 获取排行榜失败: {e}')
             return []
+        if not novels:
+            return []
+        if category != 'all':
+            return [item for item in novels if item.get('category') == category]
+        return list(novels)
+
+
+def _add_to_catalog(cache, novels):
+    """把排行榜/分类中的书名写入书目索引（用于输入联想；novel_id 为书名）"""
+    try:
+        cache.db.catalog_add_many(
+            ('sudugu', item['title'], item['title'], item.get('author', ''), item.get('cover_url', ''))
+            for item in novels if item.get('title')
+        )
+    except Exception as e:
+        print(f'[书目索引] 写入失败: {e}')
 
 
 # 模块级单例
@@ -243,17 +257,18 @@ SUDUGU_CATEGORIES = [
 
 
 class SuduguCategories:
-    """速读谷分类小说抓取器（带按天缓存）
+    """速读谷分类小说抓取器（带缓存）
 
     数据来源：https://www.sudugu.org/{category_key}/
     每个分类页主体为 .item 区块（10 本最新小说，结构同排行榜但无 rank）。
-    反爬策略：按天缓存到本地数据库，每日每个分类只请求一次。
+    反爬策略：缓存到本地数据库，一天内每个分类只请求一次，过期后在后台刷新。
     """
 
     BASE_URL = 'https://www.sudugu.org'
+    CACHE_NAMESPACE = 'sudugu_category'
 
     def __init__(self):
-        self._db = NovelDatabase()
+        self._cache = get_metadata_cache()
 
     def _fetch_html(self, category_key: str) -> str:
         """从 sudugu.org 抓取分类页 HTML"""
@@ -347,59 +362,48 @@ class SuduguCategories:
                 })
         return results
 
+    def _fetch_category_novels(self, category_key: str) -> list[dict] | None:
+        """从网络获取分类小说，没有获取到任何数据时返回 None（不写入缓存）"""
+        html = self._fetch_html(category_key)
+        novels = self._parse_category_novels(html)
+        if not novels:
+            return None
+        # 补充前端字段
+        for item in novels:
+            item['source_name'] = '速读谷分类'
+            item['source_key'] = 'sudugu'
+            item['source'] = 'sudugu'
+            item['novel_id'] = item.get('title', '')
+        _add_to_catalog(self._cache, novels)
+        return novels
+
     def get_category_novels(self, category_key: str, use_cache: bool = True) -> list[dict]:
-        """获取分类小说数据（带按天缓存）
+        """获取分类小说数据（带缓存；网络失败时继续使用已过期的缓存）
 
         Args:
             category_key: 分类 key（如 'xuanhuan'）
-            use_cache: 是否使用缓存（True=优先缓存，每日只请求一次）
+            use_cache: 是否使用缓存（False 时强制从网络获取并更新缓存）
 
         Returns:
             [{title, author, cover_url, category, status, source_url,
               source_name, source_key, novel_id}]
             novel_id 设为 title（点击后用书名搜索）
         """
-        # 1. 优先从缓存读取
-        if use_cache:
-            cached = self._db.get_category_novels_cache(category_key)
-            if cached:
-                for item in cached:
-                    item['source_name'] = '速读谷分类'
-                    item['source_key'] = 'sudugu'
-                    item['source'] = 'sudugu'
-                    item['novel_id'] = item.get('title', '')
-                return cached
-
-        # 2. 缓存不存在，从网络获取
+        def load():
+            return self._fetch_category_novels(category_key)
+
         try:
-            html = self._fetch_html(category_key)
-            novels = self._parse_category_novels(html)
-            if not novels:
-                return []
-
-            # 3. 保存到缓存
-            self._db.save_category_novels_cache(category_key, novels)
-
-            # 4. 返回（补充前端字段）
-            for item in novels:
-                item['source_name'] = '速读谷分类'
-                item['source_key'] = 'sudugu'
-                item['source'] = 'sudugu'
-                item['novel_id'] = item.get('title', '')
-
-            return novels
+            if use_cache:
+                novels = self._cache.get(self.CACHE_NAMESPACE, category_key, load, SUDUGU_CACHE_TTL)
+            else:
+                novels = load()
+                if novels:
+                    self._cache.set(self.CACHE_NAMESPACE, category_key, novels, SUDUGU_CACHE_TTL)
         except Exception as e:
             print(f'[SuduguCategories] 获取分类 {category_key} 失败: {e}')
-            # 尝试返回旧缓存（即使过期）
-            cached = self._db.get_category_novels_cache(category_key)
-            if cached:
-                for item in cached:
-                    item['source_name'] = '速读谷分类'
-                    item['source_key'] = 'sudugu'
-                    item['source'] = 'sudugu'
-                    item['novel_id'] = item.get('title', '')
-                return cached
-            return []
+            cached = self._cache.peek(self.CACHE_NAMESPACE, category_key)
+            novels = cached[0] if cached else None
+        return list(novels) if novels else []
 
 
 _categories = None
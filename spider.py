@@ -19,9 +19,10 @@ from config import (
     REQUEST_DELAY_MIN,
     REQUEST_DELAY_MAX,
     COOKIES,
-    BASE_DIR
+    BASE_DIR,
+    get_font_ocr
 )
-from font_decrypt import FontDecryptor
+from font_decrypt import FontDecryptor, pua_codes
 import urllib3
 from typing import Optional, Dict, List
 from requests.adapters import HTTPAdapter
@@ -514,19 +515,20 @@ class FanqieSpider:
             })
             import os
             font_cache_dir = os.path.join(BASE_DIR, 'font_cache')
-            self.decryptor = FontDecryptor(font_cache_dir)
+            self.decryptor = FontDecryptor(font_cache_dir, use_ocr=get_font_ocr())
             self.current_mapping = {}  # 按小说ID缓存字体映射
             self.login_aid = '1768'  # 默认aid
             self.login_device_id = ''  # 默认device_id
             print("✓ 使用官网爬取模式")
 
     def _request(self, url, method='GET', params=None, data=None, headers=None):
-        """发送HTTP请求，带重试机制和随机延迟"""
+        """发送HTTP请求，带重试机制和随机延迟
+
+        headers 只用于本次请求（由 requests 与会话的请求头合并），
+        不修改共享会话的请求头，多个线程共用同一个 spider 时互不影响。
+        """
         for attempt in range(MAX_RETRIES):
             try:
-                if headers:
-                    self.session.headers.update(headers)
-
                 # 实时读取 Cookie，确保登录后立即生效
                 try:
                     import config as _cfg
@@ -538,6 +540,7 @@ class FanqieSpider:
                     response = self.session.get(
                         url,
                         params=params,
+                        headers=headers,
                         cookies=_cookies,
                         timeout=REQUEST_TIMEOUT
                     )
@@ -545,6 +548,7 @@ class FanqieSpider:
                     response = self.session.post(
                         url,
                         json=data,
+                        headers=headers,
                         cookies=_cookies,
                         timeout=REQUEST_TIMEOUT
                     )
@@ -564,10 +568,12 @@ class FanqieSpider:
                     print(f"等待 {backoff_delay:.1f} 秒后重试...")
                     time.sleep(backoff_delay)
                     if self.ua:
+                        # 重试时换一个 User-Agent（同样只用于本次请求）
+                        headers = dict(headers or {})
                         try:
-                            self.session.headers['User-Agent'] = self.ua.random
+                            headers['User-Agent'] = self.ua.random
                         except Exception:
-                            self.session.headers['User-Agent'] = 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36'
+                            headers['User-Agent'] = 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36'
                 else:
                     raise
 
@@ -961,16 +967,17 @@ class FanqieSpider:
                         'debug_file': debug_file
                     }
             
-            # 生成或获取字体映射（按小说ID缓存）
-            if novel_id not in self.current_mapping:
-                self.current_mapping[novel_id] = self.decryptor.decrypt_from_html(html)
-            
             # 解析正文内容
             content_list = selector.css('.muye-reader-content p::text').getall()
             # 确保所有元素都是字符串
             content_list = [str(c) if c is not None else '' for c in content_list]
             content = '\n\n'.join(content_list)
             
+            # 生成或获取字体映射（映射表按字体内容缓存；启用 OCR 时本章出现映射表中没有的字形才重新获取并识别）
+            mapping = self.current_mapping.get(novel_id)
+            if mapping is None or (self.decryptor.use_ocr and pua_codes(content).difference(mapping)):
+                self.current_mapping[novel_id] = self.decryptor.decrypt_from_html(html, text=content)
+            
             # 检查内容是否为空
             if not content or len(content.strip()) < 50:
                 print(f"章节 {chapter_id} 内容为空或过短")
@@ -0,0 +1,167 @@
+# TXT 章节索引模块
+"""TXT 输出文件的章节偏移索引
+
+每个由 WebUI 写出的 TXT 旁边有一个同名的 .idx.json 索引，记录每章在文件中的位置：
+    {"version": 1, "size": 文件字节数, "chapters": [[顺序, 章节ID, 字节偏移, 字节长度], ...]}
+chapters 按顺序（章节在全书中的位置）排列。
+
+更新下载时 merge_txt() 借助索引把章节放到正确的位置：
+- 新章节都排在已有章节之后：直接追加到文件末尾，不读写已有内容；
+- 有补全的缺失章节：顺序读一遍原文件，在对应位置插入后写到临时文件，再替换原文件。
+文件被外部修改过（大小与索引不符）或没有索引时，退回到追加到末尾。
+"""
+import json
+import os
+import shutil
+
+INDEX_SUFFIX = '.idx.json'
+INDEX_VERSION = 1
+# 重写文件时每次复制的字节数
+COPY_CHUNK_SIZE = 1024 * 1024
+
+
+def chapter_block(title, content):
+    """一章在 TXT 中的文本（与导出格式一致）"""
+    return f"\n{'=' * 30}\n{title}\n{'=' * 30}\n{content}\n"
+
+
+def _encode(text):
+    # 与文本模式写入一致：换行按平台转换（Windows 下为 \r\n），偏移按实际字节计算
+    if os.linesep != '\n':
+        text = text.replace('\n', os.linesep)
+    return text.encode('utf-8')
+
+
+def index_path(path):
+    return path + INDEX_SUFFIX
+
+
+def load_index(path):
+    """读取 path 的章节索引，不存在、损坏或与文件不符时返回 None
+
+    Returns:
+        [[order, chapter_id, offset, length], ...]
+    """
+    try:
+        with open(index_path(path), 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        if data.get('version') != INDEX_VERSION or data.get('size') != os.path.getsize(path):
+            return None
+        return data['chapters']
+    except (OSError, ValueError, KeyError, AttributeError):
+        return None
+
+
+def _save_index(path, entries):
+    tmp = index_path(path) + '.tmp'
+    with open(tmp, 'w', encoding='utf-8') as f:
+        json.dump({'version': INDEX_VERSION, 'size': os.path.getsize(path), 'chapters': entries},
+                  f, ensure_ascii=False, separators=(',', ':'))
+    os.replace(tmp, index_path(path))
+
+
+def _drop_index(path):
+    try:
+        os.remove(index_path(path))
+    except OSError:
+        pass
+
+
+def _write_blocks(f, chapters, entries):
+    """把 [(order, chapter_id, text)] 依次写入 f，并把位置记入 entries"""
+    for order, chapter_id, text in chapters:
+        data = _encode(text)
+        entries.append([order, chapter_id, f.tell(), len(data)])
+        f.write(data)
+
+
+def write_txt(path, header, chapters):
+    """写入整本 TXT 并生成索引
+
+    Args:
+        header: 文件头（书名、作者等）
+        chapters: [(order, chapter_id, text)]，按 order 排序，text 为 chapter_block() 的结果
+    """
+    entries = []
+    with open(path, 'wb') as f:
+        f.write(_encode(header))
+        _write_blocks(f, chapters, entries)
+    _save_index(path, entries)
+
+
+def _copy(src, dst, length):
+    while length > 0:
+        data = src.read(min(length, COPY_CHUNK_SIZE))
+        if not data:
+            break
+        dst.write(data)
+        length -= len(data)
+
+
+def merge_txt(path, header, chapters):
+    """把章节按顺序并入已有的 TXT（文件不存在时新建）
+
+    Args:
+        header: 文件不存在时写入的文件头
+        chapters: [(order, chapter_id, text)]；order 为 None 的章节排在最后（按传入顺序）
+
+    Returns:
+        str: 'write'（新建）、'append'（只追加到末尾）或 'rewrite'（插入后重写了一遍文件）
+    """
+    if not os.path.exists(path):
+        tail = max((c[0] for c in chapters if c[0] is not None), default=-1) + 1
+        write_txt(path, header, _sorted(chapters, tail))
+        return 'write'
+
+    entries = load_index(path)
+    if entries is None:
+        # 没有可用的索引：只能追加到末尾（顺序与传入一致）
+        _drop_index(path)
+        with open(path, 'ab') as f:
+            for _, _, text in chapters:
+                f.write(_encode(text))
+        return 'append'
+
+    existing = {entry[1] for entry in entries}
+    tail = max([entry[0] for entry in entries] + [c[0] for c in chapters if c[0] is not None], default=-1) + 1
+    new = _sorted([c for c in chapters if c[1] not in existing], tail)
+    if not new:
+        return 'append'
+
+    if not entries or new[0][0] > entries[-1][0]:
+        # 全部排在已有章节之后：O(新增) 追加
+        with open(path, 'ab') as f:
+            _write_blocks(f, new, entries)
+        _save_index(path, entries)
+        return 'append'
+
+    # 一次顺序重写：在每个已有章节之前插入顺序更靠前的新章节
+    merged, j, pos = [], 0, 0
+    tmp = path + '.tmp'
+    with open(path, 'rb') as src, open(tmp, 'wb') as dst:
+        for order, chapter_id, offset, length in entries:
+            _copy(src, dst, offset - pos)
+            j_end = j
+            while j_end < len(new) and new[j_end][0] < order:
+                j_end += 1
+            _write_blocks(dst, new[j:j_end], merged)
+            j = j_end
+            merged.append([order, chapter_id, dst.tell(), length])
+            _copy(src, dst, length)
+            pos = offset + length
+        shutil.copyfileobj(src, dst, COPY_CHUNK_SIZE)
+        _write_blocks(dst, new[j:], merged)
+    os.replace(tmp, path)
+    _save_index(path, merged)
+    return 'rewrite'
+
+
+def _sorted(chapters, tail):
+    """按 order 排序；order 为 None 的依次编号为 tail, tail+1, ...（排在最后）"""
+    result = []
+    for order, chapter_id, text in chapters:
+        if order is None:
+            order, tail = tail, tail + 1
+        result.append((order, chapter_id, text))
+    result.sort(key=lambda c: c[0])
+    return result
@@ -7,10 +7,13 @@ FXdownloader WebUI - pywebview 后端桥接模块
 """
 import os
 import sys
+import html
+import functools
 import json
 import time
 import uuid
 import threading
+import multiprocessing
 from typing import Optional
 from concurrent.futures import ThreadPoolExecutor, as_completed
 from http.server import HTTPServer, SimpleHTTPRequestHandler
@@ -21,18 +24,62 @@ if PROJECT_ROOT not in sys.path:
     sys.path.insert(0, PROJECT_ROOT)
 
 import webview  # noqa: E402
-from sources import get_source, list_sources, NovelInfo, ChapterInfo  # noqa: E402
+from sources import (  # noqa: E402
+    get_shared_source, drop_shared_sources, list_sources, NovelInfo, ChapterInfo, ChapterList, ChapterParsePool,
+)
 from sources.bing_search import search_via_bing  # noqa: E402
 from sources.multi_source import (
     search_all_sources,
     find_novel_in_all_sources,
+    record_verified_source,
     get_all_rankings,
     get_all_categories,
     get_category_novels,
+    suggest_from_catalog,
     SOURCE_DISPLAY_NAMES,
 )  # noqa: E402
-from database import NovelDatabase  # noqa: E402
+from database import (  # noqa: E402
+    NovelDatabase, get_metadata_cache, cover_cache_key, start_compression_migration,
+    COVER_CACHE_NAMESPACE, COVER_CACHE_TTL, SNIPPET_OPEN, SNIPPET_CLOSE,
+)
 import config as app_config  # noqa: E402
+from epub_writer import EpubWriter  # noqa: E402
+from txt_index import chapter_block, merge_txt, write_txt  # noqa: E402
+
+
+class _EpubOutput:
+    """下载过程中的 EPUB 输出：每章下载完成即写入 EpubWriter
+
+    写入后丢弃 results 中该章的正文（只留标题），整本书不会留在内存里。
+    """
+
+    def __init__(self, writer, chapter_list, chapter_ids, append_mode):
+        self.writer = writer
+        self._chapter_list = chapter_list
+        # 章节在全书中的位置优先取章节列表中的下标；获取章节列表失败时，
+        # 新文件按本次下载的顺序，追加时排在已有章节之后
+        if len(chapter_list) or append_mode:
+            self._fallback = {}
+        else:
+            self._fallback = {cid: i for i, cid in enumerate(chapter_ids)}
+
+    def add(self, cid, data):
+        if not data or data.get('written') or not data.get('content'):
+            return
+        order = self._chapter_list.index_of(cid)
+        if order is None:
+            order = self._fallback.get(cid)
+        title = data.get('title') or self._chapter_list.title_of(cid)
+        self.writer.add_chapter(title, data['content'], order=order)
+        data['content'] = ''
+        data['written'] = True
+
+    def add_all(self, results):
+        for cid, data in list(results.items()):
+            self.add(cid, data)
+
+    def close(self):
+        self.writer.close()
 
 
 class Api:
@@ -43,27 +90,33 @@ class Api:
         self._cancel_event = threading.Event()
         self._pause_event = threading.Event()  # 暂停事件（set=暂停中）
         self._download_thread = None
-        self._source_cache = {}  # 缓存源实例 {source_key: source_instance}
+        self._source_cache = {}  # 前端 source_key → 共享的源实例（见 sources.get_shared_source）
         self._db = NovelDatabase()
+        self._metadata = get_metadata_cache(self._db)  # 封面等元数据缓存（kv_cache + LRU）
         self._current_task_id = None  # 当前下载任务 ID
         self._download_start_time = None  # 下载开始时间（ETA计算）
         self._download_done_count = 0  # 已完成章节数
         self._tts_cancel_event = threading.Event()  # TTS 生成取消事件
+        self._search_lock = threading.Lock()
+        self._search_generation = 0  # 流式搜索的编号（新搜索开始时加 1）
+        self._search_cancel_event = threading.Event()  # 当前流式搜索的取消事件
+        self._parse_pool = None  # 章节解析进程池（按需创建）
+        self._parse_pool_lock = threading.Lock()
 
     # ============== 源管理 ==============
 
     def _get_source(self, source_key='biquge'):
-        """根据前端 source_key 获取对应的源实例（带缓存）"""
+        """根据前端 source_key 获取对应的源实例（进程内共享，与多源搜索共用）"""
         if source_key in self._source_cache:
             return self._source_cache[source_key]
 
         if source_key == 'fanqie_api':
-            source = get_source('fanqie', use_api=True)
+            source = get_shared_source('fanqie', use_api=True)
         elif source_key == 'fanqie_official':
             cookies = app_config.load_cookies()
-            source = get_source('fanqie', use_api=False, cookies=cookies)
+            source = get_shared_source('fanqie', use_api=False, cookies=cookies)
         elif source_key in ('biquge', 'sto66', 'dingdian', 'bxwx', 'qianbi', 'haitang'):
-            source = get_source(source_key)
+            source = get_shared_source(source_key)
         else:
             return None
 
@@ -111,6 +164,67 @@ class Api:
             print(f'[WebUI] 搜索失败: {e}')
             return {'error': str(e)}
 
+    def search_stream(self, keyword, source_key='biquge', search_id=None):
+        """流式多源搜索（后台线程执行），立即返回本次搜索的编号
+
+        每个源返回后通过 onSearchResults 推送当前已排序的全部结果，最后推送 done=True 的事件。
+        开始新的搜索时取消上一次尚未结束的搜索，被取消的搜索不再推送。
+
+        Args:
+            keyword: 搜索关键词或URL
+            source_key: 保留参数（多源搜索时忽略）
+            search_id: 前端生成的搜索编号（推送事件中原样带回；结果命中缓存时可能早于本方法返回就推送）
+
+        Returns:
+            dict: {search_id}
+        """
+        with self._search_lock:
+            self._search_cancel_event.set()
+            self._search_generation += 1
+            if search_id is None:
+                search_id = self._search_generation
+            cancel_event = self._search_cancel_event = threading.Event()
+        threading.Thread(
+            target=self._search_worker, args=(search_id, keyword, cancel_event), daemon=True
+        ).start()
+        return {'search_id': search_id}
+
+    def cancel_search(self):
+        """取消正在进行的流式搜索"""
+        with self._search_lock:
+            self._search_cancel_event.set()
+        return {'success': True}
+
+    def suggest(self, keyword, limit=10):
+        """输入联想：从本地书目索引查找见过的书（书名/作者片段或拼音首字母，不访问网络）
+
+        Returns:
+            [{title, author, cover_url, sources, resolved}]，resolved 为可直接打开的源或 None
+        """
+        try:
+            return suggest_from_catalog(keyword, limit)
+        except Exception as e:
+            print(f'[WebUI] 输入联想失败: {e}')
+            return []
+
+    def _search_worker(self, search_id, keyword, cancel_event):
+        def on_update(source_key, results):
+            self._push_search_results(search_id, results, source_key=source_key)
+
+        try:
+            url_guess = self._try_parse_url(keyword)
+            if url_guess:
+                results = [url_guess]
+            else:
+                results = search_all_sources(keyword, include_fanqie=True, on_update=on_update,
+                                             cancel_event=cancel_event)
+            if not cancel_event.is_set():
+                self._push_search_results(search_id, results, done=True)
+        except Exception as e:
+            print(f'[WebUI] 搜索失败: {e}')
+            if not cancel_event.is_set():
+                self._push_search_results(search_id, [], done=True, error=str(e))
+
     def _try_parse_url(self, url_or_id: str) -> Optional[dict]:
         """尝试用各源解析 URL，成功则返回小说信息字典
 
@@ -136,10 +250,7 @@ class Api:
                         d['source_name'] = SOURCE_DISPLAY_NAMES.get(sk, sk)
                         # 缓存封面
                         if d.get('cover_url'):
-                            try:
-                                self._db.set_cover(str(novel_id), sk, d['cover_url'], d.get('title'))
-                            except Exception:
-                                pass
+                            self._cache_cover(novel_id, sk, d['cover_url'])
                         return d
             except Exception:
                 continue
@@ -174,11 +285,7 @@ class Api:
             result = self._novel_info_to_dict(info)
             # 缓存封面到数据库，避免下次重复获取
             if result.get('cover_url'):
-                try:
-                    sk = result.get('source_key') or source_key
-                    self._db.set_cover(str(novel_id), sk, result['cover_url'], result.get('title'))
-                except Exception:
-                    pass
+                self._cache_cover(novel_id, result.get('source_key') or source_key, result['cover_url'])
             return result
 
         except Exception as e:
@@ -242,6 +349,7 @@ class Api:
 
     def _download_worker(self, novel_id, chapter_ids, save_dir, source_key, append_mode=False):
         """后台下载工作线程：多源并发 + 同源重试 + 跨源重试 + 暂停/续传 + ETA"""
+        epub = None
         try:
             source = self._get_source(source_key)
             if not source:
@@ -259,7 +367,7 @@ class Api:
 
             novel_title = novel_info.title if novel_info else novel_id
             total = len(chapter_ids)
-            output_file = os.path.join(save_dir, f'{novel_title}.txt')
+            output_file = os.path.join(save_dir, f'{novel_title}.{app_config.get_output_format()}')
 
             # 创建任务记录（支持暂停/续传）
             task_id = str(uuid.uuid4())
@@ -276,23 +384,25 @@ class Api:
             )
 
             # 建立章节ID到标题的映射（用于多源重试时按标题匹配）
-            chapter_id_to_title = {}
+            chapter_list = ChapterList()
             try:
-                all_chapters = source.get_chapter_list(novel_id)
-                for ch in all_chapters:
-                    chapter_id_to_title[str(ch.chapter_id)] = ch.chapter_title
+                chapter_list = ChapterList.of(source.get_chapter_list(novel_id))
             except Exception:
                 pass
 
             self._push_log(f'开始下载 {total} 个章节（源: {SOURCE_DISPLAY_NAMES.get(source_key, source_key)}）...', 'info')
 
+            # EPUB 边下载边写入；TXT 在下载结束后按章节顺序统一写入
+            epub = self._open_epub_output(output_file, novel_info, novel_title, chapter_list,
+                                          chapter_ids, append_mode)
+
             # 存储下载结果: {chapter_id: {'title': str, 'content': str}}
             results = {}
             failed_ids = []  # 失败的章节ID
             completed_ids = []  # 已完成的章节ID
 
             # ====== 第一轮：主源并发下载 ======
-            max_workers = min(app_config.get_concurrent_downloads(), 4)
+            max_workers = self._download_thread_count()
             lock = threading.Lock()
 
             with ThreadPoolExecutor(max_workers=max_workers) as executor:
@@ -321,6 +431,8 @@ class Api:
                         if data and data.get('content'):
                             results[cid] = data
                             completed_ids.append(cid)
+                            if epub:
+                                epub.add(cid, data)
                         else:
                             failed_ids.append(cid)
                     except Exception as e:
@@ -342,10 +454,7 @@ class Api:
 
             if self._cancel_event.is_set():
                 self._push_log('下载已被用户取消', 'warning')
-                if append_mode:
-                    self._append_output(output_file, novel_info, results)
-                else:
-                    self._write_output(output_file, novel_info, chapter_ids, results)
+                self._finish_output(output_file, novel_info, chapter_ids, results, append_mode, epub, chapter_list)
                 try:
                     self._db.set_task_status(task_id, 'cancelled')
                 except Exception:
@@ -363,7 +472,7 @@ class Api:
             if failed_ids:
                 self._push_log(f'检测到 {len(failed_ids)} 个失败章节，尝试用其他源重新下载...', 'warning')
                 retry_ok = self._retry_failed_chapters(
-                    failed_ids, chapter_id_to_title, novel_info,
+                    failed_ids, chapter_list, novel_info,
                     source_key, results, lock
                 )
                 if retry_ok > 0:
@@ -374,17 +483,14 @@ class Api:
             if missing:
                 self._push_log(f'仍有 {len(missing)} 个章节缺失，再次尝试...', 'warning')
                 retry_ok = self._retry_failed_chapters(
-                    missing, chapter_id_to_title, novel_info,
+                    missing, chapter_list, novel_info,
                     source_key, results, lock
                 )
                 if retry_ok > 0:
                     self._push_log(f'补缺成功 {retry_ok} 章', 'success')
 
             # 写入文件（append_mode 下追加到已有文件，用于补全缺失内容）
-            if append_mode:
-                self._append_output(output_file, novel_info, results)
-            else:
-                self._write_output(output_file, novel_info, chapter_ids, results)
+            self._finish_output(output_file, novel_info, chapter_ids, results, append_mode, epub, chapter_list)
 
             success_count = len(results)
             failed_count = total - success_count
@@ -409,7 +515,7 @@ class Api:
                     'warning'
                 )
                 # 指出彻底失败的章节并通知前端自动选中
-                self._push_failed_chapters(novel_id, chapter_ids, results, chapter_id_to_title)
+                self._push_failed_chapters(novel_id, chapter_ids, results, chapter_list)
             else:
                 self._push_log(f'下载完成! 成功 {success_count}/{total} 章 -> {output_file}', 'success')
 
@@ -418,6 +524,42 @@ class Api:
         except Exception as e:
             self._push_error(f'下载过程中出现严重错误: {e}')
             self._current_task_id = None
+        finally:
+            if epub:
+                # 出错时也写出目录，已下载的章节仍可阅读
+                epub.close()
+
+    def _get_parse_pool(self):
+        """获取章节解析进程池（设置中未开启时返回 None）"""
+        if not app_config.get_parse_in_processes():
+            return None
+        with self._parse_pool_lock:
+            if self._parse_pool is None:
+                self._parse_pool = ChapterParsePool()
+            return self._parse_pool
+
+    def _download_thread_count(self):
+        """下载线程数
+
+        线程内同时做抓取和解析时，超过 4 个线程会互相争抢 GIL，因此封顶 4；
+        开启进程池解析后线程只负责网络 IO，直接使用用户设置的并发数。
+        """
+        concurrent = app_config.get_concurrent_downloads()
+        if app_config.get_parse_in_processes():
+            return concurrent
+        return min(concurrent, 4)
+
+    def _fetch_chapter(self, source, novel_id, chapter_id):
+        """获取单章内容
+
+        开启进程池解析且源支持抓取/解析分离时，本线程只抓取原始字节，
+        解析交给子进程；否则直接调用源的 get_chapter_content。
+        """
+        pool = self._get_parse_pool() if getattr(source, 'supports_raw_fetch', False) else None
+        if pool is None:
+            return source.get_chapter_content(novel_id, str(chapter_id))
+        body = source.fetch_chapter_raw(novel_id, str(chapter_id))
+        return pool.parse(source.name, body)
 
     def _download_one(self, source, novel_id, chapter_id, lock):
         """下载单个章节（同源重试 + 暂停/取消检测）
@@ -435,7 +577,7 @@ class Api:
                 return None
 
             try:
-                data = source.get_chapter_content(novel_id, str(chapter_id))
+                data = self._fetch_chapter(source, novel_id, chapter_id)
                 if data and data.get('content'):
                     if lock:
                         with lock:
@@ -474,7 +616,7 @@ class Api:
                 self._push_log(f'章节 {chapter_id} 同源重试 {max_retries} 次仍失败{err_msg}', 'error')
         return None
 
-    def _retry_failed_chapters(self, failed_ids, chapter_id_to_title, novel_info,
+    def _retry_failed_chapters(self, failed_ids, chapter_list, novel_info,
                                 primary_source_key, results, lock):
         """用其他源重试失败章节（按章节标题在不同源间匹配）
 
@@ -500,20 +642,16 @@ class Api:
 
         self._push_log(f'在其他源找到本书: {", ".join(other_sources.keys())}', 'info')
 
-        # 对每个备用源，获取章节列表并建立 {标题: chapter_id} 映射
-        fallback_sources = []  # [(src_key, instance, novel_id, {title: chapter_id})]
+        # 对每个备用源，获取章节列表（ChapterList 支持按标题 O(1) 查找 chapter_id）
+        fallback_sources = []  # [(src_key, instance, novel_id, ChapterList)]
         for src_key, src_novel_id in other_sources.items():
             try:
                 src_instance = self._get_source(src_key)
                 if not src_instance:
                     continue
                 # 获取备用源的章节列表
-                src_chapters = src_instance.get_chapter_list(src_novel_id)
-                title_to_cid = {}
-                for ch in src_chapters:
-                    # 用标题作为匹配键
-                    title_to_cid[ch.chapter_title] = str(ch.chapter_id)
-                fallback_sources.append((src_key, src_instance, src_novel_id, title_to_cid))
+                src_chapters = ChapterList.of(src_instance.get_chapter_list(src_novel_id))
+                fallback_sources.append((src_key, src_instance, src_novel_id, src_chapters))
                 self._push_log(f'  {src_key}: {len(src_chapters)} 章可匹配', 'info')
             except Exception as e:
                 self._push_log(f'  {src_key} 获取章节列表失败: {e}', 'warning')
@@ -523,6 +661,7 @@ class Api:
             return 0
 
         success_count = 0
+        verified = {}  # 下载到了章节的备用源 {src_key: novel_id}
         remaining = [cid for cid in failed_ids if cid not in results]
 
         for cid in remaining:
@@ -530,30 +669,26 @@ class Api:
                 break
 
             # 获取主源中该章节的标题
-            ch_title = chapter_id_to_title.get(cid, '')
+            ch_title = chapter_list.title_of(cid)
             if not ch_title:
                 # 没有标题无法匹配，跳过
                 continue
 
             # 在备用源中按标题查找
             downloaded = False
-            for src_key, src_instance, src_novel_id, title_to_cid in fallback_sources:
-                src_chapter_id = title_to_cid.get(ch_title)
-                if not src_chapter_id:
-                    # 尝试模糊匹配（去掉空格后比较）
-                    for t, cid2 in title_to_cid.items():
-                        if t.replace(' ', '') == ch_title.replace(' ', ''):
-                            src_chapter_id = cid2
-                            break
+            for src_key, src_instance, src_novel_id, src_chapters in fallback_sources:
+                # 按标题匹配（忽略空格）
+                src_chapter_id = src_chapters.find_by_title(ch_title)
                 if not src_chapter_id:
                     continue
 
                 try:
-                    data = src_instance.get_chapter_content(src_novel_id, src_chapter_id)
+                    data = self._fetch_chapter(src_instance, src_novel_id, src_chapter_id)
                     if data and data.get('content'):
                         results[cid] = data
                         success_count += 1
                         downloaded = True
+                        verified[src_key] = src_novel_id
                         with lock:
                             self._push_log(f'重试成功（{src_key}）: {data.get("title", ch_title)}', 'success')
                         break
@@ -564,6 +699,10 @@ class Api:
                 with lock:
                     self._push_log(f'重试失败: {ch_title}', 'error')
 
+        # 记入跨源书籍对应表，下次换源不必再搜索
+        for src_key, src_novel_id in verified.items():
+            record_verified_source(title, author, src_key, src_novel_id)
+
         return success_count
 
     @staticmethod
@@ -583,81 +722,90 @@ class Api:
         cleaned = [line for line in cleaned if line]
         return '\n'.join(cleaned)
 
-    def _write_output(self, output_file, novel_info, chapter_ids, results):
-        """按章节顺序写入输出文件
+    def _open_epub_output(self, output_file, novel_info, novel_title, chapter_list, chapter_ids, append_mode):
+        """输出文件是 EPUB 时打开流式写入器（append_mode 下接在已有 EPUB 之后），否则返回 None"""
+        if not output_file.lower().endswith('.epub'):
+            return None
+        writer = EpubWriter(
+            output_file, novel_title,
+            author=novel_info.author if novel_info else '',
+            description=novel_info.description if novel_info else '',
+            append=append_mode,
+        )
+        return _EpubOutput(writer, chapter_list, chapter_ids, append_mode)
+
+    def _finish_output(self, output_file, novel_info, chapter_ids, results, append_mode, epub=None,
+                       chapter_list=None):
+        """下载结束后写出文件：EPUB 补写重试得到的章节，TXT 一次性写入
+
+        EPUB 写入器只由打开它的工作线程在 finally 中关闭（生成目录并替换目标文件）。
+        """
+        if epub:
+            epub.add_all(results)
+        elif append_mode:
+            self._append_output(output_file, novel_info, results, chapter_list)
+        else:
+            self._write_output(output_file, novel_info, chapter_ids, results, chapter_list)
+
+    def _txt_cleaner(self):
+        """根据配置 remove_empty_lines 返回正文清理函数（默认不去除空行）"""
+        if not app_config.get_remove_empty_lines():
+            return lambda text: text
+        return self._clean_empty_lines
+
+    @staticmethod
+    def _txt_header(novel_info, clean, with_word_count=True):
+        if not novel_info:
+            return ''
+        lines = [f"{'=' * 50}", f"书名: {novel_info.title}"]
+        if novel_info.author:
+            lines.append(f"作者: {novel_info.author}")
+        if novel_info.description:
+            lines.append(f"简介: {clean(novel_info.description)}")
+        if with_word_count and novel_info.word_count:
+            lines.append(f"字数: {novel_info.word_count:,} 字")
+        lines.append(f"{'=' * 50}")
+        return '\n'.join(lines) + '\n'
+
+    def _write_output(self, output_file, novel_info, chapter_ids, results, chapter_list=None):
+        """按章节顺序写入输出文件，并在旁边生成章节偏移索引（.idx.json，供更新时按顺序插入）
 
         根据配置 remove_empty_lines 决定是否去除空行（默认不去除）。
         """
-        remove_empty = app_config.get_remove_empty_lines()
-
-        def _clean(text):
-            """根据配置清理空行"""
-            if not remove_empty:
-                return text
-            return self._clean_empty_lines(text)
-
-        with open(output_file, 'w', encoding='utf-8') as f:
-            if novel_info:
-                f.write(f"{'=' * 50}\n")
-                f.write(f"书名: {novel_info.title}\n")
-                if novel_info.author:
-                    f.write(f"作者: {novel_info.author}\n")
-                if novel_info.description:
-                    f.write(f"简介: {_clean(novel_info.description)}\n")
-                if novel_info.word_count:
-                    f.write(f"字数: {novel_info.word_count:,} 字\n")
-                f.write(f"{'=' * 50}\n")
-
-            for i, cid in enumerate(chapter_ids, 1):
-                data = results.get(cid)
-                if not data:
-                    continue
-                title = data.get('title', f'第{i}章')
-                content = _clean(data.get('content', ''))
-                if not content:
-                    continue
-                f.write(f"\n{'=' * 30}\n")
-                f.write(f"{title}\n")
-                f.write(f"{'=' * 30}\n")
-                f.write(content)
-                f.write("\n")
+        clean = self._txt_cleaner()
+        chapters = []
+        for i, cid in enumerate(chapter_ids, 1):
+            data = results.get(cid)
+            if not data:
+                continue
+            title = data.get('title', f'第{i}章')
+            content = clean(data.get('content', ''))
+            if not content:
+                continue
+            order = chapter_list.index_of(cid) if chapter_list else None
+            chapters.append((i - 1 if order is None else order, str(cid), chapter_block(title, content)))
+        chapters.sort(key=lambda c: c[0])
+        write_txt(output_file, self._txt_header(novel_info, clean), chapters)
 
-    def _append_output(self, output_file, novel_info, results):
-        """追加章节到已有文件（用于续传）
+    def _append_output(self, output_file, novel_info, results, chapter_list=None):
+        """把章节并入已有文件（用于续传和下载新章节）
 
-        只写入新下载的章节，不重写已有内容。
+        有章节索引时，补全的缺失章节插入到它在全书中的位置，新章节追加到末尾；
+        纯追加时不重写已有内容。章节不在 chapter_list 中时按 results 的顺序放在最后。
         """
-        remove_empty = app_config.get_remove_empty_lines()
-
-        def _clean(text):
-            if not remove_empty:
-                return text
-            return self._clean_empty_lines(text)
-
-        # 如果文件不存在，创建并写入头部
-        mode = 'a' if os.path.exists(output_file) else 'w'
-        with open(output_file, mode, encoding='utf-8') as f:
-            if mode == 'w' and novel_info:
-                f.write(f"{'=' * 50}\n")
-                f.write(f"书名: {novel_info.title}\n")
-                if novel_info.author:
-                    f.write(f"作者: {novel_info.author}\n")
-                if novel_info.description:
-                    f.write(f"简介: {_clean(novel_info.description)}\n")
-                f.write(f"{'=' * 50}\n")
-
-            for cid, data in results.items():
-                if not data:
-                    continue
-                title = data.get('title', '')
-                content = _clean(data.get('content', ''))
-                if not content:
-                    continue
-                f.write(f"\n{'=' * 30}\n")
-                f.write(f"{title}\n")
-                f.write(f"{'=' * 30}\n")
-                f.write(content)
-                f.write("\n")
+        clean = self._txt_cleaner()
+        chapters = []
+        for cid, data in results.items():
+            if not data:
+                continue
+            content = clean(data.get('content', ''))
+            if not content:
+                continue
+            order = chapter_list.index_of(cid) if chapter_list else None
+            chapters.append((order, str(cid), chapter_block(data.get('title', ''), content)))
+        mode = merge_txt(output_file, self._txt_header(novel_info, clean, with_word_count=False), chapters)
+        if mode == 'rewrite':
+            self._push_log('已将补全的章节插入到原来的位置', 'info')
 
     def cancel_download(self):
         """取消当前下载"""
@@ -759,6 +907,7 @@ class Api:
 
     def _resume_worker(self, task, remaining_ids):
         """续传任务工作线程"""
+        epub = None
         try:
             source = self._get_source(task['source_key'])
             if not source:
@@ -785,18 +934,18 @@ class Api:
                 pass
 
             # 章节ID到标题映射
-            chapter_id_to_title = {}
+            chapter_list = ChapterList()
             try:
-                all_chapters = source.get_chapter_list(novel_id)
-                for ch in all_chapters:
-                    chapter_id_to_title[str(ch.chapter_id)] = ch.chapter_title
+                chapter_list = ChapterList.of(source.get_chapter_list(novel_id))
             except Exception:
                 pass
 
-            # 下载剩余章节
+            # 下载剩余章节（沿用任务记录的输出文件，EPUB 接在已有内容之后）
+            epub = self._open_epub_output(output_file, novel_info, novel_title, chapter_list,
+                                          all_chapter_ids, append_mode=True)
             results = {}
             failed_ids = []
-            max_workers = min(app_config.get_concurrent_downloads(), 4)
+            max_workers = self._download_thread_count()
             lock = threading.Lock()
 
             with ThreadPoolExecutor(max_workers=max_workers) as executor:
@@ -822,6 +971,8 @@ class Api:
                         if data and data.get('content'):
                             results[cid] = data
                             completed_ids.append(cid)
+                            if epub:
+                                epub.add(cid, data)
                         else:
                             failed_ids.append(cid)
                     except Exception as e:
@@ -844,15 +995,15 @@ class Api:
             if failed_ids and not self._cancel_event.is_set():
                 self._push_log(f'检测到 {len(failed_ids)} 个失败章节，尝试用其他源...', 'warning')
                 retry_ok = self._retry_failed_chapters(
-                    failed_ids, chapter_id_to_title, novel_info,
+                    failed_ids, chapter_list, novel_info,
                     task['source_key'], results, lock
                 )
                 if retry_ok > 0:
                     self._push_log(f'重试成功 {retry_ok} 章', 'success')
 
             # 只写入新下载的章节（追加模式，不重新下载已完成的章节）
-            if results:
-                self._append_output(output_file, novel_info, results)
+            if epub or results:
+                self._finish_output(output_file, novel_info, all_chapter_ids, results, True, epub, chapter_list)
 
             success_count = len(completed_ids) + len(results)
             self._push_log(f'续传完成! 共 {success_count}/{total} 章 -> {output_file}', 'success')
@@ -869,6 +1020,9 @@ class Api:
         except Exception as e:
             self._push_error(f'续传失败: {e}')
             self._current_task_id = None
+        finally:
+            if epub:
+                epub.close()
 
     def delete_task(self, task_id):
         """删除任务"""
@@ -887,6 +1041,9 @@ class Api:
             return {
                 'concurrent_downloads': config.get('concurrent_downloads', 3),
                 'remove_empty_lines': config.get('remove_empty_lines', False),
+                'parse_in_processes': config.get('parse_in_processes', False),
+                'chapter_compression': app_config.get_chapter_compression(),
+                'output_format': app_config.get_output_format(),
             }
         except Exception as e:
             return {'error': str(e)}
@@ -906,9 +1063,18 @@ class Api:
                 current['concurrent_downloads'] = int(config['concurrent_downloads'])
             if 'remove_empty_lines' in config:
                 current['remove_empty_lines'] = bool(config['remove_empty_lines'])
+            if 'parse_in_processes' in config:
+                current['parse_in_processes'] = bool(config['parse_in_processes'])
+            if config.get('chapter_compression') in app_config.CHAPTER_COMPRESSION_CHOICES:
+                current['chapter_compression'] = config['chapter_compression']
+            if config.get('output_format') in app_config.OUTPUT_FORMAT_CHOICES:
+                current['output_format'] = config['output_format']
 
             result = app_config.save_config(current)
             if result:
+                # 新章节立即按新方式写入，已有章节在后台压缩
+                self._db.set_chapter_compression(current.get('chapter_compression', 'none'))
+                start_compression_migration(self._db)
                 return {'status': 'ok'}
             else:
                 return {'error': '保存配置失败'}
@@ -931,6 +1097,7 @@ class Api:
                     if success:
                         # 登录成功后刷新源缓存
                         self._source_cache.pop('fanqie_official', None)
+                        drop_shared_sources('fanqie')
                         self._push_log('番茄官网登录成功', 'success')
                 except Exception as e:
                     result['error'] = str(e)
@@ -1052,6 +1219,41 @@ class Api:
         except Exception:
             pass
 
+    def _push_export_progress(self, novel_id, done, total, finished=False, path=None, error=None):
+        """向前端推送本地导出进度"""
+        if not self._window:
+            return
+        try:
+            data = json.dumps({
+                'novel_id': novel_id,
+                'done': done,
+                'total': total,
+                'percent': round(done / total * 100, 1) if total else 0,
+                'finished': finished,
+                'path': path,
+                'error': error,
+            })
+            self._window.evaluate_js(f'onExportProgress({data})')
+        except Exception:
+            pass
+
+    def _push_search_results(self, search_id, results, source_key=None, done=False, error=None):
+        """向前端推送流式搜索结果（results 为当前已排序的全部结果）"""
+        if not self._window:
+            return
+        try:
+            data = json.dumps({
+                'search_id': search_id,
+                'source': source_key,
+                'source_name': SOURCE_DISPLAY_NAMES.get(source_key, source_key) if source_key else '',
+                'results': results,
+                'done': done,
+                'error': error,
+            })
+            self._window.evaluate_js(f'onSearchResults({data})')
+        except Exception:
+            pass
+
     def _push_log(self, message, level='info'):
         """向前端推送日志"""
         if not self._window:
@@ -1069,7 +1271,7 @@ class Api:
         """向前端推送错误日志"""
         self._push_log(message, 'error')
 
-    def _push_failed_chapters(self, novel_id, chapter_ids, results, chapter_id_to_title):
+    def _push_failed_chapters(self, novel_id, chapter_ids, results, chapter_list):
         """收集彻底失败的章节并通知前端自动选中
 
         在所有重试（同源 + 跨源）结束后调用，将仍未成功下载的章节
@@ -1080,11 +1282,12 @@ class Api:
             return
         failed = []
         for cid in chapter_ids:
-            if cid in results and results[cid].get('content'):
+            # results 中只有下载到正文的章节（EPUB 写入后正文已丢弃）
+            if cid in results:
                 continue
             failed.append({
                 'chapter_id': str(cid),
-                'chapter_title': chapter_id_to_title.get(cid, '') or str(cid),
+                'chapter_title': chapter_list.title_of(cid) or str(cid),
             })
         if not failed:
             return
@@ -1141,9 +1344,9 @@ class Api:
             cover_url = novel.get('cover_url', '')
             # 若未带封面，从本地缓存补全
             if not cover_url and novel_id:
-                cached = self._db.get_cover(str(novel_id), source_key)
+                cached = self._metadata.peek(COVER_CACHE_NAMESPACE, cover_cache_key(source_key, novel_id))
                 if cached:
-                    cover_url = cached
+                    cover_url = cached[0]
             self._db.add_favorite(
                 novel_id=novel_id,
                 title=novel.get('title', ''),
@@ -1291,12 +1494,102 @@ class Api:
         except Exception as e:
             return {'error': str(e)}
 
+    # ============== 本地书库 ==============
+
+    def search_library(self, keyword, limit=50):
+        """在已下载到本地数据库的章节正文中搜索
+
+        Returns:
+            [{novel_id, novel_title, chapter_id, chapter_title, chapter_index, snippet}]，
+            snippet 为 HTML（已转义，命中文字用 <mark> 标出）
+        """
+        try:
+            keyword = (keyword or '').strip()
+            if not keyword:
+                return []
+            results = self._db.search_chapters(keyword, limit=max(1, min(200, int(limit))))
+            for r in results:
+                r['novel_title'] = r.get('novel_title') or ''
+                r['snippet'] = (html.escape(r.get('snippet') or '')
+                                .replace(SNIPPET_OPEN, '<mark>')
+                                .replace(SNIPPET_CLOSE, '</mark>'))
+            return results
+        except Exception as e:
+            return {'error': str(e)}
+
+    def get_local_chapters(self, novel_id):
+        """获取本地数据库中某本小说的章节目录（用于从搜索结果跳转阅读）"""
+        try:
+            novel = self._db.get_novel(str(novel_id))
+            chapters = [
+                {
+                    'chapter_id': row['chapter_id'],
+                    'chapter_title': row['chapter_title'] or row['original_title'] or f"第{row['chapter_index']}章",
+                    'chapter_index': row['chapter_index'],
+                }
+                for row in self._db.get_chapter_titles(str(novel_id))
+            ]
+            return {
+                'novel_id': str(novel_id),
+                'title': novel['title'] if novel else '',
+                'chapters': chapters,
+            }
+        except Exception as e:
+            return {'error': str(e)}
+
+    def export_local_novel(self, novel_id, save_dir=None):
+        """把本地数据库中的小说按设置的格式导出为 TXT 或 EPUB（后台线程执行）
+
+        进度通过 onExportProgress({novel_id, done, total, percent}) 推送，
+        结束时额外带上 finished 和 path 或 error。
+        """
+        try:
+            novel_id = str(novel_id)
+            if not self._db.get_novel(novel_id):
+                return {'error': '本地没有该小说'}
+            save_dir = save_dir or app_config.get_last_export_path() or app_config.DOWNLOAD_DIR
+            if not os.path.isdir(save_dir):
+                save_dir = app_config.DOWNLOAD_DIR
+            os.makedirs(save_dir, exist_ok=True)
+
+            def progress(done, total):
+                self._push_export_progress(novel_id, done, total)
+
+            def run():
+                from downloader import NovelDownloader
+                novel = self._db.get_novel(novel_id)
+                output_path = os.path.join(save_dir, f"{novel['title']}.{app_config.get_output_format()}")
+                ok = NovelDownloader().export(novel_id, output_path, progress_callback=progress)
+                if ok:
+                    self._push_export_progress(novel_id, 1, 1, finished=True, path=output_path)
+                else:
+                    self._push_export_progress(novel_id, 0, 0, finished=True, error='导出失败')
+
+            threading.Thread(target=run, daemon=True).start()
+            return {'status': 'ok'}
+        except Exception as e:
+            return {'error': str(e)}
+
+    def read_local_chapter(self, novel_id, chapter_id):
+        """从本地数据库读取章节内容（不访问网络）"""
+        try:
+            chapter = self._db.get_chapter(str(chapter_id))
+            if not chapter or chapter['novel_id'] != str(novel_id):
+                return {'error': '本地没有该章节'}
+            return {
+                'title': chapter['chapter_title'] or chapter.get('original_title') or '',
+                'content': chapter['content'] or '',
+                'chapter_id': str(chapter_id),
+            }
+        except Exception as e:
+            return {'error': str(e)}
+
     # ============== 排行榜 ==============
 
     def get_rankings(self, category='all', page=1):
-        """获取排行榜数据（来源：速读谷，按天缓存，封面已包含）
+        """获取排行榜数据（来源：速读谷，带缓存，封面已包含）
 
-        排行榜数据每日从 sudugu.org 获取一次后缓存到本地，
+        排行榜数据从 sudugu.org 获取后缓存到本地，过期后先返回旧数据再在后台刷新，
         封面 URL 已包含在缓存中，无需额外 prefetch。
         """
         try:
@@ -1304,11 +1597,27 @@ class Api:
         except Exception as e:
             return {'error': str(e)}
 
+    def _cache_cover(self, novel_id, source_key, cover_url):
+        """缓存封面 URL（失败不影响调用方）"""
+        try:
+            self._metadata.set(COVER_CACHE_NAMESPACE, cover_cache_key(source_key, novel_id),
+                               cover_url, COVER_CACHE_TTL)
+        except Exception as e:
+            print(f'[WebUI] 缓存封面失败 {novel_id}: {e}')
+
+    def _fetch_cover(self, novel_id, source_key):
+        """从源获取封面 URL，获取不到返回 None"""
+        source = self._get_source(source_key)
+        if not source:
+            return None
+        info = source.get_novel_info(novel_id)
+        return info.cover_url if info and info.cover_url else None
+
     def prefetch_covers(self, novels_json, source_key='biquge'):
         """批量预获取小说封面并缓存到本地
 
-        对没有缓存封面的小说，并发获取其封面 URL 并存入数据库。
-        已有缓存的不重复获取。
+        对没有缓存封面的小说，并发获取其封面 URL 并存入缓存；
+        已缓存的直接返回，其中已过期的在后台刷新。
 
         Args:
             novels_json: JSON 字符串，包含 [{novel_id, title, cover_url, source_key}]
@@ -1322,58 +1631,57 @@ class Api:
             if not novels:
                 return {}
 
-            # 找出需要获取封面的小说（本地缓存中没有的）
-            need_fetch = []
-            result = {}
+            items = []  # [(novel_id, source_key, 缓存 key, 列表里带的封面 URL)]
             for n in novels:
                 nid = str(n.get('novel_id', ''))
                 sk = n.get('source_key') or n.get('source') or source_key
-                if not nid:
-                    continue
-                # 先查缓存
-                cached = self._db.get_cover(nid, sk)
-                if cached:
-                    result[nid] = cached
-                elif n.get('cover_url'):
+                if nid:
+                    items.append((nid, sk, cover_cache_key(sk, nid), n.get('cover_url')))
+            # 一次查询取出所有已缓存的封面
+            cached = self._metadata.peek_many(COVER_CACHE_NAMESPACE, [item[2] for item in items])
+
+            # 找出需要获取封面的小说（本地缓存中没有的）
+            need_fetch = []
+            listed = {}
+            result = {}
+            for nid, sk, key, cover_url in items:
+                if key in cached:
+                    result[nid], fresh = cached[key]
+                    if not fresh:
+                        self._metadata.refresh(COVER_CACHE_NAMESPACE, key,
+                                               functools.partial(self._fetch_cover, nid, sk), COVER_CACHE_TTL)
+                elif cover_url:
                     # 列表里已带封面 URL，直接缓存
-                    self._db.set_cover(nid, sk, n['cover_url'], n.get('title'))
-                    result[nid] = n['cover_url']
+                    listed[key] = cover_url
+                    result[nid] = cover_url
                 else:
-                    need_fetch.append((nid, sk, n.get('title', '')))
+                    need_fetch.append((nid, sk, key))
+            if listed:
+                self._metadata.set_many(COVER_CACHE_NAMESPACE, listed, COVER_CACHE_TTL)
 
             if not need_fetch:
                 return result
 
             # 并发获取封面（限制并发数，避免请求过多）
-            source_cache = {}
-
             def _fetch_one(item):
-                nid, sk, title = item
+                nid, sk, key = item
                 try:
-                    if sk not in source_cache:
-                        source_cache[sk] = self._get_source(sk)
-                    source = source_cache[sk]
-                    if not source:
-                        return nid, sk, title, None
-                    info = source.get_novel_info(nid)
-                    if info and info.cover_url:
-                        # 缓存到数据库
-                        self._db.set_cover(nid, sk, info.cover_url, title or info.title)
-                        return nid, sk, title, info.cover_url
+                    return nid, key, self._fetch_cover(nid, sk)
                 except Exception as e:
                     print(f'[WebUI] 获取封面失败 {nid}: {e}')
-                return nid, sk, title, None
+                return nid, key, None
 
+            fetched = {}
             max_workers = min(6, len(need_fetch))
             with ThreadPoolExecutor(max_workers=max_workers) as executor:
-                futures = {executor.submit(_fetch_one, item): item for item in need_fetch}
+                futures = [executor.submit(_fetch_one, item) for item in need_fetch]
                 for future in as_completed(futures):
-                    try:
-                        nid, sk, title, cover_url = future.result()
-                        if cover_url:
-                            result[nid] = cover_url
-                    except Exception:
-                        pass
+                    nid, key, cover_url = future.result()
+                    if cover_url:
+                        result[nid] = cover_url
+                        fetched[key] = cover_url
+            if fetched:
+                self._metadata.set_many(COVER_CACHE_NAMESPACE, fetched, COVER_CACHE_TTL)
 
             return result
         except Exception as e:
@@ -1381,37 +1689,20 @@ class Api:
             return {}
 
     def get_cover_cache_info(self):
-        """获取封面缓存信息（条目数 + 估算大小 KB）
+        """获取封面缓存信息（条目数 + 大小 KB）
 
-        封面缓存表仅存储 URL 字符串，没有图片文件本体；
-        缓存大小按各行的 novel_id+source+cover_url+title 字符串总字节数估算。
+        封面缓存仅存储 URL 字符串，没有图片文件本体；大小为 kv_cache 中封面条目的字节数。
         """
         try:
-            count = self._db.get_cover_cache_count()
-            # 估算大小：按行累计字符串字节数
-            size_bytes = 0
-            with self._db.get_connection() as conn:
-                cursor = conn.cursor()
-                cursor.execute('''
-                    SELECT novel_id, source, cover_url, title FROM novel_covers
-                ''')
-                for row in cursor.fetchall():
-                    nid = str(row['novel_id'] or '')
-                    src = str(row['source'] or '')
-                    url = str(row['cover_url'] or '')
-                    title = str(row['title'] or '')
-                    # UTF-8 字节数
-                    size_bytes += len(nid.encode('utf-8')) + len(src.encode('utf-8'))
-                    size_bytes += len(url.encode('utf-8')) + len(title.encode('utf-8'))
-            size_kb = round(size_bytes / 1024, 2)
-            return {'count': count, 'size_kb': size_kb}
+            count, size_bytes = self._db.cache_stats(COVER_CACHE_NAMESPACE)
+            return {'count': count, 'size_kb': round(size_bytes / 1024, 2)}
         except Exception as e:
             return {'error': str(e)}
 
     def clear_cover_cache(self):
-        """清空封面缓存表，返回被删除的条目数"""
+        """清空封面缓存，返回被删除的条目数"""
         try:
-            count = self._db.clear_cover_cache()
+            count = self._metadata.invalidate(COVER_CACHE_NAMESPACE)
             return {'status': 'ok', 'cleared': count}
         except Exception as e:
             return {'error': str(e)}
@@ -1558,7 +1849,7 @@ class Api:
             return {'error': str(e)}
 
     def get_category_novels(self, category_key, page=1):
-        """获取分类下的小说列表（来源：速读谷，按天缓存，封面已包含）
+        """获取分类下的小说列表（来源：速读谷，带缓存，封面已包含）
 
         点击分类后调用，返回该分类最新小说。点击具体小说后用书名在各源搜索。
         """
@@ -1779,6 +2070,8 @@ def main():
 
     # 创建 API 实例
     api = Api()
+    # 开启章节压缩后，在后台压缩数据库中尚未压缩的旧章节
+    start_compression_migration(api._db)
 
     # 创建 pywebview 窗口（兼容不支持 icon 参数的旧版本 pywebview）
     icon_path = _get_icon_path()
@@ -1809,6 +2102,14 @@ def main():
     # 启动 webview 事件循环
     webview.start(debug=False)
 
+    # 窗口关闭后回收解析子进程
+    if api._parse_pool is not None:
+        api._parse_pool.shutdown(wait=False)
+    # 关闭各线程的数据库长连接（WAL 检查点随最后一个连接关闭完成）
+    api._db.close()
+
 
 if __name__ == '__main__':
+    # PyInstaller 打包后使用进程池需要 freeze_support
+    multiprocessing.freeze_support()
     main()